@@ -1,14 +1,23 @@
-from typing import Dict
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Set, Tuple
+from contextlib import asynccontextmanager
+import asyncio
 import os
-from openai import AzureOpenAI
-from managers.customer_manager import CustomerManager
+import threading
+import time
+from openai import AzureOpenAI, AsyncAzureOpenAI
+from managers.customer_manager import CustomerManager, Customer
 from managers.policy_manager import PolicyManager
 from managers.chat_manager import ChatThreadManager
 from managers.escalation_manager import EscalationManager
 from .customer_agent import CustomerAgent
 from .policy_agent import PolicyAgent
 from .human_agent import HumanAgent
-from .core.agent_types import AgentType, Message, ConversationState
+from .core.base_agent import BaseAgent
+from .core.message_classifier import MessageClassifier
+from .core.conversation_memory import ConversationMemory
+from .core.conversation_store import ConversationStore
+from .core.agent_types import AgentType, ChunkCallback, Message, ConversationState
+from utils.mailbox import KeyedMailbox
 
 class AgentManager:
     def __init__(self):
@@ -18,6 +27,12 @@ class AgentManager:
             api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
             azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
         )
+        # Async client for the aprocess_* path, so turns awaiting the model don't hold a thread
+        self.async_openai_client = AsyncAzureOpenAI(
+            api_key=os.getenv("AZURE_OPENAI_KEY"),
+            api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
+        )
         self.deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT")
         
         # Initialize managers
@@ -26,114 +41,287 @@ class AgentManager:
         self.chat_manager = ChatThreadManager()
         self.escalation_manager = EscalationManager(self.chat_manager)
         
-        # Initialize agents
+        # Agent registry: one instance of each agent and of the classifier, shared by all
+        # conversations; agents receive their collaborators instead of creating them
+        self.classifier = MessageClassifier(self.openai_client, self.deployment, self.async_openai_client)
+        self.human_agent = HumanAgent(
+            self.openai_client,
+            self.deployment,
+            self.chat_manager,
+            self.escalation_manager,
+            self.async_openai_client,
+            classifier=self.classifier
+        )
         self.customer_agent = CustomerAgent(
             self.openai_client,
             self.customer_manager,
             self.policy_manager,
             self.chat_manager,
-            self.escalation_manager
+            self.escalation_manager,
+            self.async_openai_client,
+            classifier=self.classifier,
+            human_agent=self.human_agent
         )
-        self.human_agent = HumanAgent(
-            self.openai_client,
-            self.deployment,
-            self.chat_manager,
-            self.escalation_manager
+        self.policy_agent = PolicyAgent(self.openai_client, self.policy_manager, self.async_openai_client)
+        self.agents: Dict[AgentType, BaseAgent] = {
+            AgentType.CUSTOMER_AGENT: self.customer_agent,
+            AgentType.POLICY_AGENT: self.policy_agent,
+            AgentType.CONTACT_CENTER: self.human_agent,
+            AgentType.RELATIONSHIP_MANAGER: self.human_agent
+        }
+        
+        # Store conversations; idle ones expire, and the least recently active leave memory beyond the limit
+        self.conversations = ConversationStore.from_env()
+        self._last_purge = time.monotonic()
+        # Called with the user id of each conversation dropped for being idle
+        self.conversation_expired_listeners: List[Callable[[str], None]] = []
+        
+        # Bounded message window per conversation, with older turns rolled into last_summary
+        self.memory = ConversationMemory.from_env(self.openai_client, self.deployment, self.async_openai_client)
+        self._background: Set[asyncio.Task] = set()
+        
+        # Per-user mailboxes for blocking background work, e.g. expiry listeners
+        self.mailbox = KeyedMailbox(
+            max_workers=int(os.getenv("AGENT_MAX_WORKERS", "16")),
+            name="agent-mailbox"
         )
         
-        # Store conversations
-        self.conversations: Dict[str, ConversationState] = {}
+        # Per-user [lock, holders], dropped when no turn holds or awaits the lock
+        self._async_locks: Dict[str, List[Any]] = {}
+        # Every turn runs on this loop, so sync and async callers share the per-user locks
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        self.async_in_flight = 0
+        self.async_max_in_flight = 0
         
+    def get_agent(self, agent_type: AgentType) -> BaseAgent:
+        """Return the shared agent instance that handles agent_type"""
+        return self.agents[agent_type]
+
+    def get_conversation(self, user_id: str) -> Optional[ConversationState]:
+        """Return the user's conversation if it has not expired"""
+        return self.conversations.get(user_id)
+
     def _get_or_create_conversation(self, user_id: str) -> ConversationState:
         """Get existing conversation or create new one"""
-        if user_id not in self.conversations:
+        conv = self.conversations.get(user_id)
+        if conv is None:
             # Get customer info if available
             customer = self.customer_manager.get_customer(user_id)
             customer_info = self.customer_agent._format_customer_info(customer) if customer else None
             
             # Create new conversation state
-            self.conversations[user_id] = ConversationState(
+            conv = ConversationState(
                 messages=[],
                 current_agent=AgentType.CUSTOMER_AGENT,
                 customer_info=customer_info,
                 chat_thread_id=None
             )
+            self._purge_idle_conversations()
             
-        return self.conversations[user_id]
+        # Storing it again restarts the idle timeout
+        self.conversations.put(user_id, conv)
+        return conv
+
+    def _purge_idle_conversations(self):
+        """Free expired conversations that were never looked up again, at most once a minute"""
+        now = time.monotonic()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        purged = self.conversations.purge_expired()
+        if purged:
+            print(f"Evicted {len(purged)} idle conversations")
+        # Listeners run in the user's mailbox, off the event loop and in order with a returning user's turns
+        for user_id in purged:
+            for listener in self.conversation_expired_listeners:
+                self.mailbox.submit(user_id, listener, user_id)
+
+    def conversation_stats(self) -> Dict[str, Any]:
+        """Snapshot of the conversation store and of the conversations held in memory"""
+        conversations = self.conversations.cached()
+        return {
+            **self.conversations.stats(),
+            "messages": sum(len(conv.messages) for conv in conversations),
+            "summarized_conversations": sum(1 for conv in conversations if conv.last_summary),
+            "memory": self.memory.stats()
+        }
         
     def process_message(self, user_id: str, message: str) -> str:
-        """Process a message from a user"""
+        """Sync adapter for aprocess_message; blocks until the turn is done"""
+        return self._run_turn(self.aprocess_message(user_id, message))
+
+    def process_media(self, user_id: str, media_type: str, filepath: str) -> str:
+        """Sync adapter for aprocess_media; blocks until the turn is done"""
+        return self._run_turn(self.aprocess_media(user_id, media_type, filepath))
+
+    def _turn_loop(self) -> asyncio.AbstractEventLoop:
+        """The loop that runs turns: the first running loop to take one, else a private loop thread"""
+        with self._loop_lock:
+            if self._loop is None or self._loop.is_closed():
+                try:
+                    self._loop = asyncio.get_running_loop()
+                except RuntimeError:
+                    self._loop = asyncio.new_event_loop()
+                    threading.Thread(target=self._loop.run_forever, name="agent-loop", daemon=True).start()
+            return self._loop
+
+    def _run_turn(self, coro: Coroutine) -> Any:
+        """Run a turn coroutine on the turn loop from a thread that is not running it"""
+        loop = self._turn_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            coro.close()
+            raise RuntimeError("process_message and process_media block; await aprocess_message or aprocess_media on the event loop")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    async def aprocess_message(self, user_id: str, message: str, on_chunk: Optional[ChunkCallback] = None) -> str:
+        """Process a message from a user, serialized with the user's other turns
+
+        When agent streaming is enabled, answers are also streamed to on_chunk while they are
+        generated; the full response is still returned.
+        """
+        loop = self._turn_loop()
+        if loop is not asyncio.get_running_loop():
+            return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self.aprocess_message(user_id, message, on_chunk), loop))
+        async with self._async_turn(user_id):
+            response = await self._aprocess_message(user_id, message, on_chunk)
+        self._schedule_acompaction(user_id)
+        return response
+
+    async def aprocess_media(self, user_id: str, media_type: str, filepath: str) -> str:
+        """Process a media message from a user, serialized with the user's other turns"""
+        loop = self._turn_loop()
+        if loop is not asyncio.get_running_loop():
+            return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self.aprocess_media(user_id, media_type, filepath), loop))
+        async with self._async_turn(user_id):
+            response = await self._aprocess_media(user_id, media_type, filepath)
+        self._schedule_acompaction(user_id)
+        return response
+
+    @asynccontextmanager
+    async def _async_turn(self, user_id: str):
+        """Hold the user's turn lock, so turns and summaries for one user never interleave"""
+        entry = self._async_locks.get(user_id)
+        if entry is None:
+            entry = self._async_locks[user_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
         try:
-            # Get or create conversation state
-            conv = self._get_or_create_conversation(user_id)
+            async with entry[0]:
+                self.async_in_flight += 1
+                self.async_max_in_flight = max(self.async_max_in_flight, self.async_in_flight)
+                try:
+                    yield
+                finally:
+                    self.async_in_flight -= 1
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._async_locks[user_id]
+
+    def _schedule_acompaction(self, user_id: str):
+        """Summarize aged-out messages in a background task that holds the user's async turn"""
+        conv = self.conversations.get(user_id)
+        if conv is None or not self.memory.needs_compaction(conv):
+            return
             
-            # Get customer if available
-            customer = self.customer_manager.get_customer(user_id)
-            if customer and not conv.customer_info:
-                conv.customer_info = self.customer_agent._format_customer_info(customer)
+        async def compact():
+            async with self._async_turn(user_id):
+                await self.memory.acompact(conv)
+                self.conversations.put(user_id, conv)
+        task = asyncio.create_task(compact())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def async_stats(self) -> Dict[str, int]:
+        """Snapshot of async turn concurrency"""
+        return {
+            "in_flight": self.async_in_flight,
+            "max_in_flight": self.async_max_in_flight,
+            "active_users": len(self._async_locks)
+        }
+
+    async def aclose(self):
+        """Wait for background summaries, write pending conversations and chat messages and close the async OpenAI client"""
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        await asyncio.to_thread(self.conversations.close)
+        await asyncio.to_thread(self.escalation_manager.close)
+        await self.async_openai_client.close()
+
+    def _start_turn(self, user_id: str, message: str) -> Tuple[ConversationState, Optional[Customer]]:
+        """Load the conversation and customer and record the user's message"""
+        # Get or create conversation state
+        conv = self._get_or_create_conversation(user_id)
+        
+        # Get customer if available
+        customer = self.customer_manager.get_customer(user_id)
+        if customer and not conv.customer_info:
+            conv.customer_info = self.customer_agent._format_customer_info(customer)
+        
+        # Add user message to history
+        conv.messages.append(Message(role="user", content=message))
+        print(f"Current agent: {conv.current_agent}")
+        return conv, customer
+
+    def _finish_turn(self, conv: ConversationState, response: Optional[str], next_agent: AgentType) -> Optional[str]:
+        """Apply the agent transition and record the response"""
+        # Handle agent transition
+        if next_agent != conv.current_agent:
+            conv.current_agent = next_agent
             
-            # Add user message to history
-            conv.messages.append(Message(role="user", content=message))
+        # Add response to history if we got one
+        if response:
+            msg = Message(role="assistant", content=response, agent_type=conv.current_agent)
+            conv.messages.append(msg)
             
-            # Process message based on current agent
-            response = None
-            next_agent = conv.current_agent
-            print(f"Current agent: {conv.current_agent}")
+            # Forward to the chat thread; the outbox delivers it and dead-letters what keeps failing
+            if conv.chat_thread_id:
+                self.escalation_manager.update_escalation(conv.chat_thread_id, response, "assistant")
+                    
+        return response
+
+    async def _aprocess_message(self, user_id: str, message: str, on_chunk: Optional[ChunkCallback] = None) -> str:
+        """Process a message from a user; blocking chat thread calls run on a worker thread"""
+        try:
+            conv, customer = self._start_turn(user_id, message)
             
-            # If in contact center chat, let human agent handle it
             if conv.current_agent == AgentType.CONTACT_CENTER:
-                response = self.human_agent.process_message(user_id, message, conv, customer)
-                # Get next agent from conversation state since HumanAgent updates it directly
+                response = await self.human_agent.aprocess_message(user_id, message, conv, customer)
                 next_agent = conv.current_agent
             else:
-                # Route everything through customer agent
-                response, next_agent = self.customer_agent.process_message(user_id, message, conv, customer)
-                
-            # Handle agent transition
-            if next_agent != conv.current_agent:
-                conv.current_agent = next_agent
+                response, next_agent = await self.customer_agent.aprocess_message(user_id, message, conv, customer, on_chunk)
                 
-            # Add response to history if we got one
-            if response:
-                msg = Message(role="assistant", content=response, agent_type=conv.current_agent)
-                conv.messages.append(msg)
-                
-                try:
-                    # Update thread if exists
-                    if conv.chat_thread_id:
-                        self.escalation_manager.update_escalation(conv.chat_thread_id, response, "assistant")
-                except Exception as e:
-                    if "TooManyRequests" in str(e):
-                        # Return the error message to the user
-                        return str(e)
-                    else:
-                        raise
-                        
+            if not conv.chat_thread_id:
+                response = self._finish_turn(conv, response, next_agent)
+            else:
+                response = await asyncio.to_thread(self._finish_turn, conv, response, next_agent)
+            self.conversations.put(user_id, conv)
             return response
             
         except Exception as e:
             print(f"Error processing message: {e}")
             raise
 
-    def process_media(self, user_id: str, media_type: str, filepath: str) -> str:
-        """Process a media message from a user"""
-        # Get or create conversation state
+    async def _aprocess_media(self, user_id: str, media_type: str, filepath: str) -> str:
+        """Process a media message from a user; media is always handled by the contact center"""
         conv = self._get_or_create_conversation(user_id)
-        
-        # Add media message to history
         conv.messages.append(Message(role="user", content=f"[Sent {media_type}]"))
         
-        # Process based on current agent
         response = None
         if conv.current_agent == AgentType.CONTACT_CENTER:
-            response = self.human_agent.process_media(user_id, media_type, filepath, conv)
+            response = await asyncio.to_thread(self.human_agent.process_media, user_id, media_type, filepath, conv)
         else:
-            # For non-human agents, always escalate media to contact center
-            response, next_agent = self.human_agent.handle_escalation(user_id, f"[Sent {media_type}]", conv, None, AgentType.CONTACT_CENTER)
+            response, next_agent = await self.human_agent.ahandle_escalation(user_id, f"[Sent {media_type}]", conv, None, AgentType.CONTACT_CENTER)
             conv.current_agent = next_agent
+            if response and conv.chat_thread_id:
+                await asyncio.to_thread(self.escalation_manager.update_escalation, conv.chat_thread_id, response, "assistant")
             
-        # Add response to history
         if response:
             conv.messages.append(Message(role="assistant", content=response, agent_type=conv.current_agent))
+        self.conversations.put(user_id, conv)
             
         return f"[{conv.current_agent.display_name}] {response}" if response else None
@@ -6,7 +6,8 @@ from .intents import (
     INTENT_NEEDS_AGENT,
     INTENT_NEEDS_RM,
     DISCONNECT_INTENTS,
-    ESCALATION_INTENTS
+    ESCALATION_INTENTS,
+    DISCONNECT_CONFIRMATION_PROMPT
 )
 from .message_classifier import Intent, MessageClassifier
 
@@ -22,5 +23,6 @@ __all__ = [
     'INTENT_NEEDS_AGENT',
     'INTENT_NEEDS_RM',
     'DISCONNECT_INTENTS',
-    'ESCALATION_INTENTS'
+    'ESCALATION_INTENTS',
+    'DISCONNECT_CONFIRMATION_PROMPT'
 ]
@@ -1,7 +1,9 @@
 from enum import Enum
 from dataclasses import dataclass, field
-from typing import List, Optional
-from datetime import datetime
+from typing import Awaitable, Callable, List, Optional, Tuple
+import struct
+import sys
+import time
 
 class AgentType(str, Enum):
     USER = "user"
@@ -20,12 +22,64 @@ class AgentType(str, Enum):
             AgentType.RELATIONSHIP_MANAGER: "Relationship Manager"
         }[self]
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Message:
+    """One conversation turn, kept compact since millions of them can be held in memory
+
+    Slots instead of a per-instance dict, an epoch-seconds int instead of a datetime,
+    an interned role string and a shared AgentType member.
+    """
     role: str
     content: str
     agent_type: AgentType = AgentType.USER
-    timestamp: datetime = field(default_factory=datetime.now)
+    timestamp: int = field(default_factory=lambda: int(time.time()))
+
+    def __post_init__(self):
+        object.__setattr__(self, "role", sys.intern(self.role))
+        if not isinstance(self.agent_type, AgentType):
+            object.__setattr__(self, "agent_type", AgentType(self.agent_type))
+
+# Binary ConversationState format: small codes for agent types and common roles,
+# length-prefixed UTF-8 for text; _NONE marks a missing optional string
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<2sBBB")
+_MESSAGE = struct.Struct("<BBqI")
+_LENGTH = struct.Struct("<I")
+_NONE = 0xFFFFFFFF
+_AGENT_TYPES = list(AgentType)
+_AGENT_CODES = {agent_type: code for code, agent_type in enumerate(_AGENT_TYPES)}
+_ROLES = ["user", "assistant", "system"]
+_ROLE_CODES = {role: code for code, role in enumerate(_ROLES)}
+_OTHER_ROLE = 0xFF
+
+# Slot setters let from_bytes build messages from already-canonical values without
+# the frozen __init__ and __post_init__, which dominate decoding time
+_SET_ROLE, _SET_CONTENT, _SET_AGENT_TYPE, _SET_TIMESTAMP = (
+    Message.__dict__[name].__set__ for name in ("role", "content", "agent_type", "timestamp")
+)
+
+def _restore_message(role: str, content: str, agent_type: AgentType, timestamp: int) -> Message:
+    msg = object.__new__(Message)
+    _SET_ROLE(msg, role)
+    _SET_CONTENT(msg, content)
+    _SET_AGENT_TYPE(msg, agent_type)
+    _SET_TIMESTAMP(msg, timestamp)
+    return msg
+
+def _pack_text(parts: List[bytes], text: Optional[str]):
+    if text is None:
+        parts.append(_LENGTH.pack(_NONE))
+        return
+    data = text.encode("utf-8")
+    parts.append(_LENGTH.pack(len(data)))
+    parts.append(data)
+
+def _unpack_text(view: memoryview, offset: int) -> Tuple[Optional[str], int]:
+    (length,) = _LENGTH.unpack_from(view, offset)
+    offset += _LENGTH.size
+    if length == _NONE:
+        return None, offset
+    return str(view[offset:offset + length], "utf-8"), offset + length
 
 @dataclass
 class ConversationState:
@@ -35,3 +89,59 @@ class ConversationState:
     policy_checked: bool = False
     customer_info: Optional[str] = None
     chat_thread_id: Optional[str] = None
+
+    def to_bytes(self) -> bytes:
+        """Serialize the conversation to the compact binary form kept by a ConversationStore"""
+        parts = [_HEADER.pack(b"CS", _FORMAT_VERSION, _AGENT_CODES[self.current_agent], self.policy_checked)]
+        _pack_text(parts, self.last_summary)
+        _pack_text(parts, self.customer_info)
+        _pack_text(parts, self.chat_thread_id)
+
+        messages = list(self.messages)
+        parts.append(_LENGTH.pack(len(messages)))
+        for msg in messages:
+            content = msg.content.encode("utf-8")
+            role_code = _ROLE_CODES.get(msg.role, _OTHER_ROLE)
+            parts.append(_MESSAGE.pack(role_code, _AGENT_CODES[msg.agent_type], msg.timestamp, len(content)))
+            if role_code == _OTHER_ROLE:
+                _pack_text(parts, msg.role)
+            parts.append(content)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ConversationState":
+        view = memoryview(data)
+        magic, version, agent_code, policy_checked = _HEADER.unpack_from(view, 0)
+        if magic != b"CS" or version != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported conversation format: {bytes(magic)!r} v{version}")
+        offset = _HEADER.size
+        last_summary, offset = _unpack_text(view, offset)
+        customer_info, offset = _unpack_text(view, offset)
+        chat_thread_id, offset = _unpack_text(view, offset)
+
+        (count,) = _LENGTH.unpack_from(view, offset)
+        offset += _LENGTH.size
+        messages = []
+        for _ in range(count):
+            role_code, msg_agent_code, timestamp, length = _MESSAGE.unpack_from(view, offset)
+            offset += _MESSAGE.size
+            if role_code == _OTHER_ROLE:
+                role, offset = _unpack_text(view, offset)
+                role = sys.intern(role)
+            else:
+                role = _ROLES[role_code]
+            content = str(view[offset:offset + length], "utf-8")
+            offset += length
+            messages.append(_restore_message(role, content, _AGENT_TYPES[msg_agent_code], timestamp))
+
+        return cls(
+            messages=messages,
+            current_agent=_AGENT_TYPES[agent_code],
+            last_summary=last_summary,
+            policy_checked=bool(policy_checked),
+            customer_info=customer_info,
+            chat_thread_id=chat_thread_id
+        )
+
+# Receives each streamed reply chunk together with the agent sending it
+ChunkCallback = Callable[[str, AgentType], Awaitable[None]]
@@ -1,18 +1,63 @@
-from typing import Optional
+from typing import Any, Awaitable, Callable, Optional
+import asyncio
 import os
 from datetime import datetime
-from openai import AzureOpenAI
+from openai import AzureOpenAI, AsyncAzureOpenAI
 from managers.customer_manager import Customer
-from .agent_types import ConversationState
+from .agent_types import AgentType, ChunkCallback, ConversationState
+from utils.stream_chunker import StreamChunker
 
 class BaseAgent:
-    def __init__(self, client: AzureOpenAI):
+    def __init__(self, client: AzureOpenAI, async_client: Optional[AsyncAzureOpenAI] = None):
         """Initialize base agent"""
         self.client = client
+        self.async_client = async_client
         self.deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT")
         if not self.deployment:
             raise ValueError("AZURE_OPENAI_DEPLOYMENT environment variable is not set")
+        # Stream long answers to the customer in chunks on the async path when a chunk callback is given
+        self.streaming = os.getenv("AGENT_STREAMING", "false").lower() in ("1", "true", "yes")
+
+    async def _acomplete(self, **kwargs) -> Any:
+        """Create a chat completion without blocking the event loop
+
+        Uses the async client when one was given, otherwise runs the sync client on a worker thread.
+        """
+        if self.async_client:
+            return await self.async_client.chat.completions.create(**kwargs)
+        return await asyncio.to_thread(self.client.chat.completions.create, **kwargs)
+
+    async def _astream(self, on_text: Callable[[str], Awaitable[None]], **kwargs) -> str:
+        """Stream a chat completion, passing each text delta to on_text, and return the full text
+
+        Without an async client the completion is not streamed and on_text gets the whole text at once.
+        """
+        if not self.async_client:
+            response = await asyncio.to_thread(self.client.chat.completions.create, **kwargs)
+            content = response.choices[0].message.content or ""
+            await on_text(content)
+            return content
+            
+        parts = []
+        stream = await self.async_client.chat.completions.create(stream=True, **kwargs)
+        async for event in stream:
+            # Azure sends events without choices, e.g. for prompt filter results
+            if event.choices and event.choices[0].delta.content:
+                parts.append(event.choices[0].delta.content)
+                await on_text(parts[-1])
+        return "".join(parts)
+
+    async def _astream_reply(self, on_chunk: ChunkCallback, agent_type: AgentType, **kwargs) -> str:
+        """Stream a completion to on_chunk in sentence or paragraph sized chunks and return the full text"""
+        chunker = StreamChunker.from_env(lambda text: on_chunk(text, agent_type))
+        content = await self._astream(chunker.feed, **kwargs)
+        await chunker.close()
+        return content
 
     def process_message(self, user_id: str, message: str, conv: ConversationState, customer: Optional[Customer] = None) -> str:
         """Process a message"""
         raise NotImplementedError("Subclasses must implement process_message")
+
+    async def aprocess_message(self, user_id: str, message: str, conv: ConversationState, customer: Optional[Customer] = None) -> str:
+        """Async variant of process_message; runs the sync implementation on a worker thread unless overridden"""
+        return await asyncio.to_thread(self.process_message, user_id, message, conv, customer)
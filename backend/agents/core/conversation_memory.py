@@ -0,0 +1,115 @@
+from typing import Any, Dict, List, Optional
+import asyncio
+import os
+import threading
+from openai import AzureOpenAI, AsyncAzureOpenAI
+from .agent_types import ConversationState, Message
+
+
+class ConversationMemory:
+    """Keeps each conversation's message window bounded with a rolling summary
+
+    Once a conversation holds more than max_messages, the oldest messages are folded
+    into conv.last_summary by one summarization call and dropped, leaving the newest
+    half of the window. Summarizing half a window at a time keeps the model calls to
+    one per max_messages / 2 turns.
+    """
+
+    def __init__(self, client: AzureOpenAI, deployment: str, async_client: Optional[AsyncAzureOpenAI] = None, max_messages: int = 40):
+        """
+        Args:
+            max_messages: Messages kept per conversation before older ones are summarized, or 0 for no limit
+        """
+        self.client = client
+        self.async_client = async_client
+        self.deployment = deployment
+        self.max_messages = max(0, max_messages)
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.compactions = 0
+        self.summarized_messages = 0
+        self.dropped_messages = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls, client: AzureOpenAI, deployment: str, async_client: Optional[AsyncAzureOpenAI] = None) -> "ConversationMemory":
+        """Create a memory policy configured from CONVERSATION_MAX_MESSAGES"""
+        return cls(client, deployment, async_client, max_messages=int(os.getenv("CONVERSATION_MAX_MESSAGES", "40")))
+
+    def needs_compaction(self, conv: ConversationState) -> bool:
+        return bool(self.max_messages) and len(conv.messages) > self.max_messages
+
+    def _aged_out(self, conv: ConversationState) -> List[Message]:
+        """Messages that no longer fit in the window"""
+        return conv.messages[:len(conv.messages) - self.max_messages // 2]
+
+    def _summary_request(self, summary: Optional[str], aged_out: List[Message]) -> Dict[str, Any]:
+        """Build the completion request that folds aged-out messages into the running summary"""
+        transcript = "\n".join(f"{msg.role}: {msg.content}" for msg in aged_out)
+        return {
+            "model": self.deployment,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You maintain a running summary of a customer conversation. Update the summary with the new messages, keeping key facts, requests and decisions. Reply with the updated summary only."
+                },
+                {"role": "user", "content": f"Current summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"}
+            ],
+            "temperature": 0.3,
+            "max_tokens": 200
+        }
+
+    def _apply(self, conv: ConversationState, aged_out: List[Message], summary: str):
+        conv.last_summary = summary.strip()
+        # Only drop what was summarized; messages added meanwhile stay in the window
+        del conv.messages[:len(aged_out)]
+        with self._lock:
+            self.compactions += 1
+            self.summarized_messages += len(aged_out)
+
+    def _fail(self, conv: ConversationState, error: Exception):
+        """Keep the aged-out messages for the next attempt, but never more than twice the window"""
+        print(f"Error summarizing conversation history: {error}")
+        overflow = len(conv.messages) - 2 * self.max_messages
+        if overflow > 0:
+            del conv.messages[:overflow]
+        with self._lock:
+            self.failures += 1
+            self.dropped_messages += max(0, overflow)
+
+    def compact(self, conv: ConversationState):
+        """Summarize and drop aged-out messages if the window is full"""
+        if not self.needs_compaction(conv):
+            return
+        aged_out = self._aged_out(conv)
+        try:
+            response = self.client.chat.completions.create(**self._summary_request(conv.last_summary, aged_out))
+            self._apply(conv, aged_out, response.choices[0].message.content)
+        except Exception as e:
+            self._fail(conv, e)
+
+    async def acompact(self, conv: ConversationState):
+        """Async variant of compact"""
+        if not self.needs_compaction(conv):
+            return
+        aged_out = self._aged_out(conv)
+        try:
+            request = self._summary_request(conv.last_summary, aged_out)
+            if self.async_client:
+                response = await self.async_client.chat.completions.create(**request)
+            else:
+                response = await asyncio.to_thread(self.client.chat.completions.create, **request)
+            self._apply(conv, aged_out, response.choices[0].message.content)
+        except Exception as e:
+            self._fail(conv, e)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "max_messages": self.max_messages,
+                "compactions": self.compactions,
+                "summarized_messages": self.summarized_messages,
+                "dropped_messages": self.dropped_messages,
+                "failures": self.failures
+            }
@@ -0,0 +1,317 @@
+from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+import os
+import sqlite3
+import threading
+import time
+from utils.ttl_cache import TTLCache
+from .agent_types import ConversationState
+
+
+class ConversationStore:
+    """Where AgentManager keeps conversation state between turns
+
+    get() returns the live ConversationState object; callers mutate it in place and
+    put() it back once a turn has changed it, so backends that persist know what to write.
+    """
+
+    def get(self, user_id: str) -> Optional[ConversationState]:
+        raise NotImplementedError
+
+    def put(self, user_id: str, conv: ConversationState):
+        """Store conv for user_id and restart its idle timeout"""
+        raise NotImplementedError
+
+    def delete(self, user_id: str):
+        raise NotImplementedError
+
+    def purge_expired(self) -> List[str]:
+        """Drop idle conversations now; returns the user ids dropped"""
+        raise NotImplementedError
+
+    def cached(self) -> List[ConversationState]:
+        """Conversations currently held in this process's memory"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def flush(self):
+        """Write pending changes to the backing storage, if any"""
+
+    def close(self):
+        self.flush()
+
+    @classmethod
+    def from_env(cls) -> "ConversationStore":
+        """Create a conversation store configured from CONVERSATION_* environment variables"""
+        max_entries = int(os.getenv("CONVERSATION_MAX_ACTIVE", "10000"))
+        ttl = float(os.getenv("CONVERSATION_IDLE_TTL_SECONDS", "86400"))
+        backend_name = os.getenv("CONVERSATION_STORE_BACKEND", "memory").lower()
+
+        if backend_name == "sqlite":
+            default_path = Path(__file__).parent.parent.parent / "data" / "conversations.db"
+            return SqliteConversationStore(
+                Path(os.getenv("CONVERSATION_STORE_PATH", str(default_path))),
+                max_entries,
+                ttl,
+                flush_interval=float(os.getenv("CONVERSATION_STORE_FLUSH_INTERVAL_SECONDS", "0.5")),
+                batch_size=int(os.getenv("CONVERSATION_STORE_BATCH_SIZE", "256"))
+            )
+        if backend_name != "memory":
+            raise ValueError(f"Unknown CONVERSATION_STORE_BACKEND: {backend_name}")
+        return MemoryConversationStore(max_entries, ttl)
+
+
+class MemoryConversationStore(ConversationStore):
+    """In-process conversations in an LRU/TTL cache; lost on restart and private to the worker"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.cache = TTLCache(max_entries=max_entries, ttl=ttl)
+
+    def get(self, user_id: str) -> Optional[ConversationState]:
+        return self.cache.get(user_id)
+
+    def put(self, user_id: str, conv: ConversationState):
+        self.cache.set(user_id, conv)
+
+    def delete(self, user_id: str):
+        self.cache.pop(user_id)
+
+    def purge_expired(self) -> List[str]:
+        return self.cache.pop_expired()
+
+    def cached(self) -> List[ConversationState]:
+        return [conv for _, conv, _ in self.cache.items()]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__, **self.cache.stats()}
+
+
+class SqliteConversationStore(ConversationStore):
+    """Conversations in a SQLite file (WAL mode) shared by every worker process on the host
+
+    Reads go through an LRU/TTL cache of deserialized conversations. A cached entry is
+    revalidated against the row version with one indexed lookup, and the row is only
+    read and deserialized again when another worker has written it since.
+
+    Writes are write-behind: put() serializes the conversation on the caller's thread,
+    while the caller still owns it, and marks it dirty. A background thread writes
+    those bytes for every dirty conversation in one transaction each flush_interval, or
+    as soon as batch_size are pending. Another worker sees a change after at most
+    flush_interval; when two workers write the same conversation, the last write wins.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_entries: int,
+        ttl: float,
+        flush_interval: float = 0.5,
+        batch_size: int = 256,
+        revalidate: bool = True
+    ):
+        """
+        Args:
+            path: SQLite database file
+            max_entries: Conversations cached in memory; the file keeps every unexpired one
+            ttl: Idle seconds after which a conversation expires, in memory and on disk
+            flush_interval: Maximum seconds a change waits before it is written
+            batch_size: Pending changes that trigger a write before flush_interval
+            revalidate: Check cached conversations against the file on every get; only
+                disable it when a single process uses the file
+        """
+        self.path = Path(path)
+        self.ttl = ttl
+        self.flush_interval = max(0.0, flush_interval)
+        self.batch_size = max(1, batch_size)
+        self.revalidate = revalidate
+        # user_id -> [conv, version]; version is None until the conversation is written or loaded
+        self.cache = TTLCache(max_entries=max_entries, ttl=ttl)
+
+        # user_id -> (cache entry, serialized conversation) waiting to be written
+        self._dirty: Dict[str, Tuple[List[Any], bytes]] = {}
+        self._flushing: Dict[str, Tuple[List[Any], bytes]] = {}
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+
+        # Metrics
+        self.loads = 0
+        self.revalidations = 0
+        self.writes = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.last_flush_seconds = 0.0
+
+        # Separate connections so reads are not blocked behind a batch write
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._writer = self._connect()
+        self._writer.execute(
+            """CREATE TABLE IF NOT EXISTS conversations (
+                user_id TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                version INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self._writer.execute("CREATE INDEX IF NOT EXISTS idx_conversations_updated ON conversations (updated_at)")
+        self._reader = self._connect()
+
+        self._flusher = threading.Thread(target=self._run_flusher, name="conversation-store-flusher", daemon=True)
+        self._flusher.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def get(self, user_id: str) -> Optional[ConversationState]:
+        with self._lock:
+            pending = self._dirty.get(user_id) or self._flushing.get(user_id)
+        if pending is not None:
+            # Not committed yet, so this process holds the newest state
+            return pending[0][0]
+
+        entry = self.cache.get(user_id)
+        if entry is not None and not self.revalidate:
+            return entry[0]
+
+        cached_version = entry[1] if entry is not None else None
+        with self._read_lock:
+            row = self._reader.execute(
+                "SELECT version, CASE WHEN version IS ? THEN NULL ELSE data END FROM conversations WHERE user_id = ? AND updated_at > ?",
+                (cached_version, user_id, time.time() - self.ttl)
+            ).fetchone()
+        if row is None:
+            if entry is not None:
+                # Expired or deleted by another worker
+                self.cache.pop(user_id)
+            return None
+
+        version, data = row
+        if data is None:
+            self.revalidations += 1
+            return entry[0]
+        conv = ConversationState.from_bytes(data)
+        self.loads += 1
+        self.cache.set(user_id, [conv, version])
+        return conv
+
+    def put(self, user_id: str, conv: ConversationState):
+        # The flusher only sees these bytes, never the live conversation the caller keeps changing
+        data = conv.to_bytes()
+        with self._lock:
+            previous = self._dirty.get(user_id)
+            entry = previous[0] if previous is not None and previous[0][0] is conv else [conv, None]
+            self._dirty[user_id] = (entry, data)
+            pending = len(self._dirty)
+        self.cache.set(user_id, entry)
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def delete(self, user_id: str):
+        with self._lock:
+            self._dirty.pop(user_id, None)
+        self.cache.pop(user_id)
+        with self._flush_lock:
+            self._writer.execute("DELETE FROM conversations WHERE user_id = ?", (user_id,))
+
+    def purge_expired(self) -> List[str]:
+        purged = set(self.cache.pop_expired())
+        cutoff = time.time() - self.ttl
+        with self._flush_lock:
+            rows = self._writer.execute("SELECT user_id FROM conversations WHERE updated_at <= ?", (cutoff,)).fetchall()
+            self._writer.execute("DELETE FROM conversations WHERE updated_at <= ?", (cutoff,))
+        # A row can be stale while the conversation is live in memory with an unflushed write
+        purged.update(user_id for (user_id,) in rows if user_id not in self.cache)
+        return list(purged)
+
+    def cached(self) -> List[ConversationState]:
+        return [entry[0] for _, entry, _ in self.cache.items()]
+
+    def _run_flusher(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write every pending conversation in one transaction"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._dirty = self._dirty, {}
+                self._flushing = batch
+            if not batch:
+                return
+            try:
+                self._write(batch)
+            finally:
+                with self._lock:
+                    self._flushing = {}
+
+    def _write(self, batch: Dict[str, Tuple[List[Any], bytes]]):
+        """Upsert a batch of serialized conversations, recording each new row version in its cache entry"""
+        start = time.perf_counter()
+        now = time.time()
+        try:
+            rows = [(user_id, entry, data) for user_id, (entry, data) in batch.items()]
+            self._writer.execute("BEGIN IMMEDIATE")
+            for user_id, entry, data in rows:
+                entry[1] = self._writer.execute(
+                    """INSERT INTO conversations (user_id, data, version, updated_at) VALUES (?, ?, 1, ?)
+                    ON CONFLICT(user_id) DO UPDATE SET
+                        data = excluded.data,
+                        version = conversations.version + 1,
+                        updated_at = excluded.updated_at
+                    RETURNING version""",
+                    (user_id, data, now)
+                ).fetchone()[0]
+            self._writer.execute("COMMIT")
+        except Exception as e:
+            print(f"Error writing conversations: {e}")
+            if self._writer.in_transaction:
+                self._writer.execute("ROLLBACK")
+            for entry, _ in batch.values():
+                entry[1] = None
+            with self._lock:
+                # Retry with the next flush, unless a newer put replaced the entry meanwhile
+                for user_id, pending in batch.items():
+                    self._dirty.setdefault(user_id, pending)
+            self.flush_errors += 1
+            return
+
+        self.writes += len(batch)
+        self.flushes += 1
+        self.last_flush_seconds = time.perf_counter() - start
+
+    def stats(self) -> Dict[str, Any]:
+        with self._read_lock:
+            stored = self._reader.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+        with self._lock:
+            pending = len(self._dirty)
+        return {
+            "backend": type(self).__name__,
+            **self.cache.stats(),
+            "stored": stored,
+            "pending_writes": pending,
+            "loads": self.loads,
+            "revalidations": self.revalidations,
+            "writes": self.writes,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "last_flush_ms": round(self.last_flush_seconds * 1000, 2)
+        }
+
+    def close(self):
+        """Stop the flusher, write what is pending and close the database"""
+        self._closed = True
+        self._wake.set()
+        self._flusher.join()
+        self.flush()
+        with self._flush_lock, self._read_lock:
+            self._writer.close()
+            self._reader.close()
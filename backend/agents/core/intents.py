@@ -26,6 +26,9 @@ INTENT_NEEDS_RM = Intent(
     ["portfolio review", "investment strategy", "financial planning"]
 )
 
+# HumanAgent asks this before disconnecting; the reply is classified in its light
+DISCONNECT_CONFIRMATION_PROMPT = "Thank you for chatting with us today. Is there anything else you need help with before you go?"
+
 # Common groups of intents
 DISCONNECT_INTENTS = [INTENT_DISCONNECT, INTENT_CONFIRM_DISCONNECT]
 ESCALATION_INTENTS = [INTENT_NEEDS_AGENT, INTENT_NEEDS_RM]
@@ -1,7 +1,52 @@
-from typing import Optional, Dict, List
+from typing import Any, Optional, Dict, List, Tuple
+import asyncio
+import hashlib
 import json
-from openai import AzureOpenAI
+import os
+import threading
+import time
+from openai import AzureOpenAI, AsyncAzureOpenAI
 from .agent_types import ConversationState
+from .rule_classifier import RuleBasedClassifier, normalize
+from utils.ttl_cache import TTLCache
+
+DEFAULT_INTENTS = {
+    "wants_disconnect": [
+        "I want to disconnect",
+        "Please end this chat",
+        "Close this conversation",
+        "End chat",
+        "Bye",
+        "Goodbye"
+    ],
+    "confirms_disconnect": [
+        "Yes, please disconnect",
+        "Yes, end the chat",
+        "Yes, close the conversation",
+        "Yes, goodbye",
+        "Confirm disconnect"
+    ],
+    "needs_agent": [
+        "I need to speak with a human",
+        "Connect me to an agent",
+        "Talk to customer service",
+        "Speak with representative",
+        "Talk to human"
+    ],
+    "needs_rm": [
+        "I need my relationship manager",
+        "Connect me to my RM",
+        "Speak with relationship manager",
+        "Talk to RM"
+    ]
+}
+
+# Intents whose meaning depends on what was asked before ("no" only ends a chat after
+# "anything else?"), so they are always left to the LLM, which sees the conversation
+CONTEXT_DEPENDENT_INTENTS = {"confirms_disconnect"}
+
+# Conversation messages shown to the model with the message to classify
+CONTEXT_MESSAGES = 5
 
 class Intent:
     def __init__(self, name: str, description: str, examples: List[str]):
@@ -17,65 +62,201 @@ class Intent:
         self.description = description
         self.examples = examples
 
+class ClassificationStats:
+    """Counts how many messages were classified locally and the LLM latency that saved"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.local = 0
+        self.llm = 0
+        self.llm_seconds = 0.0
+        self.local_seconds = 0.0
+
+    def record_local(self, seconds: float):
+        with self._lock:
+            self.local += 1
+            self.local_seconds += seconds
+
+    def record_llm(self, seconds: float):
+        with self._lock:
+            self.llm += 1
+            self.llm_seconds += seconds
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.local + self.llm
+            avg_llm = self.llm_seconds / self.llm if self.llm else 0.0
+            return {
+                "classified": total,
+                "resolved_locally": self.local,
+                "llm_calls": self.llm,
+                "local_fraction": round(self.local / total, 4) if total else 0.0,
+                "avg_llm_ms": round(avg_llm * 1000, 2),
+                # Estimated from the average LLM latency this process has observed
+                "latency_saved_ms": round((avg_llm * self.local - self.local_seconds) * 1000, 2) if self.llm else 0.0
+            }
+
+
+class ClassificationCache:
+    """LRU/TTL cache of LLM classifications, optionally persisted to a JSON file
+
+    Keyed on the normalized message text, the intent examples and a hash of the
+    conversation context sent to the model, so the same phrasing in the same situation
+    is classified without a model call.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, path: Optional[str] = None, persist_every: int = 50):
+        self.cache = TTLCache(max_entries=max_entries, ttl=ttl)
+        self.path = path
+        self.persist_every = persist_every
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        if path:
+            try:
+                print(f"Loaded {self.cache.load(path)} cached classifications from {path}")
+            except Exception as e:
+                print(f"Error loading classification cache: {e}")
+
+    @classmethod
+    def from_env(cls) -> "ClassificationCache":
+        """Create a cache configured from CLASSIFIER_CACHE_* environment variables"""
+        return cls(
+            max_entries=int(os.getenv("CLASSIFIER_CACHE_MAX_ENTRIES", "10000")),
+            ttl=float(os.getenv("CLASSIFIER_CACHE_TTL_SECONDS", "86400")),
+            path=os.getenv("CLASSIFIER_CACHE_PATH") or None
+        )
+
+    def key(self, message: str, intents: Dict[str, List[str]], context: str) -> str:
+        """Cache key for message classified against intents (name -> examples) in the prompt's context"""
+        intent_signature = hashlib.sha1(json.dumps(intents, sort_keys=True).encode()).hexdigest()[:16]
+        context_hash = hashlib.sha1(context.encode()).hexdigest()[:16]
+        return f"{intent_signature}:{context_hash}:{normalize(message)}"
+
+    def get(self, key: str) -> Optional[str]:
+        return self.cache.get(key)
+
+    def set(self, key: str, intent: str):
+        self.cache.set(key, intent)
+        if self.path:
+            with self._lock:
+                self._unsaved += 1
+                if self._unsaved < self.persist_every:
+                    return
+                self._unsaved = 0
+            self.flush()
+
+    def flush(self):
+        """Write the cache to disk if persistence is enabled"""
+        if not self.path:
+            return
+        try:
+            self.cache.save(self.path)
+        except Exception as e:
+            print(f"Error saving classification cache: {e}")
+
+    def stats(self) -> Dict:
+        return self.cache.stats()
+
+
 class MessageClassifier:
-    def __init__(self, client: AzureOpenAI, deployment: str):
+    # Compiled rule classifiers depend only on the intent examples, so instances share them
+    _rule_classifiers: Dict[Tuple, RuleBasedClassifier] = {}
+
+    def __init__(
+        self,
+        client: AzureOpenAI,
+        deployment: str,
+        async_client: Optional[AsyncAzureOpenAI] = None,
+        stats: Optional[ClassificationStats] = None,
+        cache: Optional[ClassificationCache] = None
+    ):
+        """
+        Args:
+            stats: Shared classification counters; new ones are created if not given
+            cache: Shared classification cache; one is configured from the environment if not given
+        """
         self.client = client
+        self.async_client = async_client
         self.deployment = deployment
+        self.stats = stats or ClassificationStats()
+        self.cache = cache or ClassificationCache.from_env()
+        self.fast_path = os.getenv("CLASSIFIER_FAST_PATH", "true").lower() in ("1", "true", "yes")
+
+    @classmethod
+    def _rule_classifier(cls, intents: Dict[str, List[str]]) -> RuleBasedClassifier:
+        """Compile (once per intent set) a rule classifier from the given and registered intent examples"""
+        # Imported here because intents.py imports Intent from this module
+        from .intents import DISCONNECT_INTENTS, ESCALATION_INTENTS
+
+        registered = {intent.name: intent.examples for intent in DISCONNECT_INTENTS + ESCALATION_INTENTS}
+        examples = {
+            name: list(getattr(phrases, "examples", phrases)) + registered.get(name, [])
+            for name, phrases in intents.items()
+        }
+        signature = tuple(sorted((name, tuple(phrases)) for name, phrases in examples.items()))
+        if signature not in cls._rule_classifiers:
+            cls._rule_classifiers[signature] = RuleBasedClassifier(examples)
+        return cls._rule_classifiers[signature]
         
-    def classify_message(
+    @staticmethod
+    def _intent_examples(intents: Dict[str, Any]) -> Dict[str, List[str]]:
+        """Map each intent name to its example phrases; values may be example lists or Intents"""
+        return {
+            name: list(getattr(examples, "examples", examples))
+            for name, examples in sorted(intents.items())
+        }
+
+    @staticmethod
+    def _awaiting_disconnect_confirmation(messages: List[Any]) -> bool:
+        """True if the last assistant message is HumanAgent's disconnect confirmation prompt"""
+        from .intents import DISCONNECT_CONFIRMATION_PROMPT
+
+        for msg in reversed(messages):
+            if msg.role == "assistant":
+                return msg.content == DISCONNECT_CONFIRMATION_PROMPT
+        return False
+
+    def _prepare(
         self,
         message: str,
-        conversation: Optional[ConversationState] = None,
-        intents: Optional[Dict[str, List[str]]] = None
-    ) -> str:
-        """Classify a message into an intent"""
-        # Use default intents if none provided
-        if not intents:
-            intents = {
-                "wants_disconnect": [
-                    "I want to disconnect",
-                    "Please end this chat",
-                    "Close this conversation",
-                    "End chat",
-                    "Bye",
-                    "Goodbye"
-                ],
-                "confirms_disconnect": [
-                    "Yes, please disconnect",
-                    "Yes, end the chat",
-                    "Yes, close the conversation",
-                    "Yes, goodbye",
-                    "Confirm disconnect"
-                ],
-                "needs_agent": [
-                    "I need to speak with a human",
-                    "Connect me to an agent",
-                    "Talk to customer service",
-                    "Speak with representative",
-                    "Talk to human"
-                ],
-                "needs_rm": [
-                    "I need my relationship manager",
-                    "Connect me to my RM",
-                    "Speak with relationship manager",
-                    "Talk to RM"
-                ]
-            }
-            
-        # Format conversation context
-        context = ""
+        conversation: Optional[ConversationState],
+        intents: Dict[str, List[str]]
+    ) -> Tuple[Optional[str], str, Dict[str, Any]]:
+        """Resolve a message locally or from the cache, or build the model request
+
+        Returns (intent, cache key, request kwargs); intent is None when the model must be called.
+        """
+        intents = self._intent_examples(intents)
+        messages = []
         if conversation:
-            messages = []
             if isinstance(conversation, list):
                 messages = conversation
             elif hasattr(conversation, 'messages'):
                 messages = conversation.messages
-                
-            if messages:
-                context = "\n".join([
-                    f"{msg.role}: {msg.content}"
-                    for msg in messages[-5:]  # Last 5 messages
-                ])
+
+        # Resolve unambiguous messages locally without a model call, except right after the
+        # disconnect confirmation prompt, where "bye" confirms rather than asks to disconnect
+        if self.fast_path and not self._awaiting_disconnect_confirmation(messages):
+            start = time.perf_counter()
+            local_intent, confidence = self._rule_classifier(intents).classify(message)
+            if local_intent and local_intent not in CONTEXT_DEPENDENT_INTENTS:
+                self.stats.record_local(time.perf_counter() - start)
+                print(f"Classified locally as {local_intent} (confidence {confidence:.2f})")
+                return local_intent, "", {}
+            
+        # Format conversation context
+        context = ""
+        if messages:
+            context = "\n".join([
+                f"{msg.role}: {msg.content}"
+                for msg in messages[-CONTEXT_MESSAGES:]
+            ])
+            
+        # Reuse the classification of the same phrasing in the same context
+        cache_key = self.cache.key(message, intents, context)
+        cached_intent = self.cache.get(cache_key)
+        if cached_intent:
+            return cached_intent, cache_key, {}
             
         # Create prompt
         prompt = f"""Given the following message and conversation context, classify the message into one of these intents: {list(intents.keys())}
@@ -91,22 +272,68 @@ Message to classify:
 
 Return ONLY the intent name, nothing else. If no intent matches, return "general_query"."""
 
-        # Get classification from OpenAI
-        response = self.client.chat.completions.create(
-            model=self.deployment,
-            messages=[
+        request = {
+            "model": self.deployment,
+            "messages": [
                 {"role": "system", "content": "You are a helpful message classification assistant."},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0,
-            max_tokens=20
-        )
+            "temperature": 0,
+            "max_tokens": 20
+        }
+        return None, cache_key, request
+
+    def _finish(self, response: Any, intents: Dict[str, List[str]], cache_key: str, elapsed: float) -> str:
+        """Validate and cache the intent returned by the model"""
+        self.stats.record_llm(elapsed)
         
         # Get intent from response
         intent = response.choices[0].message.content.strip().lower()
         
         # Validate intent
         if intent not in list(intents.keys()) + ["general_query"]:
-            return "general_query"
+            intent = "general_query"
             
+        self.cache.set(cache_key, intent)
         return intent
+        
+    def classify_message(
+        self,
+        message: str,
+        conversation: Optional[ConversationState] = None,
+        intents: Optional[Dict[str, List[str]]] = None
+    ) -> str:
+        """Classify a message into an intent"""
+        # Use default intents if none provided
+        if not intents:
+            intents = DEFAULT_INTENTS
+
+        intent, cache_key, request = self._prepare(message, conversation, intents)
+        if intent:
+            return intent
+
+        # Get classification from OpenAI
+        start = time.perf_counter()
+        response = self.client.chat.completions.create(**request)
+        return self._finish(response, intents, cache_key, time.perf_counter() - start)
+
+    async def aclassify_message(
+        self,
+        message: str,
+        conversation: Optional[ConversationState] = None,
+        intents: Optional[Dict[str, List[str]]] = None
+    ) -> str:
+        """Async variant of classify_message"""
+        if not intents:
+            intents = DEFAULT_INTENTS
+
+        intent, cache_key, request = self._prepare(message, conversation, intents)
+        if intent:
+            return intent
+
+        start = time.perf_counter()
+        if self.async_client:
+            response = await self.async_client.chat.completions.create(**request)
+        else:
+            response = await asyncio.to_thread(self.client.chat.completions.create, **request)
+        return self._finish(response, intents, cache_key, time.perf_counter() - start)
@@ -0,0 +1,90 @@
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Words that carry no intent on their own; they do not count against a phrase match
+FILLER_WORDS = {
+    "a", "an", "the", "please", "pls", "plz", "ok", "okay", "thanks", "thank", "you", "hi",
+    "hey", "hello", "now", "just", "i", "me", "my", "want", "would", "like", "can", "could",
+    "yes", "yeah", "right", "away", "asap", "kindly", "to", "i'd", "i'm"
+}
+
+_NON_WORD = re.compile(r"[^a-z0-9' ]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    text = text.lower().replace("’", "'")
+    text = _NON_WORD.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+class RuleBasedClassifier:
+    """Zero-network intent classifier compiled from intent example phrases
+
+    A message matches a phrase when the phrase's words appear contiguously in the
+    message. An intent's confidence is the share of the message's non-filler words
+    covered by its matched phrases. "Talk to human, please" scores 1.0 for needs_agent.
+    "No, I want to know about my policy" scores only 0.2 for confirms_disconnect.
+    """
+
+    def __init__(
+        self,
+        intents: Dict[str, Iterable[str]],
+        min_confidence: float = 0.8,
+        min_margin: float = 0.3,
+        max_words: int = 12
+    ):
+        """
+        Args:
+            intents: Intent name to example phrases
+            min_confidence: Lowest confidence accepted without consulting the LLM
+            min_margin: Required lead of the best intent over the runner-up
+            max_words: Longer messages are always left to the LLM
+        """
+        self.min_confidence = min_confidence
+        self.min_margin = min_margin
+        self.max_words = max_words
+
+        # First word -> [(phrase words, intent)] so matching only tries plausible phrases
+        self._phrases: Dict[str, List[Tuple[Tuple[str, ...], str]]] = {}
+        for intent, examples in intents.items():
+            for example in examples:
+                words = tuple(normalize(example).split())
+                if words:
+                    self._phrases.setdefault(words[0], []).append((words, intent))
+
+    def score(self, message: str) -> Dict[str, float]:
+        """Confidence per matching intent"""
+        words = normalize(message).split()
+        content = [i for i, word in enumerate(words) if word not in FILLER_WORDS]
+        if not words:
+            return {}
+
+        covered: Dict[str, Set[int]] = {}
+        for start, word in enumerate(words):
+            for phrase, intent in self._phrases.get(word, ()):
+                if tuple(words[start:start + len(phrase)]) == phrase:
+                    covered.setdefault(intent, set()).update(range(start, start + len(phrase)))
+
+        scores = {}
+        for intent, positions in covered.items():
+            if content:
+                scores[intent] = sum(1 for i in content if i in positions) / len(content)
+            else:
+                # Message is all filler words, e.g. "thank you"; only an exact match counts
+                scores[intent] = 1.0 if len(positions) == len(words) else 0.0
+        return scores
+
+    def classify(self, message: str) -> Tuple[Optional[str], float]:
+        """Return (intent, confidence), with intent None when the LLM should decide"""
+        if len(normalize(message).split()) > self.max_words:
+            return None, 0.0
+        ranked = sorted(self.score(message).items(), key=lambda item: item[1], reverse=True)
+        if not ranked:
+            return None, 0.0
+        best_intent, best = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        if best >= self.min_confidence and best - runner_up >= self.min_margin:
+            return best_intent, best
+        return None, best
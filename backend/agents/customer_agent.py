@@ -1,19 +1,89 @@
-from typing import List, Dict, Tuple, Optional
+from typing import Any, List, Dict, Tuple, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+import asyncio
+import json
 import os
+import threading
+import time
 from datetime import datetime
-from openai import AzureOpenAI
+from openai import AzureOpenAI, AsyncAzureOpenAI
 from managers.customer_manager import CustomerManager, Customer
 from managers.policy_manager import PolicyManager
 from managers.chat_manager import ChatThreadManager
 from managers.escalation_manager import EscalationManager
 from .core.base_agent import BaseAgent
-from .core.message_classifier import MessageClassifier
-from .core.agent_types import AgentType, ConversationState
+from .core.message_classifier import MessageClassifier, DEFAULT_INTENTS
+from .core.agent_types import AgentType, ChunkCallback, ConversationState
 from .human_agent import HumanAgent
 
+UNREGISTERED_GREETING = "Hello there! \nThank you for reaching out to us. Please contact Hieu App GBB to access the ContosoAssist - WhatsApp Contact Center Service!"
+
+class SpeculationStats:
+    """Counts speculative answers that were used or thrown away, and the tokens wasted on them"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = 0
+        self.used = 0
+        self.discarded = 0
+        self.cancelled = 0
+        self.wasted_tokens = 0
+        self.wasted_tokens_estimated = 0
+        self.seconds_saved = 0.0
+
+    def record_started(self):
+        with self._lock:
+            self.started += 1
+
+    def record_used(self, seconds_saved: float):
+        with self._lock:
+            self.used += 1
+            self.seconds_saved += seconds_saved
+
+    def record_discarded(self, response: Any):
+        """Count a discarded answer whose completion finished, using its reported token usage"""
+        usage = getattr(response, "usage", None)
+        with self._lock:
+            self.discarded += 1
+            self.wasted_tokens += getattr(usage, "total_tokens", 0) or 0
+
+    def record_cancelled(self, estimated_tokens: int):
+        """Count an answer cancelled in flight; the prompt may already have been billed"""
+        with self._lock:
+            self.discarded += 1
+            self.cancelled += 1
+            self.wasted_tokens_estimated += estimated_tokens
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "started": self.started,
+                "used": self.used,
+                "discarded": self.discarded,
+                "cancelled_in_flight": self.cancelled,
+                "wasted_tokens": self.wasted_tokens,
+                "wasted_tokens_estimated": self.wasted_tokens_estimated,
+                "latency_saved_ms": round(self.seconds_saved * 1000, 2)
+            }
+
 class CustomerAgent(BaseAgent):
-    def __init__(self, openai_client: AzureOpenAI, customer_manager: CustomerManager, policy_manager: PolicyManager, chat_manager: ChatThreadManager, escalation_manager: EscalationManager):
-        super().__init__(openai_client)
+    def __init__(
+        self,
+        openai_client: AzureOpenAI,
+        customer_manager: CustomerManager,
+        policy_manager: PolicyManager,
+        chat_manager: ChatThreadManager,
+        escalation_manager: EscalationManager,
+        async_client: Optional[AsyncAzureOpenAI] = None,
+        classifier: Optional[MessageClassifier] = None,
+        human_agent: Optional[HumanAgent] = None
+    ):
+        """
+        Args:
+            classifier: Shared classifier; one is created if not given
+            human_agent: Shared agent that handles escalation and disconnects; one is created if not given
+        """
+        super().__init__(openai_client, async_client)
         self.customer_manager = customer_manager
         self.policy_manager = policy_manager
         self.chat_manager = chat_manager
@@ -21,8 +91,19 @@ class CustomerAgent(BaseAgent):
         deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT")
         if not deployment:
             raise ValueError("AZURE_OPENAI_DEPLOYMENT environment variable not set")
-        self.classifier = MessageClassifier(openai_client, deployment)
+        self.classifier = classifier or MessageClassifier(openai_client, deployment, async_client)
+        self.human_agent = human_agent or HumanAgent(
+            openai_client, deployment, chat_manager, escalation_manager, async_client, classifier=self.classifier
+        )
         self.agent_type = AgentType.CUSTOMER_AGENT
+        
+        # "sequential": classify, then answer in separate calls
+        # "unified": classify and answer in one structured completion, falling back to sequential
+        # "speculative": request the answer while classifying, discarding it if the turn escalates
+        self.routing_mode = os.getenv("CUSTOMER_AGENT_ROUTING_MODE", "sequential").lower()
+        self.unified_fallbacks = 0
+        self.speculation = SpeculationStats()
+        self._speculation_pool: Optional[ThreadPoolExecutor] = None
 
     def _format_customer_info(self, customer: Customer) -> str:
         """Format customer information for display"""
@@ -45,25 +126,36 @@ class CustomerAgent(BaseAgent):
 
 How can I assist you today?"""
 
-    def _handle_greeting(self, customer: Optional[Customer]) -> str:
-        """Generate a personalized greeting using OpenAI"""
+    def _greeting_request(self, customer: Customer) -> Dict[str, Any]:
+        """Build the completion request for a personalized greeting"""
         current_time = datetime.now()
-        
-        if customer and customer.phoneNumber:  # Check if it's a registered customer
-            prompt = f"""Generate a warm, personalized greeting for our customer for Contoso Insurance.
+        prompt = f"""Generate a warm, personalized greeting for our customer for Contoso Insurance.
             Current time: {current_time}
             Customer info: {customer}
             Make it concise in a few lines, not like an email"""
-            
-            response = self.client.chat.completions.create(
-                model=self.deployment,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=1,
-                max_tokens=100
-            )
+        
+        return {
+            "model": self.deployment,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 1,
+            "max_tokens": 100
+        }
+
+    def _handle_greeting(self, customer: Optional[Customer]) -> str:
+        """Generate a personalized greeting using OpenAI"""
+        if customer and customer.phoneNumber:  # Check if it's a registered customer
+            response = self.client.chat.completions.create(**self._greeting_request(customer))
+            return response.choices[0].message.content.strip()
+        else:
+            return UNREGISTERED_GREETING
+
+    async def _ahandle_greeting(self, customer: Optional[Customer]) -> str:
+        """Async variant of _handle_greeting"""
+        if customer and customer.phoneNumber:
+            response = await self._acomplete(**self._greeting_request(customer))
             return response.choices[0].message.content.strip()
         else:
-            return "Hello there! \nThank you for reaching out to us. Please contact Hieu App GBB to access the ContosoAssist - WhatsApp Contact Center Service!"
+            return UNREGISTERED_GREETING
 
     def _handle_help_query(self, customer: Customer) -> str:
         """Handle help/capability queries"""
@@ -186,29 +278,273 @@ How can I assist you today?"""
                 conv.customer_info = self._format_customer_info(customer)
                 
             # First check if message needs escalation
-            human_agent = HumanAgent(self.client, self.deployment, self.chat_manager, self.escalation_manager)
-            try:
-                escalation_result = human_agent.check_and_handle_escalation(user_id, message, conv, customer)
-                if escalation_result:
-                    return escalation_result
-            except ValueError as e:
-                if "high traffic" in str(e):
-                    # If we hit TooManyRequests, return a friendly message and stay with customer agent
-                    return str(e), self.agent_type
-                raise
+            if self.routing_mode == "unified":
+                routed = self._route_unified(user_id, message, conv, customer)
+                if routed:
+                    return routed
+            elif self.routing_mode == "speculative":
+                routed = self._route_speculative(user_id, message, conv, customer)
+                if routed:
+                    return routed
+                    
+            escalation_result = self.human_agent.check_and_handle_escalation(user_id, message, conv, customer)
+            if escalation_result:
+                return escalation_result
         except Exception as e:
             return str(e), self.agent_type
 
         # If no escalation needed, handle as normal query
         return self._handle_general_query(user_id, message, customer, conv)
 
-    def _handle_general_query(self, user_id: str, message: str, customer: Customer, conv: ConversationState) -> Tuple[str, AgentType]:
-        """Handle general query"""
-        # Handle other message types
-        if "who am i" in message.lower() or "my info" in message.lower():
+    async def aprocess_message(self, user_id: str, message: str, conv: ConversationState, customer: Optional[Customer] = None, on_chunk: Optional[ChunkCallback] = None) -> Tuple[str, AgentType]:
+        """Async variant of process_message
+
+        With streaming enabled, a general query answer is also streamed to on_chunk as it is generated.
+        """
+        try:
+            if customer and not conv.customer_info:
+                conv.customer_info = self._format_customer_info(customer)
+                
+            if self.routing_mode == "unified":
+                routed = await self._aroute_unified(user_id, message, conv, customer)
+                if routed:
+                    return routed
+            elif self.routing_mode == "speculative":
+                routed = await self._aroute_speculative(user_id, message, conv, customer)
+                if routed:
+                    return routed
+                    
+            escalation_result = await self.human_agent.acheck_and_handle_escalation(user_id, message, conv, customer)
+            if escalation_result:
+                return escalation_result
+        except Exception as e:
+            return str(e), self.agent_type
+
+        return await self._ahandle_general_query(user_id, message, customer, conv, on_chunk)
+
+    def _unified_routing_request(self, message: str, conv: ConversationState, customer: Customer) -> Dict[str, Any]:
+        """Build the completion request that classifies and answers a message in one call"""
+        system_prompt = f"""You are an AI insurance assistant for Contoso Insurance. Route and answer the customer's latest message in a single step.
+
+{self._format_customer_info(customer)}
+Current time: {datetime.now()}
+
+Classify the latest message into exactly one intent:
+{json.dumps(DEFAULT_INTENTS, indent=2)}
+- "greeting": the customer is greeting you
+- "general_query": anything else
+
+Respond with a JSON object with these keys:
+- "intent": the intent name
+- "target_agent": "contact_center" for needs_agent, "relationship_manager" for needs_rm, "policy_agent" for questions about the customer's policies, otherwise "customer_agent"
+- "answer": for greeting, a warm, personalized greeting in a few lines (not like an email); for general_query, a direct answer using the customer context, only suggesting escalation if you really cannot help; an empty string for every other intent"""
+
+        messages = [{"role": "system", "content": system_prompt}]
+        if conv.last_summary:
+            messages.append({"role": "system", "content": f"Previous conversation context: {conv.last_summary}"})
+        
+        # Recent turns give the model the context it needs, e.g. for confirms_disconnect
+        recent = [{"role": m.role, "content": m.content} for m in conv.messages[-5:]]
+        if not recent or recent[-1] != {"role": "user", "content": message}:
+            recent.append({"role": "user", "content": message})
+            
+        return {
+            "model": self.deployment,
+            "messages": messages + recent,
+            "response_format": {"type": "json_object"},
+            "temperature": 0.3,
+            "max_tokens": 300
+        }
+
+    def _parse_route(self, response: Any) -> Tuple[str, str, str]:
+        """Return (intent, target agent, answer) from a unified routing completion"""
+        route = json.loads(response.choices[0].message.content)
+        intent = str(route.get("intent", "")).strip().lower()
+        target_agent = str(route.get("target_agent", "")).strip().lower()
+        answer = (route.get("answer") or "").strip()
+        return intent, target_agent, answer
+
+    def _answer_route(self, intent: str, target_agent: str, answer: str, message: str, customer: Customer) -> Optional[Tuple[str, AgentType]]:
+        """Turn a routed greeting or general query into a reply, or None to fall back"""
+        if intent == "general_query":
+            # Answers built from customer data take precedence over generated ones
+            local_response = self._handle_local_query(message, customer)
+            if local_response:
+                return local_response
+        elif intent != "greeting":
+            answer = ""
+            
+        if not answer:
+            print(f"Unified routing returned no usable answer for intent '{intent}', falling back to sequential routing")
+            self.unified_fallbacks += 1
+            return None
+            
+        return answer, AgentType.POLICY_AGENT if target_agent == "policy_agent" else AgentType.CUSTOMER_AGENT
+
+    def _route_unified(self, user_id: str, message: str, conv: ConversationState, customer: Optional[Customer]) -> Optional[Tuple[str, AgentType]]:
+        """Classify, route and answer with one structured completion
+
+        Returns None when the sequential path should handle the message instead.
+        """
+        # Unregistered customers get a fixed reply from the sequential path
+        if not customer or not customer.phoneNumber:
+            return None
+            
+        try:
+            response = self.client.chat.completions.create(**self._unified_routing_request(message, conv, customer))
+            intent, target_agent, answer = self._parse_route(response)
+        except Exception as e:
+            print(f"Unified routing failed, falling back to sequential routing: {e}")
+            self.unified_fallbacks += 1
+            return None
+            
+        if intent == "wants_disconnect":
+            return self.human_agent.handle_disconnect(user_id, conv)
+        elif intent == "confirms_disconnect":
+            return self.human_agent.handle_disconnect(user_id, conv, is_confirmation=True)
+        elif intent == "needs_agent":
+            return self.human_agent.handle_escalation(user_id, message, conv, customer, AgentType.CONTACT_CENTER)
+        elif intent == "needs_rm":
+            return self.human_agent.handle_escalation(user_id, message, conv, customer, AgentType.RELATIONSHIP_MANAGER)
+            
+        return self._answer_route(intent, target_agent, answer, message, customer)
+
+    async def _aroute_unified(self, user_id: str, message: str, conv: ConversationState, customer: Optional[Customer]) -> Optional[Tuple[str, AgentType]]:
+        """Async variant of _route_unified"""
+        if not customer or not customer.phoneNumber:
+            return None
+            
+        try:
+            response = await self._acomplete(**self._unified_routing_request(message, conv, customer))
+            intent, target_agent, answer = self._parse_route(response)
+        except Exception as e:
+            print(f"Unified routing failed, falling back to sequential routing: {e}")
+            self.unified_fallbacks += 1
+            return None
+            
+        if intent == "wants_disconnect":
+            return await self.human_agent.ahandle_disconnect(user_id, conv)
+        elif intent == "confirms_disconnect":
+            return await self.human_agent.ahandle_disconnect(user_id, conv, is_confirmation=True)
+        elif intent == "needs_agent":
+            return await self.human_agent.ahandle_escalation(user_id, message, conv, customer, AgentType.CONTACT_CENTER)
+        elif intent == "needs_rm":
+            return await self.human_agent.ahandle_escalation(user_id, message, conv, customer, AgentType.RELATIONSHIP_MANAGER)
+            
+        return self._answer_route(intent, target_agent, answer, message, customer)
+
+    def _speculative_request(self, message: str, customer: Optional[Customer], conv: ConversationState) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Build the answer request the sequential path would make
+
+        Returns (request, is_greeting); request is None when the sequential path makes no model call.
+        """
+        if not customer or not customer.phoneNumber:
+            return None, False
+        if self._is_greeting(message) and not self._is_identity_query(message):
+            return self._greeting_request(customer), True
+        if self._handle_local_query(message, customer):
+            return None, False
+        return self._general_query_request(message, customer, conv), False
+
+    def _timed_completion(self, request: Dict[str, Any]) -> Tuple[Any, float]:
+        start = time.perf_counter()
+        return self.client.chat.completions.create(**request), time.perf_counter() - start
+
+    async def _atimed_completion(self, request: Dict[str, Any]) -> Tuple[Any, float]:
+        start = time.perf_counter()
+        return await self._acomplete(**request), time.perf_counter() - start
+
+    def _use_speculation(self, completion: Tuple[Any, float], is_greeting: bool, classify_seconds: float, start: float) -> Tuple[str, AgentType]:
+        """Count the latency the overlap saved and return the speculative answer"""
+        response, answer_seconds = completion
+        self.speculation.record_used(classify_seconds + answer_seconds - (time.perf_counter() - start))
+        content = response.choices[0].message.content
+        return (content.strip() if is_greeting else content), AgentType.CUSTOMER_AGENT
+
+    def _estimate_prompt_tokens(self, request: Dict[str, Any]) -> int:
+        """Rough token count of a request's prompt (about 4 characters per token)"""
+        return sum(len(m["content"] or "") for m in request["messages"]) // 4
+
+    def _route_speculative(self, user_id: str, message: str, conv: ConversationState, customer: Optional[Customer]) -> Optional[Tuple[str, AgentType]]:
+        """Classify and generate the answer concurrently, keeping the answer only if the turn does not escalate
+
+        Returns None when the turn needs no model answer, so the sequential path handles it.
+        """
+        request, is_greeting = self._speculative_request(message, customer, conv)
+        if request is None:
+            return None
+            
+        if self._speculation_pool is None:
+            self._speculation_pool = ThreadPoolExecutor(
+                max_workers=int(os.getenv("CUSTOMER_AGENT_SPECULATION_WORKERS", "8")),
+                thread_name_prefix="speculation"
+            )
+        start = time.perf_counter()
+        answer: Future = self._speculation_pool.submit(self._timed_completion, request)
+        self.speculation.record_started()
+        try:
+            escalation_result = self.human_agent.check_and_handle_escalation(user_id, message, conv, customer)
+        except BaseException:
+            self._discard_speculation(answer)
+            raise
+        classify_seconds = time.perf_counter() - start
+        
+        if escalation_result:
+            self._discard_speculation(answer)
+            return escalation_result
+        return self._use_speculation(answer.result(), is_greeting, classify_seconds, start)
+
+    def _discard_speculation(self, answer: Future):
+        """Drop a speculative answer; a completion already in flight is counted when it returns"""
+        if answer.cancel():
+            self.speculation.record_cancelled(0)
+            return
+        
+        def record(future: Future):
+            if not future.exception():
+                self.speculation.record_discarded(future.result()[0])
+        answer.add_done_callback(record)
+
+    async def _aroute_speculative(self, user_id: str, message: str, conv: ConversationState, customer: Optional[Customer]) -> Optional[Tuple[str, AgentType]]:
+        """Async variant of _route_speculative; an escalation cancels the answer request in flight"""
+        request, is_greeting = self._speculative_request(message, customer, conv)
+        if request is None:
+            return None
+            
+        start = time.perf_counter()
+        answer = asyncio.create_task(self._atimed_completion(request))
+        self.speculation.record_started()
+        try:
+            escalation_result = await self.human_agent.acheck_and_handle_escalation(user_id, message, conv, customer)
+        except BaseException:
+            await self._adiscard_speculation(answer, request)
+            raise
+        classify_seconds = time.perf_counter() - start
+        
+        if escalation_result:
+            await self._adiscard_speculation(answer, request)
+            return escalation_result
+        return self._use_speculation(await answer, is_greeting, classify_seconds, start)
+
+    async def _adiscard_speculation(self, answer: "asyncio.Task", request: Dict[str, Any]):
+        if answer.done():
+            if not answer.cancelled() and not answer.exception():
+                self.speculation.record_discarded(answer.result()[0])
+            return
+        answer.cancel()
+        await asyncio.gather(answer, return_exceptions=True)
+        self.speculation.record_cancelled(self._estimate_prompt_tokens(request))
+
+    def _is_identity_query(self, message: str) -> bool:
+        return "who am i" in message.lower() or "my info" in message.lower()
+
+    def _is_greeting(self, message: str) -> bool:
+        return any(greeting in message.lower() for greeting in ["hi", "hello", "hey", "good morning", "good afternoon", "good evening"])
+
+    def _handle_local_query(self, message: str, customer: Customer) -> Optional[Tuple[str, AgentType]]:
+        """Answer identity, help and policy queries from customer data, without a model call"""
+        if self._is_identity_query(message):
             return self._handle_identity_query(customer), AgentType.CUSTOMER_AGENT
-        elif any(greeting in message.lower() for greeting in ["hi", "hello", "hey", "good morning", "good afternoon", "good evening"]):
-            return self._handle_greeting(customer), AgentType.CUSTOMER_AGENT
         elif "help" in message.lower() or "what can you do" in message.lower():
             return self._handle_help_query(customer), AgentType.CUSTOMER_AGENT
 
@@ -216,8 +552,10 @@ How can I assist you today?"""
         policy_response = self._handle_policy_query(customer, message)
         if policy_response:
             return policy_response, AgentType.POLICY_AGENT
+        return None
 
-        # Handle general queries with context
+    def _general_query_request(self, message: str, customer: Customer, conv: ConversationState) -> Dict[str, Any]:
+        """Build the completion request that answers a general query with customer context"""
         messages = [
             {"role": "system", "content": f"""You are an AI insurance assistant. Use this customer context in your responses:
 {self._format_customer_info(customer)}
@@ -229,11 +567,38 @@ Try to answer questions directly using this information. Only suggest escalation
         if conv.last_summary:
             messages.insert(1, {"role": "system", "content": f"Previous conversation context: {conv.last_summary}"})
         
-        response = self.client.chat.completions.create(
-            model=self.deployment,
-            messages=messages,
-            temperature=0.7,
-            max_tokens=150
-        )
-        
+        return {
+            "model": self.deployment,
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": 150
+        }
+
+    def _handle_general_query(self, user_id: str, message: str, customer: Customer, conv: ConversationState) -> Tuple[str, AgentType]:
+        """Handle general query"""
+        # Handle other message types
+        if self._is_greeting(message) and not self._is_identity_query(message):
+            return self._handle_greeting(customer), AgentType.CUSTOMER_AGENT
+            
+        local_response = self._handle_local_query(message, customer)
+        if local_response:
+            return local_response
+
+        # Handle general queries with context
+        response = self.client.chat.completions.create(**self._general_query_request(message, customer, conv))
+        return response.choices[0].message.content, AgentType.CUSTOMER_AGENT
+
+    async def _ahandle_general_query(self, user_id: str, message: str, customer: Customer, conv: ConversationState, on_chunk: Optional[ChunkCallback] = None) -> Tuple[str, AgentType]:
+        """Async variant of _handle_general_query"""
+        if self._is_greeting(message) and not self._is_identity_query(message):
+            return await self._ahandle_greeting(customer), AgentType.CUSTOMER_AGENT
+            
+        local_response = self._handle_local_query(message, customer)
+        if local_response:
+            return local_response
+
+        request = self._general_query_request(message, customer, conv)
+        if self.streaming and on_chunk:
+            return await self._astream_reply(on_chunk, AgentType.CUSTOMER_AGENT, **request), AgentType.CUSTOMER_AGENT
+        response = await self._acomplete(**request)
         return response.choices[0].message.content, AgentType.CUSTOMER_AGENT
@@ -1,4 +1,5 @@
-from typing import Dict, Optional, Tuple, List
+from typing import Any, Dict, Optional, Tuple, List
+import asyncio
 import json
 import sys
 import os
@@ -6,21 +7,21 @@ import os
 # Add backend directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from openai import AzureOpenAI
+from openai import AzureOpenAI, AsyncAzureOpenAI
 from managers.customer_manager import Customer
 from managers.chat_manager import ChatThreadManager
 from managers.escalation_manager import EscalationManager
 from .core.message_classifier import MessageClassifier
 from .core.base_agent import BaseAgent
 from .core.agent_types import AgentType, ConversationState
-from .core.intents import DISCONNECT_INTENTS
+from .core.intents import DISCONNECT_INTENTS, DISCONNECT_CONFIRMATION_PROMPT
 
 class HumanAgent(BaseAgent):
-    def __init__(self, client: AzureOpenAI, deployment: str, chat_manager: ChatThreadManager, escalation_manager: EscalationManager):
-        super().__init__(client)
+    def __init__(self, client: AzureOpenAI, deployment: str, chat_manager: ChatThreadManager, escalation_manager: EscalationManager, async_client: Optional[AsyncAzureOpenAI] = None, classifier: Optional[MessageClassifier] = None):
+        super().__init__(client, async_client)
         self.chat_manager = chat_manager
         self.escalation_manager = escalation_manager
-        self.classifier = MessageClassifier(client, deployment)
+        self.classifier = classifier or MessageClassifier(client, deployment, async_client)
         self.agent_type = AgentType.CONTACT_CENTER
 
     def process_message(self, user_id: str, message: str, conv: ConversationState, customer: Optional[Customer] = None) -> str:
@@ -29,16 +30,10 @@ class HumanAgent(BaseAgent):
         if conv.chat_thread_id:
             self.escalation_manager.update_escalation(conv.chat_thread_id, message, "user")
         
-        # Convert intents to dictionary format
-        intents = {
-            intent.name: intent.examples
-            for intent in DISCONNECT_INTENTS
-        }
-        
         # Classify message against disconnect intents
         result = self.classifier.classify_message(
             message, 
-            intents=intents,
+            intents=self._disconnect_intents(),
             conversation=conv
         )
         
@@ -53,6 +48,30 @@ class HumanAgent(BaseAgent):
         # For normal messages, just record in chat thread without responding
         return None
 
+    async def aprocess_message(self, user_id: str, message: str, conv: ConversationState, customer: Optional[Customer] = None) -> str:
+        """Async variant of process_message"""
+        if conv.chat_thread_id:
+            await asyncio.to_thread(self.escalation_manager.update_escalation, conv.chat_thread_id, message, "user")
+        
+        result = await self.classifier.aclassify_message(
+            message, 
+            intents=self._disconnect_intents(),
+            conversation=conv
+        )
+        
+        if result == "wants_disconnect":
+            return (await self.ahandle_disconnect(user_id, conv))[0]
+        if result == "confirms_disconnect":
+            return (await self.ahandle_disconnect(user_id, conv, is_confirmation=True))[0]
+        return None
+
+    def _disconnect_intents(self) -> Dict[str, List[str]]:
+        """Convert disconnect intents to dictionary format"""
+        return {
+            intent.name: intent.examples
+            for intent in DISCONNECT_INTENTS
+        }
+
     def process_media(self, user_id: str, media_type: str, filepath: str, conv: ConversationState) -> str:
         """Process a media message in a human agent conversation"""
         message = f"[Received {media_type}: {filepath}]"
@@ -84,59 +103,78 @@ class HumanAgent(BaseAgent):
             
         return None  # No escalation needed
 
+    async def acheck_and_handle_escalation(self, user_id: str, message: str, conv: ConversationState, customer: Optional[Customer] = None) -> Optional[Tuple[str, AgentType]]:
+        """Async variant of check_and_handle_escalation"""
+        intent = await self.classifier.aclassify_message(message, conv)
+        
+        if intent == "wants_disconnect":
+            return await self.ahandle_disconnect(user_id, conv)
+        elif intent == "confirms_disconnect":
+            return await self.ahandle_disconnect(user_id, conv, is_confirmation=True)
+        elif intent == "needs_agent":
+            return await self.ahandle_escalation(user_id, message, conv, customer, AgentType.CONTACT_CENTER)
+        elif intent == "needs_rm":
+            return await self.ahandle_escalation(user_id, message, conv, customer, AgentType.RELATIONSHIP_MANAGER)
+            
+        return None
+
     def handle_escalation(self, user_id: str, message: str, conv: ConversationState, customer: Optional[Customer] = None, escalation_type: AgentType = AgentType.CONTACT_CENTER) -> Tuple[str, AgentType]:
         """Handle escalation to human agent (either Contact Center or RM)"""
         try:
             # Get conversation summary if we have messages
             summary = ""
             if conv.messages:
-                summary = self._get_conversation_summary([{"role": m.role, "content": m.content} for m in conv.messages])
-            
-            # Create chat thread for escalation if not exists
-            if not conv.chat_thread_id:
-                thread_id, escalation = self.escalation_manager.create_escalation(
-                    customer=customer,
-                    recent_messages=[{"role": m.role, "content": m.content} for m in conv.messages[-20:]] if conv.messages else []
-                )
-                conv.chat_thread_id = thread_id
-                conv.last_summary = summary
-
-            # Add system message about escalation
-            if escalation_type == AgentType.RELATIONSHIP_MANAGER:
-                response = (
-                    f"As a VIP customer, I'll connect you with your dedicated Relationship Manager.\n\n"
-                    f"Chat Thread URL: https://hieuacschat.azurewebsites.net?threadId={conv.chat_thread_id}\n"
-                    f"Summary of conversation:\n{summary}"
-                )
-            else:
-                response = (
-                    f"I'll connect you with our Contact Center Agent right away.\n\n"
-                    f"Chat Thread URL: https://hieuacschat.azurewebsites.net?threadId={conv.chat_thread_id}\n"
-                    f"Summary of conversation:\n{summary}\n\n"
-                    f"You can type 'disconnect' at any time to end the conversation.\n"
-                    "A human agent will be with you shortly."
-                )
-
-            # Update escalation with the response
-            try:
-                self.escalation_manager.update_escalation_messages(
-                    conv.chat_thread_id,
-                    [{"role": m.role, "content": m.content} for m in conv.messages] + 
-                    [{"role": "assistant", "content": response}] if conv.messages else [{"role": "assistant", "content": response}]
-                )
-            except ValueError as e:
-                if "high traffic" in str(e):
-                    # If we hit TooManyRequests, pass the error up
-                    raise
-                
-            # Return escalation message
-            return response, escalation_type
+                summary = self._get_conversation_summary([{"role": m.role, "content": m.content} for m in conv.messages], conv.last_summary)
+            return self._open_escalation(conv, customer, summary, escalation_type)
         except ValueError as e:
-            if "high traffic" in str(e):
-                raise
             print(f"Error in handle_escalation: {e}")
             return str(e), AgentType.CUSTOMER_AGENT
 
+    async def ahandle_escalation(self, user_id: str, message: str, conv: ConversationState, customer: Optional[Customer] = None, escalation_type: AgentType = AgentType.CONTACT_CENTER) -> Tuple[str, AgentType]:
+        """Async variant of handle_escalation; the chat thread calls run on a worker thread"""
+        try:
+            summary = ""
+            if conv.messages:
+                summary = await self._aget_conversation_summary([{"role": m.role, "content": m.content} for m in conv.messages], conv.last_summary)
+            return await asyncio.to_thread(self._open_escalation, conv, customer, summary, escalation_type)
+        except ValueError as e:
+            print(f"Error in handle_escalation: {e}")
+            return str(e), AgentType.CUSTOMER_AGENT
+
+    def _open_escalation(self, conv: ConversationState, customer: Optional[Customer], summary: str, escalation_type: AgentType) -> Tuple[str, AgentType]:
+        """Create the escalation chat thread if needed and build the hand-off message
+
+        The conversation so far is transferred into a new thread once, by create_escalation.
+        The hand-off message is forwarded to the thread with the rest of the turn's reply.
+        """
+        # Create chat thread for escalation if not exists
+        if not conv.chat_thread_id:
+            thread_id, escalation = self.escalation_manager.create_escalation(
+                customer=customer,
+                recent_messages=[{"role": m.role, "content": m.content} for m in conv.messages]
+            )
+            conv.chat_thread_id = thread_id
+            conv.last_summary = summary
+
+        # Add system message about escalation
+        if escalation_type == AgentType.RELATIONSHIP_MANAGER:
+            response = (
+                f"As a VIP customer, I'll connect you with your dedicated Relationship Manager.\n\n"
+                f"Chat Thread URL: https://hieuacschat.azurewebsites.net?threadId={conv.chat_thread_id}\n"
+                f"Summary of conversation:\n{summary}"
+            )
+        else:
+            response = (
+                f"I'll connect you with our Contact Center Agent right away.\n\n"
+                f"Chat Thread URL: https://hieuacschat.azurewebsites.net?threadId={conv.chat_thread_id}\n"
+                f"Summary of conversation:\n{summary}\n\n"
+                f"You can type 'disconnect' at any time to end the conversation.\n"
+                "A human agent will be with you shortly."
+            )
+            
+        # Return escalation message
+        return response, escalation_type
+
     def handle_disconnect(self, user_id: str, conv: ConversationState, is_confirmation: bool = False) -> Tuple[str, AgentType]:
         """Handle disconnect request or confirmation"""
         if not conv.chat_thread_id:
@@ -151,12 +189,16 @@ class HumanAgent(BaseAgent):
             return response, AgentType.CUSTOMER_AGENT
         else:
             # Ask for confirmation
-            response = "Thank you for chatting with us today. Is there anything else you need help with before you go?"
+            response = DISCONNECT_CONFIRMATION_PROMPT
             self.escalation_manager.update_escalation(conv.chat_thread_id, response, "assistant")
             return response, conv.current_agent
 
-    def _get_conversation_summary(self, messages: List[Dict]) -> str:
-        """Get a summary of the conversation"""
+    async def ahandle_disconnect(self, user_id: str, conv: ConversationState, is_confirmation: bool = False) -> Tuple[str, AgentType]:
+        """Async variant of handle_disconnect; the chat thread calls run on a worker thread"""
+        return await asyncio.to_thread(self.handle_disconnect, user_id, conv, is_confirmation)
+
+    def _summary_request(self, messages: List[Dict], earlier_summary: Optional[str] = None) -> Dict[str, Any]:
+        """Build the completion request that summarizes a conversation"""
         formatted_messages = [
             {
                 "role": "system",
@@ -164,6 +206,10 @@ class HumanAgent(BaseAgent):
             }
         ]
         
+        # Turns that aged out of the message window survive only in the rolling summary
+        if earlier_summary:
+            formatted_messages.append({"role": "system", "content": f"Summary of the earlier conversation: {earlier_summary}"})
+        
         # Add the last 20 messages for context
         for msg in messages[-20:]:
             formatted_messages.append({
@@ -171,11 +217,19 @@ class HumanAgent(BaseAgent):
                 "content": msg["content"]
             })
             
-        response = self.client.chat.completions.create(
-            model=self.deployment,
-            messages=formatted_messages,
-            temperature=0.3,
-            max_tokens=150
-        )
-        
+        return {
+            "model": self.deployment,
+            "messages": formatted_messages,
+            "temperature": 0.3,
+            "max_tokens": 150
+        }
+
+    def _get_conversation_summary(self, messages: List[Dict], earlier_summary: Optional[str] = None) -> str:
+        """Get a summary of the conversation"""
+        response = self.client.chat.completions.create(**self._summary_request(messages, earlier_summary))
+        return response.choices[0].message.content.strip()
+
+    async def _aget_conversation_summary(self, messages: List[Dict], earlier_summary: Optional[str] = None) -> str:
+        """Async variant of _get_conversation_summary"""
+        response = await self._acomplete(**self._summary_request(messages, earlier_summary))
         return response.choices[0].message.content.strip()
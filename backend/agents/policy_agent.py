@@ -1,14 +1,16 @@
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 import json
-from openai import AzureOpenAI
+from openai import AzureOpenAI, AsyncAzureOpenAI
 from managers.customer_manager import Customer
 from managers.policy_manager import PolicyManager
 from .core.base_agent import BaseAgent
-from .core.agent_types import ConversationState, AgentType
+from .core.agent_types import ChunkCallback, ConversationState, AgentType
+
+NO_CUSTOMER_RESPONSE = "I apologize, but I cannot find your customer information. Please contact our support center for assistance."
 
 class PolicyAgent(BaseAgent):
-    def __init__(self, client: AzureOpenAI, policy_manager: PolicyManager):
-        super().__init__(client)
+    def __init__(self, client: AzureOpenAI, policy_manager: PolicyManager, async_client: Optional[AsyncAzureOpenAI] = None):
+        super().__init__(client, async_client)
         self.policy_manager = policy_manager
         self.agent_type = AgentType.POLICY_AGENT
         self.functions = [
@@ -50,12 +52,8 @@ class PolicyAgent(BaseAgent):
         summaries = "\n\n".join(self.policy_manager.format_policy_summary(p) for p in policies)
         return f"Here are your policies:\n\n{summaries}"
 
-    def process_message(self, user_id: str, message: str, conv: ConversationState, customer: Optional[Customer] = None) -> Tuple[str, AgentType]:
-        """Process policy-related messages"""
-        if not customer:
-            return "I apologize, but I cannot find your customer information. Please contact our support center for assistance.", self.agent_type
-
-        # Format messages for the model
+    def _policy_messages(self, message: str, conv: ConversationState, customer: Customer) -> List[Dict]:
+        """Format messages for the model"""
         messages = [
             {
                 "role": "system",
@@ -74,6 +72,42 @@ If you can't find a specific policy number in the query but the user is asking a
         # Add conversation context if available
         if conv.last_summary:
             messages.insert(1, {"role": "system", "content": f"Previous conversation context: {conv.last_summary}"})
+        return messages
+
+    def _call_function(self, function_call, messages: List[Dict], customer: Customer) -> List[Dict]:
+        """Run the function the model asked for and return the messages for the follow-up completion"""
+        func_name = function_call.name
+        func_args = json.loads(function_call.arguments)
+
+        # Call the appropriate function
+        if func_name == "get_policy_details":
+            policy_info = self._get_policy_details(func_args["policy_number"])
+        else:  # list_policies
+            policy_info = self._list_policies(customer)
+
+        # Get a natural language response
+        return messages + [
+            {
+                "role": "assistant",
+                "content": None,
+                "function_call": {
+                    "name": func_name,
+                    "arguments": json.dumps(func_args)
+                }
+            },
+            {
+                "role": "function",
+                "name": func_name,
+                "content": policy_info
+            }
+        ]
+
+    def process_message(self, user_id: str, message: str, conv: ConversationState, customer: Optional[Customer] = None) -> Tuple[str, AgentType]:
+        """Process policy-related messages"""
+        if not customer:
+            return NO_CUSTOMER_RESPONSE, self.agent_type
+
+        messages = self._policy_messages(message, conv, customer)
 
         # Get completion with function calling
         response = self.client.chat.completions.create(
@@ -89,38 +123,43 @@ If you can't find a specific policy number in the query but the user is asking a
 
         # Handle function calls
         if response_message.function_call:
-            func_name = response_message.function_call.name
-            func_args = json.loads(response_message.function_call.arguments)
-
-            # Call the appropriate function
-            if func_name == "get_policy_details":
-                policy_info = self._get_policy_details(func_args["policy_number"])
-            else:  # list_policies
-                policy_info = self._list_policies(customer)
-
-            # Get a natural language response
-            messages.extend([
-                {
-                    "role": "assistant",
-                    "content": None,
-                    "function_call": {
-                        "name": func_name,
-                        "arguments": json.dumps(func_args)
-                    }
-                },
-                {
-                    "role": "function",
-                    "name": func_name,
-                    "content": policy_info
-                }
-            ])
-
             final_response = self.client.chat.completions.create(
                 model=self.deployment,
-                messages=messages,
+                messages=self._call_function(response_message.function_call, messages, customer),
                 temperature=0.7
             )
 
             return final_response.choices[0].message.content, self.agent_type
         else:
             return response_message.content, self.agent_type
+
+    async def aprocess_message(self, user_id: str, message: str, conv: ConversationState, customer: Optional[Customer] = None, on_chunk: Optional[ChunkCallback] = None) -> Tuple[str, AgentType]:
+        """Async variant of process_message
+
+        With streaming enabled, the answer written from a function result is also streamed to on_chunk.
+        """
+        if not customer:
+            return NO_CUSTOMER_RESPONSE, self.agent_type
+
+        messages = self._policy_messages(message, conv, customer)
+        response = await self._acomplete(
+            model=self.deployment,
+            messages=messages,
+            functions=self.functions,
+            function_call="auto",
+            temperature=0
+        )
+        response_message = response.choices[0].message
+
+        if response_message.function_call:
+            request = {
+                "model": self.deployment,
+                "messages": self._call_function(response_message.function_call, messages, customer),
+                "temperature": 0.7
+            }
+            if self.streaming and on_chunk:
+                return await self._astream_reply(on_chunk, self.agent_type, **request), self.agent_type
+            final_response = await self._acomplete(**request)
+            return final_response.choices[0].message.content, self.agent_type
+        else:
+            return response_message.content, self.agent_type
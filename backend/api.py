@@ -1,22 +1,185 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from main import MessagesQuickstart
 from managers.chat_manager import ChatThreadManager
 from managers.escalation_manager import EscalationManager
+from managers.dedup_manager import DedupManager
+from managers.outbound_manager import OutboundMessageManager
 from agents import AgentManager
 from agents.core.agent_types import ConversationState, Message, AgentType
+from utils.worker_pool import KeyedWorkerPool
+from utils.event_grid import (
+    SUBSCRIPTION_VALIDATION_EVENT,
+    ADVANCED_MESSAGE_RECEIVED_EVENT,
+    group_events_by_sender
+)
 from dotenv import load_dotenv
+import asyncio
 import json
 import os
+import traceback
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI()
 messages = MessagesQuickstart()
 chat_manager = ChatThreadManager()
 escalation_manager = EscalationManager(chat_manager)
 agent = AgentManager()
+# Media a conversation downloaded becomes evictable first once the conversation expires
+agent.conversation_expired_listeners.append(messages.media_store.release)
+event_dedup = DedupManager.from_env()
+outbound = OutboundMessageManager.from_env(messages)
+
+def agent_prefix(agent_type: AgentType) -> str:
+    """Prefix identifying the agent in WhatsApp replies"""
+    if agent_type == AgentType.CUSTOMER_AGENT:
+        return "[Customer Service]"
+    elif agent_type == AgentType.POLICY_AGENT:
+        return "[Policy Agent]"
+    elif agent_type == AgentType.CONTACT_CENTER:
+        return "[Contact Center Agent]"
+    elif agent_type == AgentType.RELATIONSHIP_MANAGER:
+        return "[Relationship Manager]"
+    else:
+        return "[AI Assistant]"
+
+async def process_whatsapp_message(from_number: str, data: dict):
+    """Process a queued WhatsApp message event (runs on the webhook worker pool)"""
+    message_type = data.get('messageType')
+
+    if message_type == 'text':
+        content = data.get('content')
+
+        # Streamed answers are sent chunk by chunk, with the agent prefix on the first chunk
+        streamed = False
+        async def send_chunk(text: str, agent_type: AgentType):
+            nonlocal streamed
+            if not streamed:
+                text = f"{agent_prefix(agent_type)} {text}"
+                streamed = True
+            # Chunks are already sized and paced by the stream chunker, so they are not joined
+            await outbound.send_wait(from_number, text, batch=False)
+
+        # Model calls are awaited, so turns for different senders overlap on the event loop
+        ai_response = await agent.aprocess_message(from_number, content, on_chunk=send_chunk)
+
+        # Send AI response
+        if ai_response and not streamed:
+            # Format response with agent prefix
+            conv = agent.get_conversation(from_number)
+            agent_type = conv.current_agent if conv else AgentType.CUSTOMER_AGENT
+            formatted_response = f"{agent_prefix(agent_type)} {ai_response}"
+            await outbound.send_wait(from_number, formatted_response)
+
+    elif message_type in ['image', 'video', 'audio', 'document']:
+        # Handle media message
+        media = data.get('media', {})
+        media_id = media.get('id')
+        mime_type = media.get('mimeType')
+
+        if media_id and mime_type:
+            print(f"Received {message_type} from {from_number}")
+            # Download and save the media
+            filepath = await messages.download_media(media_id, mime_type, conversation_id=from_number)
+            if filepath:
+                print(f"Media saved to: {filepath}")
+
+                # Process media with Agent
+                ai_response = await agent.aprocess_media(from_number, message_type, filepath)
+
+                # Send AI response
+                if ai_response:
+                    await outbound.send_wait(from_number, ai_response)
+            else:
+                print("Failed to save media")
+                error_message = f"Sorry, there was an issue processing your {message_type}."
+                await outbound.send_wait(from_number, error_message)
+
+async def queue_whatsapp_event(event: dict, whatsapp_channel_id: str) -> dict:
+    """Validate one Event Grid event and queue it on the worker pool; returns its status"""
+    result = {"id": event.get('id')}
+    if event.get('eventType') != ADVANCED_MESSAGE_RECEIVED_EVENT:
+        result["status"] = "ignored"
+        return result
+    
+    data = event.get('data') or {}
+    message_type = data.get('messageType')
+    from_number = data.get('from')
+    channel_type = data.get('channelType')
+    print(f"\nWhatsApp {message_type} message event {event.get('id')} from: {from_number}")
+    
+    if not from_number:
+        result["status"] = "invalid"
+        return result
+    
+    # Skip processing if this is a message from our app
+    if from_number == whatsapp_channel_id and channel_type == 'whatsapp':
+        print("Skipping WhatsApp messages from our app")
+        result["status"] = "skipped"
+        return result
+    
+    if message_type == 'text':
+        content = data.get('content') or ''
+        print(f"Received text message from {from_number}: {content}")
+        
+        # Skip processing if this is a forwarded message from Contact Center
+        if content.startswith("[Contact Center Agent]"):
+            print("Skipping forwarded Contact Center message")
+            result["status"] = "skipped"
+            return result
+    
+    # Drop Event Grid redeliveries before doing any agent work
+    dedup_key = DedupManager.event_key(event)
+    if dedup_key and await event_dedup.acheck_and_mark(dedup_key):
+        print(f"Skipping duplicate delivery of {dedup_key}")
+        result["status"] = "duplicate"
+        return result
+    
+    # Hand the event to the worker pool
+    if not webhook_pool.submit(from_number, (data, dedup_key)):
+        # Let the retry through the dedup check since this delivery was not queued
+        if dedup_key:
+            await event_dedup.aforget(dedup_key)
+        result["status"] = "rejected"
+        return result
+    
+    result["status"] = "queued"
+    return result
+
+async def process_whatsapp_event(from_number: str, item: tuple):
+    """Worker pool handler; forgets the dedup key when processing fails so a redelivery is retried"""
+    data, dedup_key = item
+    try:
+        await process_whatsapp_message(from_number, data)
+    except Exception:
+        if dedup_key:
+            await event_dedup.aforget(dedup_key)
+        raise
+
+# Worker pool that drains WhatsApp events; events from the same sender are processed in order
+webhook_pool = KeyedWorkerPool(
+    process_whatsapp_event,
+    workers=int(os.getenv("WEBHOOK_WORKERS", "8")),
+    max_queue_size=int(os.getenv("WEBHOOK_MAX_QUEUE_SIZE", "1000")),
+    name="webhook-pool"
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await outbound.start()
+    await webhook_pool.start()
+    yield
+    await webhook_pool.stop()
+    await outbound.stop()
+    event_dedup.close()
+    messages.close()
+    await agent.aclose()
+    escalation_manager.close()
+    agent.classifier.cache.flush()
+
+app = FastAPI(lifespan=lifespan)
 
 @app.post("/webhook")
 async def webhook(request: Request):
@@ -38,102 +201,42 @@ async def webhook(request: Request):
         
         # Handle Event Grid subscription validation
         if isinstance(body, list) and len(body) > 0:
-            event = body[0]
-            if event.get('eventType') == 'Microsoft.EventGrid.SubscriptionValidationEvent':
-                validation_code = event['data']['validationCode']
-                print(f"\nValidation Event - Code: {validation_code}")
-                return JSONResponse(
-                    content={
-                        "validationResponse": validation_code
-                    },
-                    status_code=200
-                )
-            
-            # Handle WhatsApp message events
-            if event.get('eventType') == 'Microsoft.Communication.AdvancedMessageReceived':
-                print("\n WhatsApp Received Message Event:", body)
-                data = event.get('data', {})
-                print("\n=== Message Data ===")
-                print(f"Event Type: {event.get('eventType')}")
-                print(f"Message Type: {data.get('messageType')}")
-                print(f"From: {data.get('from')}")
-                print(f"Content: {data.get('content')}")
-                print(f"Raw Data: {data}")
-                
-                message_type = data.get('messageType')
-                from_number = data.get('from')
-                channel_type = data.get('channelType')
-                print(f"\nProcessing message from: {from_number}")
-                
-                # Skip processing if this is a message from our app
-                whatsapp_channel_id = os.getenv("WHATSAPP_CHANNEL_ID")
-                if not whatsapp_channel_id:
-                    raise ValueError("WHATSAPP_CHANNEL_ID not set")
-                    
-                if from_number == whatsapp_channel_id and channel_type == 'whatsapp':
-                    print("Skipping WhatsApp messages from our app")
+            # Malformed elements are reported as invalid instead of failing the whole batch
+            events = [event for event in body if isinstance(event, dict)]
+            for event in events:
+                if event.get('eventType') == SUBSCRIPTION_VALIDATION_EVENT:
+                    validation_code = event['data']['validationCode']
+                    print(f"\nValidation Event - Code: {validation_code}")
                     return JSONResponse(
-                        content={"status": "Skipped outgoing message"},
+                        content={
+                            "validationResponse": validation_code
+                        },
                         status_code=200
                     )
-                
-                if message_type == 'text':
-                    # Handle text message
-                    content = data.get('content')
-                    print(f"Received text message from {from_number}: {content}")
-                    
-                    # Skip processing if this is a forwarded message from Contact Center
-                    if content.startswith("[Contact Center Agent]"):
-                        print("Skipping forwarded Contact Center message")
-                        return JSONResponse(
-                            content={"status": "Skipped forwarded message"},
-                            status_code=200
-                        )
-                    
-                    # Process message with Agent
-                    ai_response = agent.process_message(from_number, content)
-                    
-                    # Send AI response
-                    if ai_response:
-                        # Format response with agent prefix
-                        agent_type = agent.conversations[from_number].current_agent
-                        if agent_type == AgentType.CUSTOMER_AGENT:
-                            prefix = "[Customer Service]"
-                        elif agent_type == AgentType.POLICY_AGENT:
-                            prefix = "[Policy Agent]"
-                        elif agent_type == AgentType.CONTACT_CENTER:
-                            prefix = "[Contact Center Agent]"
-                        elif agent_type == AgentType.RELATIONSHIP_MANAGER:
-                            prefix = "[Relationship Manager]"
-                        else:
-                            prefix = "[AI Assistant]"
-                        
-                        formatted_response = f"{prefix} {ai_response}"
-                        messages.send_text_message_to(from_number, formatted_response)
-                    
-                elif message_type in ['image', 'video', 'audio', 'document']:
-                    # Handle media message
-                    media = data.get('media', {})
-                    media_id = media.get('id')
-                    mime_type = media.get('mimeType')
-                    
-                    if media_id and mime_type:
-                        print(f"Received {message_type} from {from_number}")
-                        # Download and save the media
-                        filepath = await messages.download_media(media_id, mime_type)
-                        if filepath:
-                            print(f"Media saved to: {filepath}")
-                            
-                            # Process media with Agent
-                            ai_response = agent.process_media(from_number, message_type, filepath)
-                            
-                            # Send AI response
-                            if ai_response:
-                                messages.send_text_message_to(from_number, ai_response)
-                        else:
-                            print("Failed to save media")
-                            error_message = f"Sorry, there was an issue processing your {message_type}."
-                            messages.send_text_message_to(from_number, error_message)
+            
+            whatsapp_channel_id = os.getenv("WHATSAPP_CHANNEL_ID")
+            if not whatsapp_channel_id:
+                raise ValueError("WHATSAPP_CHANNEL_ID not set")
+            
+            # Queue every event in the batch; the worker pool fans senders out concurrently
+            results = [{"id": None, "status": "invalid"} for _ in range(len(body) - len(events))]
+            for from_number, sender_events in group_events_by_sender(events):
+                for event in sender_events:
+                    results.append(await queue_whatsapp_event(event, whatsapp_channel_id))
+            
+            # If any event could not be queued, ask Event Grid to redeliver the batch.
+            # Events that were queued are recognized as duplicates on the retry.
+            rejected = any(result["status"] == "rejected" for result in results)
+            if rejected:
+                print(f"Webhook queue full ({webhook_pool.depth()} queued), asking Event Grid to retry")
+            return JSONResponse(
+                content={
+                    "status": "Queue full, retry later" if rejected else "success",
+                    "events": results
+                },
+                headers={"Retry-After": "10"} if rejected else None,
+                status_code=503 if rejected else 200
+            )
                     
         return JSONResponse(
             content={"status": "success"},
@@ -247,12 +350,13 @@ async def chat(request: Request):
             customer_id = escalation.customer_id
             print(f"Sending message to customer at {customer_id}")
             
-            # Send message to WhatsApp
-            messages.send_text_message_to(customer_id, formatted_message)
-            print("Message sent successfully")
+            # Queue message for WhatsApp delivery
+            if not outbound.send(customer_id, formatted_message):
+                raise RuntimeError("outbound message queue is full")
+            print("Message queued for delivery")
             
             return JSONResponse(
-                content={"status": "Message sent successfully"},
+                content={"status": "Message queued for delivery"},
                 status_code=200
             )
         except Exception as e:
@@ -307,6 +411,23 @@ async def disconnect(request: Request):
             status_code=500
         )
 
+@app.get("/contact-center/outbox/dead")
+async def outbox_dead_letters(limit: int = 100):
+    """List chat messages the outbox gave up delivering to their ACS threads"""
+    dead_letters = await asyncio.to_thread(escalation_manager.outbox.dead_letters, limit)
+    return {"dead_letters": dead_letters}
+
+@app.post("/contact-center/outbox/requeue")
+async def outbox_requeue(request: Request):
+    """Retry dead-lettered chat messages, of one thread (threadId) or all"""
+    try:
+        body = await request.json()
+    except ValueError:
+        body = {}
+    thread_id = body.get("threadId") if isinstance(body, dict) else None
+    requeued = await asyncio.to_thread(escalation_manager.outbox.requeue_dead, thread_id)
+    return {"requeued": requeued}
+
 @app.options("/contact-center/chat")
 async def options_handler(request: Request):
     """Handle HTTP OPTIONS requests for /contact-center/chat"""
@@ -319,6 +440,31 @@ async def options_handler(request: Request):
         status_code=200
     )    
 
+@app.get("/metrics")
+async def metrics():
+    """Report queue depth and throughput of the background pipelines"""
+    return {
+        "webhook": webhook_pool.stats(),
+        "agent_mailbox": agent.mailbox.stats(),
+        "agent_async": agent.async_stats(),
+        "conversations": agent.conversation_stats(),
+        "routing": {
+            "mode": agent.customer_agent.routing_mode,
+            "unified_fallbacks": agent.customer_agent.unified_fallbacks,
+            "speculation": agent.customer_agent.speculation.snapshot()
+        },
+        "webhook_dedup": await event_dedup.astats(),
+        "outbound": outbound.stats(),
+        "acs_chat_rate_limit": chat_manager.rate_limiter.stats(),
+        "acs_chat_tokens": chat_manager.tokens.stats(),
+        "escalation_transcripts": escalation_manager.transcripts.stats(),
+        "chat_outbox": escalation_manager.outbox.stats(),
+        "media": messages.media_stats(),
+        "media_store": messages.media_store.stats(),
+        "classifier": agent.classifier.stats.snapshot(),
+        "classifier_cache": agent.classifier.cache.stats()
+    }
+
 @app.get("/")
 async def root():
     return {"message": "WhatsApp Integration API"}
@@ -0,0 +1,119 @@
+"""Burst of ACS chat sends against a throttling ACS stub, with and without the shared rate limiter
+
+The stub accepts --thread-limit sends per second per thread and --global-limit calls
+per second overall, and answers anything beyond that with a 429 carrying Retry-After.
+"before" sends directly and, as EscalationManager used to, gives up on the first 429
+("high traffic"). "after" sends through ChatRateLimiter, which smooths the burst to
+the configured rates and waits out any Retry-After.
+
+Usage: python benchmarks/bench_acs_rate_limit.py [--threads 1 4 16] [--sends 20] [--latency-ms 20]
+"""
+import argparse
+import collections
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+# Add backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.rate_limiter import ChatRateLimiter
+from utils.retry import is_throttled
+
+
+class Throttled(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__("TooManyRequests")
+        self.response = SimpleNamespace(headers={"retry-after-ms": str(int(retry_after * 1000))})
+
+
+class StubChatServer:
+    """Fixed latency per call; sliding one-second limits per thread and overall"""
+
+    def __init__(self, latency: float, thread_limit: int, global_limit: int):
+        self.latency = latency
+        self.thread_limit = thread_limit
+        self.global_limit = global_limit
+        self.calls = 0
+        self.throttled = 0
+        self._recent = collections.defaultdict(collections.deque)
+        self._lock = threading.Lock()
+
+    def _admit(self, key: str, limit: int, now: float) -> float:
+        recent = self._recent[key]
+        while recent and recent[0] <= now - 1.0:
+            recent.popleft()
+        if len(recent) >= limit:
+            return recent[0] + 1.0 - now
+        recent.append(now)
+        return 0.0
+
+    def send_message(self, thread_id: str):
+        with self._lock:
+            self.calls += 1
+            now = time.monotonic()
+            retry_after = self._admit(thread_id, self.thread_limit, now) or self._admit("global", self.global_limit, now)
+            if retry_after:
+                self.throttled += 1
+        time.sleep(self.latency)
+        if retry_after:
+            raise Throttled(retry_after)
+
+
+def run(server: StubChatServer, threads: int, sends: int, limiter=None):
+    delivered = 0
+    rejected = 0
+    lock = threading.Lock()
+
+    def worker(thread_id: str):
+        nonlocal delivered, rejected
+        for _ in range(sends):
+            try:
+                if limiter:
+                    limiter.call(thread_id, server.send_message, thread_id)
+                else:
+                    server.send_message(thread_id)
+                with lock:
+                    delivered += 1
+            except Exception as e:
+                if not is_throttled(e):
+                    raise
+                with lock:
+                    rejected += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, [f"thread-{i}" for i in range(threads)]))
+    return time.perf_counter() - start, delivered, rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--sends", type=int, default=20, help="Back-to-back sends into each chat thread")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--thread-limit", type=int, default=10, help="Sends per second per thread the stub accepts")
+    parser.add_argument("--global-limit", type=int, default=50, help="Calls per second overall the stub accepts")
+    args = parser.parse_args()
+
+    print(f"ACS stub: {args.latency_ms:g} ms per call, {args.thread_limit}/s per thread, {args.global_limit}/s overall")
+    print(f"{'threads':>8} {'mode':>7} {'seconds':>8} {'delivered':>10} {'rejected':>9} {'429s':>6} {'p95 wait ms':>12}")
+    for threads in args.threads:
+        server = StubChatServer(args.latency_ms / 1000, args.thread_limit, args.global_limit)
+        elapsed, delivered, rejected = run(server, threads, args.sends)
+        print(f"{threads:>8} {'before':>7} {elapsed:>8.2f} {delivered:>10} {rejected:>9} {server.throttled:>6} {'-':>12}")
+
+        server = StubChatServer(args.latency_ms / 1000, args.thread_limit, args.global_limit)
+        limiter = ChatRateLimiter.from_env()
+        elapsed, delivered, rejected = run(server, threads, args.sends, limiter)
+        wait_p95 = limiter.stats()["wait_latency"]["p95_ms"]
+        print(f"{threads:>8} {'after':>7} {elapsed:>8.2f} {delivered:>10} {rejected:>9} {server.throttled:>6} {wait_p95:>12g}")
+
+
+if __name__ == "__main__":
+    main()
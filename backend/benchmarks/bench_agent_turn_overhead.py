@@ -0,0 +1,104 @@
+"""Per-turn allocation and latency overhead of building agents per message vs sharing them
+
+Replays CustomerAgent turns against an in-process OpenAI client that answers
+instantly, so only local work is measured. "per-turn" rebuilds a HumanAgent (and
+its MessageClassifier) for every message, as CustomerAgent used to. "shared" uses
+the instances injected by the AgentManager registry. Reports mean latency per turn,
+and the peak memory allocated during a turn as measured by tracemalloc.
+
+Usage: python benchmarks/bench_agent_turn_overhead.py [--turns 2000]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+# Add backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("AZURE_OPENAI_DEPLOYMENT", "bench")
+
+from managers.customer_manager import Customer, CustomerManager
+from managers.policy_manager import PolicyManager
+from agents.customer_agent import CustomerAgent
+from agents.human_agent import HumanAgent
+from agents.core.agent_types import ConversationState
+
+MESSAGES = [
+    "Does my home insurance cover water damage from a burst pipe?",
+    "How do I update the email address on my account?",
+    "Can I pay my premium by card instead of bank transfer?",
+]
+
+
+class InstantCompletions:
+    """Stands in for client.chat.completions and answers without network I/O"""
+
+    def create(self, **kwargs):
+        content = "general_query" if kwargs.get("max_tokens") == 20 else "That is covered."
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class PerTurnCustomerAgent(CustomerAgent):
+    """Rebuilds its HumanAgent on every message, like CustomerAgent before the agent registry"""
+
+    def process_message(self, *args, **kwargs):
+        self.human_agent = HumanAgent(self.client, self.deployment, self.chat_manager, self.escalation_manager, self.async_client)
+        return super().process_message(*args, **kwargs)
+
+
+def run(agent: CustomerAgent, customer: Customer, turns: int):
+    conv = ConversationState()
+    # Warm up lazily built state (rule classifier, caches) before measuring
+    agent.process_message(customer.phoneNumber, MESSAGES[0], conv, customer)
+
+    start = time.perf_counter()
+    for i in range(turns):
+        agent.process_message(customer.phoneNumber, MESSAGES[i % len(MESSAGES)], conv, customer)
+    latency = (time.perf_counter() - start) / turns
+
+    # Peak memory allocated while a turn runs, above what was live when it started
+    tracemalloc.start()
+    peak_total = 0
+    for i in range(turns):
+        tracemalloc.reset_peak()
+        live, _ = tracemalloc.get_traced_memory()
+        agent.process_message(customer.phoneNumber, MESSAGES[i % len(MESSAGES)], conv, customer)
+        peak_total += tracemalloc.get_traced_memory()[1] - live
+    tracemalloc.stop()
+    return latency, peak_total / turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=2000)
+    args = parser.parse_args()
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=InstantCompletions()))
+    customer_manager = CustomerManager()
+    policy_manager = PolicyManager()
+    customer = Customer(
+        customerId="CUS-BENCH",
+        phoneNumber="+15550000000",
+        name="Bench Customer",
+        email="bench@example.com",
+        policyNumbers=["POL-123"],
+        customerType="standard",
+        preferredLanguage="en",
+        relationshipManager="",
+        lastContact="",
+        notes=""
+    )
+
+    print(f"{args.turns} turns")
+    print(f"{'mode':>10} {'us/turn':>10} {'peak bytes/turn':>16}")
+    for mode, agent_class in (("per-turn", PerTurnCustomerAgent), ("shared", CustomerAgent)):
+        agent = agent_class(client, customer_manager, policy_manager, None, None)
+        latency, peak = run(agent, customer, args.turns)
+        print(f"{mode:>10} {latency * 1e6:>10.1f} {peak:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
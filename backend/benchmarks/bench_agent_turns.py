@@ -0,0 +1,107 @@
+"""Throughput of AgentManager turns as the number of distinct senders grows
+
+Drives AgentManager.aprocess_message with the ACS managers and the customer agent
+replaced by in-process stubs. The stub agent awaits a fixed model latency, like an
+AsyncAzureOpenAI call. Turns from one sender hold that sender's turn lock, so
+throughput should scale with the number of distinct concurrent senders while each
+sender's turns still run one at a time, in order. The run fails if two turns of one
+sender overlap or run out of order.
+
+Usage: python benchmarks/bench_agent_turns.py [--turns 64] [--latency-ms 50]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("AZURE_OPENAI_DEPLOYMENT", "bench")
+os.environ["CONVERSATION_STORE_BACKEND"] = "memory"
+# No summaries: they would call the model
+os.environ["CONVERSATION_MAX_MESSAGES"] = "0"
+
+import agents.agent_manager as agent_manager
+from agents.agent_manager import AgentManager
+from agents.core.agent_types import AgentType
+
+
+class StubChatThreadManager:
+    """No ACS calls are made: the stub agent never escalates"""
+
+
+class StubEscalationManager:
+    def __init__(self, chat_manager):
+        self.chat_manager = chat_manager
+
+    def close(self):
+        pass
+
+
+class StubCustomerAgent:
+    """Answers every message after latency seconds and records overlapping turns per sender"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.active = set()
+        self.seen = {}
+        self.overlaps = 0
+
+    def _format_customer_info(self, customer) -> str:
+        return ""
+
+    async def aprocess_message(self, user_id, message, conv, customer, on_chunk=None):
+        if user_id in self.active:
+            self.overlaps += 1
+        self.active.add(user_id)
+        await asyncio.sleep(self.latency)
+        self.active.discard(user_id)
+        self.seen.setdefault(user_id, []).append(int(message))
+        return "Thanks, noted.", AgentType.CUSTOMER_AGENT
+
+
+# The agents receive these in AgentManager.__init__; no turn in this benchmark reaches them
+agent_manager.ChatThreadManager = StubChatThreadManager
+agent_manager.EscalationManager = StubEscalationManager
+
+
+async def run(agent: AgentManager, senders: int, turns: int, latency: float) -> float:
+    stub = agent.customer_agent = StubCustomerAgent(latency)
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        agent.aprocess_message(f"+1555{senders:03d}{i % senders:04d}", str(i))
+        for i in range(turns)
+    ))
+    elapsed = time.perf_counter() - start
+
+    # Every sender's turns must have run one at a time, in submission order
+    assert not stub.overlaps, f"{stub.overlaps} overlapping turns"
+    assert all(indexes == sorted(indexes) for indexes in stub.seen.values())
+    return turns / elapsed
+
+
+async def bench(turns: int, latency: float):
+    agent = AgentManager()
+    agent.customer_manager.get_customer = lambda user_id: None
+    print(f"{'senders':>8} {'turns/s':>10} {'speedup':>8}")
+    baseline = None
+    for senders in [1, 2, 4, 8, 16, 32]:
+        throughput = await run(agent, senders, turns, latency)
+        baseline = baseline or throughput
+        print(f"{senders:>8} {throughput:>10.1f} {throughput / baseline:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    print(f"{args.turns} turns, {args.latency_ms:.0f} ms simulated model latency")
+    asyncio.run(bench(args.turns, args.latency_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
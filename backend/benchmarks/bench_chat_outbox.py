@@ -0,0 +1,141 @@
+"""Time update_escalation spends on the caller's thread, with ACS sends inline vs through the chat outbox
+
+The ACS stub answers each send after --latency-ms and fails a fraction (--failure-rate)
+of them with a 503. "inline" sends as update_escalation used to: the caller waits for
+ACS, and a failed send is lost and reported to the customer. "outbox" is the current
+EscalationManager.update_escalation, which queues the message on disk and returns;
+the outbox then delivers every message, in order per thread, retrying failures.
+
+Usage: python benchmarks/bench_chat_outbox.py [--threads 8] [--messages 25] [--latency-ms 80] [--failure-rate 0.05]
+"""
+import argparse
+import collections
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("ESCALATION_JOURNAL_FSYNC", "false")
+# Keep the benchmark about the outbox rather than the ACS rate limits
+os.environ.setdefault("ACS_CHAT_REQUESTS_PER_SECOND", "100000")
+os.environ.setdefault("ACS_CHAT_BURST", "100000")
+os.environ.setdefault("ACS_CHAT_THREAD_REQUESTS_PER_SECOND", "100000")
+os.environ.setdefault("ACS_CHAT_THREAD_BURST", "100000")
+
+from managers.escalation_manager import EscalationManager
+
+
+class ServiceUnavailable(Exception):
+    status_code = 503
+
+
+class StubChatThreadClient:
+    def __init__(self, server: "StubChatServer", thread_id: str):
+        self.server = server
+        self.thread_id = thread_id
+
+    def send_message(self, content: str, sender_display_name: str = "", **kwargs):
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            if self.server.random.random() < self.server.failure_rate:
+                self.server.failures += 1
+                raise ServiceUnavailable("ServiceUnavailable")
+            self.server.received[self.thread_id].append(content)
+        return SimpleNamespace(id=f"msg-{time.monotonic_ns()}")
+
+
+class StubChatServer:
+    """Stands in for ChatClient: fixed latency per send and a random share of 503s"""
+
+    def __init__(self, latency: float, failure_rate: float):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.failures = 0
+        self.received = collections.defaultdict(list)
+        self.random = random.Random(1)
+        self.lock = threading.Lock()
+
+    def create_chat_thread(self, topic: str):
+        return SimpleNamespace(chat_thread=SimpleNamespace(id=f"thread-{time.monotonic_ns()}"))
+
+    def get_chat_thread_client(self, thread_id: str) -> StubChatThreadClient:
+        return StubChatThreadClient(self, thread_id)
+
+
+def conversation(manager, thread_id: str, count: int, inline: bool):
+    """One customer's turns; returns (seconds blocked per turn, errors shown to the customer)"""
+    blocked = []
+    errors = 0
+    for i in range(count):
+        start = time.perf_counter()
+        if inline:
+            try:
+                manager.chat_client.get_chat_thread_client(thread_id).send_message(content=f"message {i}", sender_display_name="Customer")
+            except ServiceUnavailable:
+                errors += 1
+        else:
+            manager.update_escalation(thread_id, f"message {i}", "user")
+        blocked.append(time.perf_counter() - start)
+    return blocked, errors
+
+
+def run(manager, server, threads, count: int, inline: bool):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(threads)) as pool:
+        results = list(pool.map(lambda t: conversation(manager, t, count, inline), threads))
+    elapsed = time.perf_counter() - start
+    blocked = sorted(s for turns, _ in results for s in turns)
+    errors = sum(e for _, e in results)
+    return elapsed, blocked[len(blocked) // 2], blocked[int(len(blocked) * 0.99)], errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8, help="Escalated conversations sending at once")
+    parser.add_argument("--messages", type=int, default=25, help="Messages per conversation")
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    customer_names = [f"Customer {i}" for i in range(args.threads)]
+
+    print(f"ACS stub: {args.latency_ms:g} ms per send, {args.failure_rate:.0%} fail with 503")
+    print(f"{'mode':>7} {'p50 turn ms':>12} {'p99 turn ms':>12} {'lost':>6} {'delivered':>10} {'in order':>9} {'drain s':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("inline", "outbox"):
+            os.environ["CHAT_OUTBOX_PATH"] = str(Path(tmp) / f"chat_outbox-{mode}.db")
+            server = StubChatServer(args.latency_ms / 1000, args.failure_rate)
+            chat_manager = SimpleNamespace(_get_chat_token=lambda: SimpleNamespace(token="token"), chat_client=lambda: server)
+            manager = EscalationManager(chat_manager, Path(tmp) / f"escalations-{mode}.json")
+            # Retries in the benchmark happen within a second rather than after real backoff
+            manager.outbox.poll_interval = 0.01
+            threads = [
+                manager.create_escalation(SimpleNamespace(phoneNumber=f"+1555000{i:04d}", name=name), [])[0]
+                for i, name in enumerate(customer_names)
+            ]
+
+            elapsed, p50, p99, errors = run(manager, server, threads, args.messages, mode == "inline")
+            drain_start = time.perf_counter()
+            while manager.outbox.stats()["pending"]:
+                # Skip the backoff so the benchmark measures delivery, not waiting
+                with manager.outbox._lock:
+                    manager.outbox._conn.execute("UPDATE chat_outbox SET next_attempt = 0")
+                manager.outbox.flush()
+            drain = time.perf_counter() - drain_start
+            expected = [f"message {i}" for i in range(args.messages)]
+            in_order = all(server.received[t] == expected for t in threads) if mode == "outbox" else "-"
+            delivered = sum(len(server.received[t]) for t in threads)
+            print(f"{mode:>7} {p50 * 1000:>12.2f} {p99 * 1000:>12.2f} {errors:>6} {delivered:>10} {str(in_order):>9} {drain:>8.2f}")
+            manager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Caller-visible latency of getting an ACS chat client: a token minted per call vs ChatTokenCache
+
+The identity service is an in-process stub that answers get_token after --mint-ms and
+issues tokens valid for --token-lifetime seconds. "per call" mints a token and builds a
+ChatClient for every operation, as ChatThreadManager.get_or_create_thread,
+cleanup_chat_thread and EscalationManager.create_escalation used to. "cached" asks the
+shared ChatTokenCache, which keeps tokens by their real expires_on and refreshes them
+in the background, for --duration seconds so that several refreshes happen.
+
+Usage: python benchmarks/bench_chat_tokens.py [--ops-per-second 200] [--duration 6] [--mint-ms 150] [--token-lifetime 3]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+# Add backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import managers.chat_token_cache as chat_token_cache
+from managers.chat_token_cache import ChatTokenCache
+
+IDENTITY = "8:acs:bench-identity"
+
+
+class StubIdentityClient:
+    """Stands in for CommunicationIdentityClient: fixed latency per token, fixed token lifetime"""
+
+    mint_latency = 0.15
+    token_lifetime = 3.0
+
+    @classmethod
+    def from_connection_string(cls, connection_string: str) -> "StubIdentityClient":
+        return cls()
+
+    def get_token(self, identity, scopes):
+        time.sleep(self.mint_latency)
+        expires_on = datetime.now(timezone.utc) + timedelta(seconds=self.token_lifetime)
+        return SimpleNamespace(token=f"token-{time.monotonic_ns()}", expires_on=expires_on)
+
+
+# The SDK clients validate real tokens, which the stub does not issue
+chat_token_cache.CommunicationIdentityClient = StubIdentityClient
+chat_token_cache.CommunicationUserIdentifier = lambda identity: identity
+chat_token_cache.CommunicationTokenCredential = lambda token: token
+chat_token_cache.ChatClient = lambda endpoint, credential: SimpleNamespace(endpoint=endpoint, credential=credential, close=lambda: None)
+
+
+def percentile(samples, p: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops-per-second", type=int, default=200, help="Operations needing a chat client")
+    parser.add_argument("--duration", type=float, default=6.0)
+    parser.add_argument("--mint-ms", type=float, default=150.0)
+    parser.add_argument("--token-lifetime", type=float, default=3.0, help="Seconds a stub token is valid")
+    args = parser.parse_args()
+    StubIdentityClient.mint_latency = args.mint_ms / 1000
+    StubIdentityClient.token_lifetime = args.token_lifetime
+    connection_string = "endpoint=https://stub.communication.azure.com/;accesskey=stub"
+
+    print(f"Identity stub: {args.mint_ms:g} ms per token, tokens valid {args.token_lifetime:g}s")
+    print(f"{'mode':>9} {'ops':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'mints':>6} {'background':>11}")
+
+    # Per call: the old code paths minted on every operation, so time a sample of them
+    identity_client = StubIdentityClient()
+    latencies = []
+    for _ in range(20):
+        start = time.perf_counter()
+        token = identity_client.get_token(IDENTITY, ["chat"])
+        chat_token_cache.ChatClient(connection_string, chat_token_cache.CommunicationTokenCredential(token.token))
+        latencies.append(time.perf_counter() - start)
+    print(f"{'per call':>9} {len(latencies):>6} {percentile(latencies, 50) * 1000:>8.2f} "
+          f"{percentile(latencies, 99) * 1000:>8.2f} {max(latencies) * 1000:>8.2f} {len(latencies):>6} {'-':>11}")
+
+    cache = ChatTokenCache(connection_string, refresh_margin=args.token_lifetime / 3, min_validity=0.1)
+    latencies = []
+    interval = 1 / args.ops_per_second
+    deadline = time.monotonic() + args.duration
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        cache.chat_client(IDENTITY)
+        latencies.append(time.perf_counter() - start)
+        time.sleep(interval)
+    stats = cache.stats()
+    print(f"{'cached':>9} {len(latencies):>6} {percentile(latencies, 50) * 1000:>8.3f} "
+          f"{percentile(latencies, 99) * 1000:>8.3f} {max(latencies) * 1000:>8.2f} {stats['mints']:>6} {stats['background_refreshes']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Disconnect classification in an escalated chat: local fast path share and replies to the confirmation prompt
+
+Classifies customer messages against HumanAgent's disconnect intents with a stub
+model that counts calls. It answers "confirms_disconnect" when the context ends with
+the disconnect confirmation prompt and "general_query" otherwise. Messages sent mid-chat
+should mostly resolve locally. Replies sent right after the prompt ("bye", "ok bye",
+...) must reach the model and come back as confirms_disconnect; a local
+wants_disconnect there would ask the customer to confirm again.
+
+Usage: python benchmarks/bench_classifier_fast_path.py [--repeat 200]
+"""
+import argparse
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+# Add backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["CLASSIFIER_FAST_PATH"] = "true"
+os.environ.pop("CLASSIFIER_CACHE_PATH", None)
+
+from agents.core.agent_types import ConversationState, Message
+from agents.core.intents import DISCONNECT_CONFIRMATION_PROMPT, DISCONNECT_INTENTS
+from agents.core.message_classifier import MessageClassifier
+
+MID_CHAT = ["bye", "I want to disconnect", "end chat", "goodbye", "my claim number is 4411", "when will the adjuster call?"]
+AFTER_PROMPT = ["bye", "ok bye", "goodbye thanks", "Yes goodbye", "no thanks", "that's all"]
+
+
+class StubCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        prompt = kwargs["messages"][-1]["content"]
+        context = prompt.split("Conversation context:")[1].split("Message to classify:")[0]
+        intent = "confirms_disconnect" if DISCONNECT_CONFIRMATION_PROMPT in context else "general_query"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=intent))])
+
+
+def conversation(reply: str, after_prompt: bool) -> ConversationState:
+    conv = ConversationState()
+    conv.messages.append(Message(role="user", content="My roof was damaged in the storm"))
+    conv.messages.append(Message(role="assistant", content="A contact center agent will be with you shortly."))
+    if after_prompt:
+        conv.messages.append(Message(role="user", content="I think that's everything"))
+        conv.messages.append(Message(role="assistant", content=DISCONNECT_CONFIRMATION_PROMPT))
+    conv.messages.append(Message(role="user", content=reply))
+    return conv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200, help="Classifications timed per message")
+    args = parser.parse_args()
+
+    completions = StubCompletions()
+    classifier = MessageClassifier(SimpleNamespace(chat=SimpleNamespace(completions=completions)), "bench")
+    intents = {intent.name: intent.examples for intent in DISCONNECT_INTENTS}
+
+    print(f"{'context':>12} {'message':>30} {'intent':>20} {'model calls':>12} {'us':>8}")
+    failures = 0
+    for after_prompt, replies in ((False, MID_CHAT), (True, AFTER_PROMPT)):
+        for reply in replies:
+            conv = conversation(reply, after_prompt)
+            calls = completions.calls
+            intent = classifier.classify_message(reply, conv, intents)
+            model_calls = completions.calls - calls
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                classifier.classify_message(reply, conv, intents)
+            elapsed = (time.perf_counter() - start) / args.repeat
+            if after_prompt and intent != "confirms_disconnect":
+                failures += 1
+            label = "after prompt" if after_prompt else "mid chat"
+            print(f"{label:>12} {reply:>30} {intent:>20} {model_calls:>12} {elapsed * 1e6:>8.1f}")
+
+    stats = classifier.stats
+    print(f"local: {stats.local}, model: {stats.llm}, replies to the prompt not confirming: {failures}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Memory held by conversations with an unbounded vs a bounded, summarized message window
+
+Builds N conversations of T turns each and reports the memory they hold, as measured
+by tracemalloc, per conversation and for every N conversations. The bounded window
+uses ConversationMemory with an in-process client that returns a fixed-size summary
+instantly, so only the memory effect is measured.
+
+Usage: python benchmarks/bench_conversation_memory.py [--conversations 1000 5000] [--turns 200] [--window 40]
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+from types import SimpleNamespace
+
+# Add backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.core.agent_types import AgentType, ConversationState, Message
+from agents.core.conversation_memory import ConversationMemory
+
+USER_TEXT = "Can you tell me whether my home policy covers water damage from a burst pipe in the kitchen?"
+ASSISTANT_TEXT = "Yes. Sudden and accidental water damage from a burst pipe is covered, up to your policy limit, minus the deductible. " * 2
+SUMMARY = "The customer asked about water damage cover on their home policy and was told it is covered up to the limit. " * 3
+
+
+class SummaryCompletions:
+    """Stands in for client.chat.completions and returns a fixed summary without network I/O"""
+
+    def create(self, **kwargs):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=SUMMARY))])
+
+
+def build(conversations: int, turns: int, memory: ConversationMemory):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = {}
+    for i in range(conversations):
+        conv = ConversationState(customer_info="Customer Information: ...")
+        for turn in range(turns):
+            # Fresh strings per message, as they would arrive from the webhook and the model
+            conv.messages.append(Message(role="user", content=f"{USER_TEXT} ({turn})"))
+            conv.messages.append(Message(role="assistant", content=f"{ASSISTANT_TEXT} ({turn})", agent_type=AgentType.CUSTOMER_AGENT))
+            memory.compact(conv)
+        held[f"+1555{i:07d}"] = conv
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used, sum(len(conv.messages) for conv in held.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--window", type=int, default=40)
+    args = parser.parse_args()
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SummaryCompletions()))
+    print(f"{args.turns} turns per conversation, window of {args.window} messages")
+    print(f"{'mode':>10} {'conversations':>14} {'messages held':>14} {'KiB/conv':>10} {'MiB total':>10}")
+    for conversations in args.conversations:
+        for mode, window in (("unbounded", 0), ("bounded", args.window)):
+            memory = ConversationMemory(client, "bench", max_messages=window)
+            used, messages = build(conversations, args.turns, memory)
+            print(f"{mode:>10} {conversations:>14} {messages:>14} {used / conversations / 1024:>10.1f} {used / 1024 ** 2:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Conversation store throughput with concurrent writers, per backend
+
+Each writer replays turns for its own set of users: get the conversation (or create
+it), append a user and an assistant message, and put it back, as AgentManager does.
+"memory" and "sqlite" run the writers as threads sharing one store. "sqlite-procs"
+runs each writer in its own process with its own store on the same file, like
+uvicorn workers. After the run, a fresh store is opened on the file and every
+conversation is read back, to show how warm a restart is.
+
+Usage: python benchmarks/bench_conversation_store.py [--writers 1 4 16] [--turns 2000] [--users 200]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.core.agent_types import AgentType, ConversationState, Message
+from agents.core.conversation_store import MemoryConversationStore, SqliteConversationStore
+
+USER_TEXT = "Does my home insurance cover water damage from a burst pipe?"
+ASSISTANT_TEXT = "Yes, sudden and accidental water damage is covered up to your policy limit."
+TTL = 86400
+
+
+def replay(store, writer: int, turns: int, users: int):
+    """Run turns for this writer's users; every turn is one get and one put"""
+    for turn in range(turns):
+        user_id = f"+1555{writer:03d}{turn % users:04d}"
+        conv = store.get(user_id) or ConversationState()
+        conv.messages.append(Message(role="user", content=USER_TEXT))
+        conv.messages.append(Message(role="assistant", content=ASSISTANT_TEXT, agent_type=AgentType.CUSTOMER_AGENT))
+        # Keep the window the size CONVERSATION_MAX_MESSAGES would
+        if len(conv.messages) > 40:
+            del conv.messages[:20]
+        store.put(user_id, conv)
+
+
+def run_threads(store, writers: int, turns: int, users: int) -> float:
+    threads = [threading.Thread(target=replay, args=(store, w, turns, users)) for w in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    store.flush()
+    return time.perf_counter() - start
+
+
+def process_writer(path: str, writer: int, turns: int, users: int, start_event):
+    store = SqliteConversationStore(Path(path), max_entries=10000, ttl=TTL)
+    start_event.wait()
+    replay(store, writer, turns, users)
+    store.close()
+
+
+def run_processes(path: Path, writers: int, turns: int, users: int) -> float:
+    start_event = multiprocessing.Event()
+    procs = [
+        multiprocessing.Process(target=process_writer, args=(str(path), w, turns, users, start_event))
+        for w in range(writers)
+    ]
+    for proc in procs:
+        proc.start()
+    # Let every process open its store before the clock starts
+    time.sleep(0.5)
+    start = time.perf_counter()
+    start_event.set()
+    for proc in procs:
+        proc.join()
+    return time.perf_counter() - start
+
+
+def warm_restart(path: Path, writers: int, users: int):
+    """Open a fresh store on the file and read every conversation back"""
+    store = SqliteConversationStore(path, max_entries=10000, ttl=TTL)
+    start = time.perf_counter()
+    found = sum(
+        1 for w in range(writers) for u in range(users)
+        if store.get(f"+1555{w:03d}{u:04d}") is not None
+    )
+    elapsed = time.perf_counter() - start
+    store.close()
+    return found, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--turns", type=int, default=2000, help="Turns per writer")
+    parser.add_argument("--users", type=int, default=200, help="Users per writer")
+    args = parser.parse_args()
+
+    print(f"{args.turns} turns per writer over {args.users} users each; one op is a get or a put")
+    print(f"{'backend':>13} {'writers':>8} {'ops/s':>10} {'restored':>9} {'restore ms':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for writers in args.writers:
+            ops = 2 * writers * args.turns
+
+            elapsed = run_threads(MemoryConversationStore(10000, TTL), writers, args.turns, args.users)
+            print(f"{'memory':>13} {writers:>8} {ops / elapsed:>10.0f} {0:>9} {'-':>11}")
+
+            path = Path(tmp) / f"threads-{writers}.db"
+            store = SqliteConversationStore(path, max_entries=10000, ttl=TTL)
+            elapsed = run_threads(store, writers, args.turns, args.users)
+            store.close()
+            found, restore = warm_restart(path, writers, min(args.users, args.turns))
+            print(f"{'sqlite':>13} {writers:>8} {ops / elapsed:>10.0f} {found:>9} {restore * 1000:>11.1f}")
+
+            path = Path(tmp) / f"procs-{writers}.db"
+            # Create the schema once so the writer processes don't race to do it
+            SqliteConversationStore(path, max_entries=10000, ttl=TTL).close()
+            elapsed = run_processes(path, writers, args.turns, args.users)
+            found, restore = warm_restart(path, writers, min(args.users, args.turns))
+            print(f"{'sqlite-procs':>13} {writers:>8} {ops / elapsed:>10.0f} {found:>9} {restore * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""get_active_escalation latency as escalation history grows: full scan vs the customer index
+
+History is mostly closed escalations with one active escalation per 100. "scan" loops
+over every escalation as get_active_escalation used to; "index" is the current
+EscalationManager.get_active_escalation, backed by the customer -> active thread index.
+
+Usage: python benchmarks/bench_escalation_active.py [--history 1000 10000 100000 300000] [--lookups 2000]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from managers.escalation_manager import ChatEscalation, EscalationManager
+
+
+def write_history(path: Path, count: int):
+    escalations = {
+        f"thread-{i}": ChatEscalation(
+            customer_id=f"+1555{i % (count // 4 or 1):07d}",
+            customer_name=f"Customer {i}",
+            chat_thread_id=f"thread-{i}",
+            acs_identity="token",
+            messages=[],
+            created_at="2025-01-01T00:00:00",
+            status="active" if i % 100 == 0 else "closed"
+        ).dict()
+        for i in range(count)
+    }
+    path.write_text(json.dumps({"escalations": escalations}))
+
+
+def scan(manager: EscalationManager, customer_id: str):
+    for thread_id, escalation in manager.escalations.items():
+        if escalation.customer_id == customer_id and escalation.status == "active":
+            return thread_id
+    return None
+
+
+def timed(fn, customers, lookups: int) -> float:
+    start = time.perf_counter()
+    for i in range(lookups):
+        fn(customers[i % len(customers)])
+    return (time.perf_counter() - start) / lookups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history", type=int, nargs="+", default=[1000, 10000, 100000, 300000])
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--scans", type=int, default=50, help="Lookups timed for the slow scan mode")
+    args = parser.parse_args()
+
+    print(f"{'history':>8} {'scan us':>10} {'index us':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.setdefault("CHAT_OUTBOX_PATH", str(Path(tmp) / "chat_outbox.db"))
+        for count in args.history:
+            path = Path(tmp) / str(count) / "escalations.json"
+            path.parent.mkdir()
+            write_history(path, count)
+            manager = EscalationManager(None, path)
+            # Half the lookups hit an active escalation, half a customer without one
+            customers = [f"+1555{i % (count // 4 or 1):07d}" for i in range(0, count, 50)]
+
+            for customer in customers:
+                assert scan(manager, customer) == manager.get_active_escalation(customer)
+            scan_s = timed(lambda c: scan(manager, c), customers, args.scans)
+            index_s = timed(manager.get_active_escalation, customers, args.lookups)
+            print(f"{count:>8} {scan_s * 1e6:>10.1f} {index_s * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Time to hand a conversation off to a new escalation thread, against an in-process ACS stub
+
+The stub answers each chat call after a fixed latency and counts the sends that
+exceed its per-thread rate limit, which real ACS would reject with TooManyRequests.
+"before" replays the hand-off as HumanAgent and EscalationManager used to: up to 20
+messages into the new thread one by one, then the whole history plus the hand-off
+message again. "after" is the current EscalationManager.create_escalation, which
+transfers the history once as consolidated transcript parts, followed by the
+hand-off message through the chat outbox.
+
+Usage: python benchmarks/bench_escalation_handoff.py [--history 10 40 120] [--latency-ms 80] [--thread-limit 10]
+"""
+import argparse
+import collections
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("ESCALATION_JOURNAL_FSYNC", "false")
+
+from managers.escalation_manager import EscalationManager
+
+
+class StubChatThreadClient:
+    def __init__(self, server: "StubChatServer", thread_id: str):
+        self.server = server
+        self.thread_id = thread_id
+
+    def send_message(self, content: str, sender_display_name: str = "", **kwargs):
+        self.server.call(self.thread_id)
+        return SimpleNamespace(id=f"msg-{time.monotonic_ns()}")
+
+
+class StubChatServer:
+    """Stands in for ChatClient: fixed latency per call and a per-thread sends-per-second limit"""
+
+    def __init__(self, latency: float, thread_limit: int):
+        self.latency = latency
+        self.thread_limit = thread_limit
+        self.calls = 0
+        self.throttled = 0
+        self._recent = collections.defaultdict(collections.deque)
+        self._lock = threading.Lock()
+
+    def call(self, thread_id: str):
+        with self._lock:
+            self.calls += 1
+            now = time.monotonic()
+            recent = self._recent[thread_id]
+            while recent and recent[0] <= now - 1.0:
+                recent.popleft()
+            recent.append(now)
+            if len(recent) > self.thread_limit:
+                self.throttled += 1
+        time.sleep(self.latency)
+
+    def create_chat_thread(self, topic: str):
+        self.call("create")
+        return SimpleNamespace(chat_thread=SimpleNamespace(id=f"thread-{time.monotonic_ns()}"))
+
+    def get_chat_thread_client(self, thread_id: str) -> StubChatThreadClient:
+        return StubChatThreadClient(self, thread_id)
+
+
+def history(length: int):
+    messages = []
+    for i in range(length):
+        if i % 2 == 0:
+            messages.append({"role": "user", "content": f"Question {i}: does my policy cover storm damage to the garage roof?"})
+        else:
+            messages.append({"role": "assistant", "content": f"Answer {i}: storm damage to outbuildings is covered up to 10% of the dwelling limit."})
+    return messages
+
+
+def before(server: StubChatServer, messages) -> float:
+    start = time.perf_counter()
+    thread_id = server.create_chat_thread("Escalated Chat").chat_thread.id
+    thread = server.get_chat_thread_client(thread_id)
+    for msg in messages[-20:]:
+        thread.send_message(content=msg["content"], sender_display_name="Customer")
+    for msg in messages + [{"role": "assistant", "content": "Connecting you now."}]:
+        thread.send_message(content=msg["content"], sender_display_name="Assistant")
+    return time.perf_counter() - start
+
+
+def after(manager: EscalationManager, customer, messages) -> float:
+    start = time.perf_counter()
+    thread_id, _ = manager.create_escalation(customer, messages)
+    manager.update_escalation(thread_id, "Connecting you now.", "assistant")
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history", type=int, nargs="+", default=[10, 40, 120])
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--thread-limit", type=int, default=10, help="Sends per second per thread the stub accepts")
+    args = parser.parse_args()
+
+    customer = SimpleNamespace(phoneNumber="+15550001234", name="Bench Customer")
+
+    print(f"ACS stub: {args.latency_ms:g} ms per call, {args.thread_limit} sends/s per thread")
+    print(f"{'history':>8} {'mode':>7} {'handoff ms':>11} {'ACS calls':>10} {'throttled':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.setdefault("CHAT_OUTBOX_PATH", str(Path(tmp) / "chat_outbox.db"))
+        for length in args.history:
+            messages = history(length)
+
+            server = StubChatServer(args.latency_ms / 1000, args.thread_limit)
+            elapsed = before(server, messages)
+            print(f"{length:>8} {'before':>7} {elapsed * 1000:>11.0f} {server.calls:>10} {server.throttled:>10}")
+
+            server = StubChatServer(args.latency_ms / 1000, args.thread_limit)
+            chat_manager = SimpleNamespace(_get_chat_token=lambda: SimpleNamespace(token="token"), chat_client=lambda: server)
+            manager = EscalationManager(chat_manager, Path(tmp) / f"escalations-{length}.json")
+            elapsed = after(manager, customer, messages)
+            # The hand-off reply is delivered by the outbox after create_escalation returns
+            manager.outbox.flush()
+            print(f"{length:>8} {'after':>7} {elapsed * 1000:>11.0f} {server.calls:>10} {server.throttled:>10}")
+            manager.close()
+
+
+if __name__ == "__main__":
+    main()
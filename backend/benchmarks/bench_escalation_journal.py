@@ -0,0 +1,80 @@
+"""Cost of persisting one escalation event: rewriting escalations.json vs appending to the journal
+
+"rewrite" serializes every escalation with indent=4 and rewrites the file, as
+_save_escalations did on each create and close. "journal" appends one line with
+EscalationJournal, including its periodic compaction, with and without fsync.
+
+Usage: python benchmarks/bench_escalation_journal.py [--history 1000 10000] [--events 500]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from managers.escalation_manager import ChatEscalation, EscalationJournal
+
+
+def history(count: int):
+    return {
+        f"thread-{i}": ChatEscalation(
+            customer_id=f"+1555{i:07d}",
+            customer_name=f"Customer {i}",
+            chat_thread_id=f"thread-{i}",
+            acs_identity="token",
+            messages=[{"role": "user", "content": "My claim has not been paid yet."}, {"role": "assistant", "content": "Let me connect you."}],
+            created_at="2025-01-01T00:00:00",
+            status="closed"
+        )
+        for i in range(count)
+    }
+
+
+def bench_rewrite(path: Path, escalations, events: int) -> float:
+    start = time.perf_counter()
+    for i in range(events):
+        escalations[f"thread-{i}"].messages.append({"role": "user", "content": f"Update {i}"})
+        with open(path, "w") as f:
+            json.dump({"escalations": {k: v.dict() for k, v in escalations.items()}}, f, indent=4)
+    return (time.perf_counter() - start) / events
+
+
+def bench_journal(path: Path, escalations, events: int, fsync: bool) -> float:
+    path.write_text(json.dumps({"escalations": {k: v.dict() for k, v in escalations.items()}}))
+    journal = EscalationJournal(path, fsync=fsync)
+    journal.load()
+    start = time.perf_counter()
+    for i in range(events):
+        journal.append({"op": "message", "thread_id": f"thread-{i}", "message": {"role": "user", "content": f"Update {i}"}})
+    return (time.perf_counter() - start) / events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--events", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{args.events} events per run")
+    print(f"{'history':>8} {'mode':>16} {'ms/event':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.history:
+            events = min(args.events, count)
+            runs = (
+                ("rewrite", lambda p: bench_rewrite(p, history(count), events)),
+                ("journal", lambda p: bench_journal(p, history(count), events, fsync=False)),
+                ("journal+fsync", lambda p: bench_journal(p, history(count), events, fsync=True)),
+            )
+            for mode, run in runs:
+                path = Path(tmp) / f"{mode}-{count}" / "escalations.json"
+                path.parent.mkdir()
+                print(f"{count:>8} {mode:>16} {run(path) * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
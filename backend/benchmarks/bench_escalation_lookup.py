@@ -0,0 +1,88 @@
+"""get_escalation latency as escalation history grows: reload from disk vs the in-memory index
+
+"reload" re-reads the snapshot and rebuilds every ChatEscalation, as get_escalation
+did on each call. "index" is EscalationManager.get_escalation with the journal's
+change detection, when no other instance has written. "index+remote" measures a
+lookup right after another instance appended one event to the journal, so the new
+journal line is read first.
+
+Usage: python benchmarks/bench_escalation_lookup.py [--history 10000 100000] [--lookups 2000]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from managers.escalation_manager import ChatEscalation, EscalationManager
+
+
+def write_history(path: Path, count: int):
+    escalations = {
+        f"thread-{i}": ChatEscalation(
+            customer_id=f"+1555{i:07d}",
+            customer_name=f"Customer {i}",
+            chat_thread_id=f"thread-{i}",
+            acs_identity="token",
+            messages=[{"role": "user", "content": "My claim has not been paid yet."}, {"role": "assistant", "content": "Let me connect you."}],
+            created_at="2025-01-01T00:00:00",
+            status="closed"
+        ).dict()
+        for i in range(count)
+    }
+    path.write_text(json.dumps({"escalations": escalations}))
+
+
+def reload_lookup(path: Path, thread_id: str):
+    with open(path, "r") as f:
+        data = json.load(f)
+    escalations = {k: ChatEscalation(**v) for k, v in data.get("escalations", {}).items()}
+    return escalations.get(thread_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--reloads", type=int, default=5, help="Lookups timed for the slow reload mode")
+    args = parser.parse_args()
+
+    os.environ.setdefault("ESCALATION_JOURNAL_FSYNC", "false")
+    print(f"{'history':>8} {'mode':>13} {'us/lookup':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.setdefault("CHAT_OUTBOX_PATH", str(Path(tmp) / "chat_outbox.db"))
+        for count in args.history:
+            path = Path(tmp) / str(count) / "escalations.json"
+            path.parent.mkdir()
+            write_history(path, count)
+
+            start = time.perf_counter()
+            for i in range(args.reloads):
+                reload_lookup(path, f"thread-{i * 7 % count}")
+            print(f"{count:>8} {'reload':>13} {(time.perf_counter() - start) / args.reloads * 1e6:>12.1f}")
+
+            reader = EscalationManager(None, path)
+            writer = EscalationManager(None, path)
+            start = time.perf_counter()
+            for i in range(args.lookups):
+                reader.get_escalation(f"thread-{i * 7 % count}")
+            print(f"{count:>8} {'index':>13} {(time.perf_counter() - start) / args.lookups * 1e6:>12.1f}")
+
+            lookups = min(args.lookups, 500)
+            elapsed = 0.0
+            for i in range(lookups):
+                thread_id = f"thread-{i * 7 % count}"
+                writer.journal.append({"op": "message", "thread_id": thread_id, "message": {"role": "user", "content": "Any news?"}})
+                start = time.perf_counter()
+                reader.get_escalation(thread_id)
+                elapsed += time.perf_counter() - start
+            print(f"{count:>8} {'index+remote':>13} {elapsed / lookups * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
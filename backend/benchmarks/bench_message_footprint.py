@@ -0,0 +1,117 @@
+"""Memory and serialized bytes per message, before and after the compact Message record
+
+"before" is the previous Message: a regular dataclass with a datetime timestamp,
+serialized as JSON. "after" is the slotted, frozen Message with an epoch-int
+timestamp, serialized with ConversationState.to_bytes. In-memory size is measured
+with tracemalloc over N messages that share one content string, so only the record
+itself is counted. Serialized size and encode/decode time are per conversation of
+the given number of messages.
+
+Usage: python benchmarks/bench_message_footprint.py [--messages 1000000] [--window 40]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime
+
+# Add backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.core.agent_types import AgentType, ConversationState, Message
+
+USER_TEXT = "Does my home insurance cover water damage from a burst pipe?"
+ASSISTANT_TEXT = "Yes, sudden and accidental water damage is covered up to your policy limit, minus the deductible."
+
+
+@dataclass
+class LegacyMessage:
+    role: str
+    content: str
+    agent_type: AgentType = AgentType.USER
+    timestamp: datetime = field(default_factory=datetime.now)
+
+
+def legacy_dumps(conv: ConversationState, messages) -> bytes:
+    """The JSON form conversations were stored in before the binary format"""
+    return json.dumps({
+        "messages": [
+            {"role": m.role, "content": m.content, "agent_type": m.agent_type.value, "timestamp": m.timestamp.isoformat()}
+            for m in messages
+        ],
+        "current_agent": conv.current_agent.value,
+        "last_summary": conv.last_summary,
+        "policy_checked": conv.policy_checked,
+        "customer_info": conv.customer_info,
+        "chat_thread_id": conv.chat_thread_id
+    }).encode("utf-8")
+
+
+def legacy_loads(data: bytes):
+    raw = json.loads(data)
+    return [
+        LegacyMessage(m["role"], m["content"], AgentType(m["agent_type"]), datetime.fromisoformat(m["timestamp"]))
+        for m in raw["messages"]
+    ]
+
+
+def build(message_class, count: int):
+    # Roles come from the wire as fresh strings, like JSON-decoded or API-supplied values
+    return [
+        message_class("".join(["us", "er"]), USER_TEXT) if i % 2 == 0
+        else message_class("".join(["assis", "tant"]), ASSISTANT_TEXT, AgentType.CUSTOMER_AGENT)
+        for i in range(count)
+    ]
+
+
+def bytes_per_message(message_class, count: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    messages = build(message_class, count)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del messages
+    return used / count
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1000000)
+    parser.add_argument("--window", type=int, default=40, help="Messages per serialized conversation")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    before_mem = bytes_per_message(LegacyMessage, args.messages)
+    after_mem = bytes_per_message(Message, args.messages)
+
+    conv = ConversationState(customer_info="Customer Information:\nName: Bench Customer\nPolicies: POL-123", last_summary="Asked about water damage cover.")
+    legacy = build(LegacyMessage, args.window)
+    conv.messages = build(Message, args.window)
+    before_data = legacy_dumps(conv, legacy)
+    after_data = conv.to_bytes()
+    before_enc = timed(lambda: legacy_dumps(conv, legacy), args.repeat)
+    after_enc = timed(conv.to_bytes, args.repeat)
+    before_dec = timed(lambda: legacy_loads(before_data), args.repeat)
+    after_dec = timed(lambda: ConversationState.from_bytes(after_data), args.repeat)
+
+    print(f"{args.messages} messages in memory; {args.window} messages per serialized conversation")
+    print(f"{'':>7} {'mem B/msg':>10} {'wire B/msg':>11} {'encode us':>10} {'decode us':>10}")
+    for name, mem, data, enc, dec in (
+        ("before", before_mem, before_data, before_enc, before_dec),
+        ("after", after_mem, after_data, after_enc, after_dec)
+    ):
+        print(f"{name:>7} {mem:>10.1f} {len(data) / args.window:>11.1f} {enc * 1e6:>10.1f} {dec * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Model round-trips and latency per turn for sequential vs unified CustomerAgent routing
+
+Serves a fake Azure OpenAI chat completions endpoint on localhost that sleeps a fixed
+latency per request and counts requests. A real AzureOpenAI client is pointed at it,
+so the agents make the same HTTP round-trips they would in production. The local
+classifier fast path and the classification cache are disabled so every turn reaches
+the model.
+
+Usage: python benchmarks/bench_routing_modes.py [--turns 50] [--latency 0.2]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("AZURE_OPENAI_DEPLOYMENT", "bench")
+os.environ["CLASSIFIER_FAST_PATH"] = "false"
+
+from openai import AzureOpenAI
+from managers.customer_manager import Customer, CustomerManager
+from managers.policy_manager import PolicyManager
+from agents.customer_agent import CustomerAgent
+from agents.core.agent_types import ConversationState, Message
+from agents.core.message_classifier import ClassificationCache
+
+TURNS = [
+    "Hello there",
+    "Does my home insurance cover water damage from a burst pipe?",
+    "How do I update the email address on my account?",
+    "Can I pay my premium by card instead of bank transfer?",
+    "What is the claims process if someone hits my car?",
+]
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    latency = 0.2
+    requests = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        with FakeOpenAIHandler.lock:
+            FakeOpenAIHandler.requests += 1
+        time.sleep(self.latency)
+
+        system_prompt = body["messages"][0]["content"]
+        if body.get("response_format", {}).get("type") == "json_object":
+            content = json.dumps({
+                "intent": "general_query",
+                "target_agent": "customer_agent",
+                "answer": "Yes, that is covered under your policy."
+            })
+        elif "classification assistant" in system_prompt:
+            content = "general_query"
+        else:
+            content = "Yes, that is covered under your policy."
+
+        payload = json.dumps({
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "bench"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content}
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_mode(mode: str, client: AzureOpenAI, customer: Customer, turns: int):
+    agent = CustomerAgent(client, CustomerManager(), PolicyManager(), None, None)
+    agent.routing_mode = mode
+    # Entries expire immediately, so repeated turns are classified by the model every time
+    agent.classifier.cache = ClassificationCache(max_entries=1, ttl=0)
+
+    conv = ConversationState()
+    FakeOpenAIHandler.requests = 0
+    latencies = []
+    for i in range(turns):
+        message = TURNS[i % len(TURNS)]
+        conv.messages.append(Message(role="user", content=message))
+        start = time.perf_counter()
+        response, agent_type = agent.process_message(customer.phoneNumber, message, conv, customer)
+        latencies.append(time.perf_counter() - start)
+        conv.messages.append(Message(role="assistant", content=response, agent_type=agent_type))
+
+    latencies.sort()
+    print(
+        f"{mode:>10}: {FakeOpenAIHandler.requests / turns:5.2f} round-trips/turn  "
+        f"mean {sum(latencies) / turns * 1000:7.1f} ms  "
+        f"p95 {latencies[int(turns * 0.95) - 1] * 1000:7.1f} ms  "
+        f"fallbacks {agent.unified_fallbacks}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated model latency per request in seconds")
+    args = parser.parse_args()
+
+    FakeOpenAIHandler.latency = args.latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = AzureOpenAI(
+        api_key="bench",
+        api_version="2024-02-01",
+        azure_endpoint=f"http://127.0.0.1:{server.server_address[1]}"
+    )
+
+    customer = Customer(
+        customerId="CUS-BENCH",
+        phoneNumber="+15550000000",
+        name="Bench Customer",
+        email="bench@example.com",
+        policyNumbers=["POL-123"],
+        customerType="standard",
+        preferredLanguage="en",
+        relationshipManager="",
+        lastContact="",
+        notes=""
+    )
+
+    print(f"{args.turns} turns, {args.latency * 1000:.0f} ms simulated model latency")
+    for mode in ("sequential", "unified"):
+        run_mode(mode, client, customer, args.turns)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
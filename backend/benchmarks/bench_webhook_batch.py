@@ -0,0 +1,95 @@
+"""Webhook ingestion throughput for Event Grid batches of 1, 10 and 100 events
+
+Replays the /webhook queueing path (group by sender, dedup check, submit to the
+worker pool) for a stream of AdvancedMessageReceived events, delivered in batches
+of different sizes. Each POST pays a fixed request overhead and each agent turn a
+fixed simulated model latency. Reports events/second until every event has been
+processed, and the mean time to acknowledge a POST.
+
+Usage: python benchmarks/bench_webhook_batch.py [--events 1000] [--senders 50]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+# Add backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from managers.dedup_manager import DedupManager, MemoryDedupBackend
+from utils.event_grid import ADVANCED_MESSAGE_RECEIVED_EVENT, group_events_by_sender
+from utils.worker_pool import KeyedWorkerPool
+
+
+def make_events(count: int, senders: int):
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "eventType": ADVANCED_MESSAGE_RECEIVED_EVENT,
+            "data": {
+                "messageId": str(uuid.uuid4()),
+                "from": f"+1555000{i % senders:04d}",
+                "channelType": "whatsapp",
+                "messageType": "text",
+                "content": f"message {i}",
+                "receivedTimestamp": f"2024-10-19T10:00:{i // 1000:02d}.{i % 1000:03d}Z"
+            }
+        }
+        for i in range(count)
+    ]
+
+
+async def run(batch_size: int, events, workers: int, turn_latency: float, request_overhead: float):
+    processed = []
+
+    async def handle(from_number: str, data: dict):
+        await asyncio.sleep(turn_latency)
+        processed.append(data["messageId"])
+
+    pool = KeyedWorkerPool(handle, workers=workers, max_queue_size=len(events), name="bench-pool")
+    dedup = DedupManager(MemoryDedupBackend(max_entries=len(events), ttl=3600))
+    await pool.start()
+
+    ack_times = []
+    start = time.perf_counter()
+    for offset in range(0, len(events), batch_size):
+        request_start = time.perf_counter()
+        await asyncio.sleep(request_overhead)
+        for from_number, sender_events in group_events_by_sender(events[offset:offset + batch_size]):
+            for event in sender_events:
+                key = DedupManager.event_key(event)
+                if not dedup.check_and_mark(key):
+                    pool.submit(from_number, event["data"])
+        ack_times.append(time.perf_counter() - request_start)
+
+    await pool.stop(timeout=300)
+    elapsed = time.perf_counter() - start
+    assert len(processed) == len(events)
+    return len(events) / elapsed, sum(ack_times) / len(ack_times)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--senders", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--turn-latency-ms", type=float, default=20)
+    parser.add_argument("--request-overhead-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    events = make_events(args.events, args.senders)
+    print(f"{args.events} events from {args.senders} senders, {args.workers} workers, "
+          f"{args.turn_latency_ms:.0f} ms per turn, {args.request_overhead_ms:.0f} ms per POST")
+    print(f"{'batch':>6} {'events/s':>10} {'ack ms':>8}")
+    for batch_size in [1, 10, 100]:
+        throughput, ack = await run(
+            batch_size, events, args.workers,
+            args.turn_latency_ms / 1000, args.request_overhead_ms / 1000
+        )
+        print(f"{batch_size:>6} {throughput:>10.1f} {ack * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""Per-send latency of a fresh NotificationMessagesClient vs the pooled MessagesQuickstart client
+
+Starts a local stub of the Advanced Messages send endpoint. The stub charges a fixed
+delay on every new TCP connection to stand in for the TLS handshake with Azure, and
+a smaller delay per request. Then it sends the same text messages with a new client per
+message (the previous behaviour) and with the long-lived pooled client.
+
+Usage: python benchmarks/bench_whatsapp_client_pool.py [--sends 200] [--handshake-ms 30] [--request-ms 2]
+"""
+import argparse
+import base64
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from azure.communication.messages import NotificationMessagesClient
+from azure.communication.messages.models import TextNotificationContent
+from main import MessagesQuickstart
+
+
+class StubMessagesHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    handshake_delay = 0.0
+    request_delay = 0.0
+    connections = 0
+
+    def setup(self):
+        # Runs once per TCP connection
+        super().setup()
+        StubMessagesHandler.connections += 1
+        time.sleep(self.handshake_delay)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.request_delay)
+
+        body = json.dumps({
+            "receipts": [{"messageId": "stub-message", "to": to} for to in request.get("to", [])]
+        }).encode()
+        self.send_response(202)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def measure(send, sends: int):
+    latencies = []
+    for _ in range(sends):
+        start = time.perf_counter()
+        send()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name: str, latencies, connections: int):
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"{name:<22} mean {statistics.mean(latencies) * 1000:7.2f} ms   "
+          f"p50 {statistics.median(latencies) * 1000:7.2f} ms   p95 {p95 * 1000:7.2f} ms   "
+          f"connections {connections}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sends", type=int, default=200)
+    parser.add_argument("--handshake-ms", type=float, default=30)
+    parser.add_argument("--request-ms", type=float, default=2)
+    args = parser.parse_args()
+
+    StubMessagesHandler.handshake_delay = args.handshake_ms / 1000
+    StubMessagesHandler.request_delay = args.request_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubMessagesHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    access_key = base64.b64encode(b"benchmark-access-key").decode()
+    connection_string = f"endpoint=http://127.0.0.1:{server.server_port}/;accesskey={access_key}"
+    options = TextNotificationContent(channel_registration_id="bench-channel", to=["+15550000000"], content="Hello")
+
+    def send_with_new_client():
+        with NotificationMessagesClient.from_connection_string(connection_string) as client:
+            client.send(options)
+
+    MessagesQuickstart.connection_string = connection_string
+    MessagesQuickstart.channelRegistrationId = "bench-channel"
+    messages = MessagesQuickstart(max_concurrency=4)
+
+    print(f"{args.sends} sends, {args.handshake_ms:.0f} ms simulated handshake, {args.request_ms:.0f} ms per request")
+    StubMessagesHandler.connections = 0
+    report("client per send", measure(send_with_new_client, args.sends), StubMessagesHandler.connections)
+
+    StubMessagesHandler.connections = 0
+    report("pooled client", measure(lambda: messages._send(options), args.sends), StubMessagesHandler.connections)
+
+    messages.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
 import os
 import mimetypes
 import asyncio
-import aiofiles
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+from azure.core.pipeline.transport import RequestsTransport
 from azure.communication.messages import NotificationMessagesClient
 from azure.communication.messages.models import (
     TemplateNotificationContent,
@@ -13,6 +19,7 @@ from azure.communication.messages.models import (
     AudioNotificationContent,
     VideoNotificationContent
 )
+from managers.media_manager import MediaManager
 
 # Load environment variables from .env file
 load_dotenv()
@@ -25,9 +32,66 @@ class MessagesQuickstart(object):
     phone_number = os.getenv("RECIPIENT_PHONE_NUMBER")
     channelRegistrationId = os.getenv("WHATSAPP_CHANNEL_ID")
 
+    def __init__(self, max_concurrency: Optional[int] = None):
+        """
+        Args:
+            max_concurrency: Maximum number of sends in flight at once, which is also the
+                size of the keep-alive connection pool (defaults to WHATSAPP_MAX_CONCURRENT_SENDS)
+        """
+        self.max_concurrency = max_concurrency or int(os.getenv("WHATSAPP_MAX_CONCURRENT_SENDS", "8"))
+        self._send_slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._client_lock = threading.Lock()
+        self._client: Optional[NotificationMessagesClient] = None
+        self._session: Optional[requests.Session] = None
+
+        # Media download settings
+        self.media_chunk_size = int(os.getenv("WHATSAPP_MEDIA_CHUNK_SIZE", str(64 * 1024)))
+        self.media_buffer_chunks = int(os.getenv("WHATSAPP_MEDIA_BUFFER_CHUNKS", "16"))
+        self.media_max_bytes = int(os.getenv("WHATSAPP_MEDIA_MAX_BYTES", str(100 * 1024 * 1024)))
+        self.media_downloads = 0
+        self.media_failures = 0
+        self.media_bytes = 0
+        self.media_seconds = 0.0
+        self.media_store = MediaManager.from_env(Path(__file__).parent / 'media')
+
+    @property
+    def messaging_client(self) -> NotificationMessagesClient:
+        """Long-lived client whose HTTP session keeps connections alive between sends"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    # The block size only applies when set on the transport that is passed in
+                    self._client = NotificationMessagesClient.from_connection_string(
+                        self.connection_string,
+                        transport=RequestsTransport(
+                            session=session,
+                            session_owner=False,
+                            connection_data_block_size=self.media_chunk_size
+                        )
+                    )
+                    self._session = session
+        return self._client
+
+    def _send(self, options, **kwargs):
+        """Send a notification through the shared client, limited to max_concurrency sends at once"""
+        with self._send_slots:
+            return self.messaging_client.send(options, **kwargs)
+
+    def close(self):
+        """Close the shared client and its connection pool"""
+        with self._client_lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
     def send_template_message(self):
-        # client creation
-        messaging_client = NotificationMessagesClient.from_connection_string(self.connection_string)
         input_template: MessageTemplate = MessageTemplate(
             name="<<TEMPLATE_NAME>>",
             language="<<LANGUAGE>>")
@@ -38,7 +102,7 @@ class MessagesQuickstart(object):
         )
 
         # calling send() with WhatsApp template details.
-        message_responses = messaging_client.send(template_options)
+        message_responses = self._send(template_options)
         response = message_responses.receipts[0]
         
         if (response is not None):
@@ -48,8 +112,6 @@ class MessagesQuickstart(object):
             print("Message failed to send")
 
     def send_text_message(self):
-        # client creation
-        messaging_client = NotificationMessagesClient.from_connection_string(self.connection_string)
 
         text_message_options = TextNotificationContent(
             channel_registration_id=self.channelRegistrationId,
@@ -58,7 +120,7 @@ class MessagesQuickstart(object):
         )
 
         # calling send() with whatsapp text message
-        message_responses = messaging_client.send(text_message_options)
+        message_responses = self._send(text_message_options)
         response = message_responses.receipts[0]
         
         if (response is not None):
@@ -67,10 +129,8 @@ class MessagesQuickstart(object):
         else:
             print("Message failed to send")
 
-    def send_text_message_to(self, to_number: str, text: str):
-        """Send a text message to a specific phone number"""
-        # Create NotificationMessagesClient Client
-        messaging_client = NotificationMessagesClient.from_connection_string(self.connection_string)
+    def send_text_message_to(self, to_number: str, text: str, **kwargs):
+        """Send a text message to a specific phone number (kwargs are passed to the SDK send call)"""
 
         text_message_options = TextNotificationContent(
             channel_registration_id=self.channelRegistrationId,
@@ -79,7 +139,7 @@ class MessagesQuickstart(object):
         )
 
         # calling send() with whatsapp text message
-        message_responses = messaging_client.send(text_message_options)
+        message_responses = self._send(text_message_options, **kwargs)
         response = message_responses.receipts[0]
         
         if (response is not None):
@@ -88,8 +148,6 @@ class MessagesQuickstart(object):
             print("Message failed to send")
 
     def send_image_message(self):
-        # Create NotificationMessagesClient Client
-        messaging_client = NotificationMessagesClient.from_connection_string(self.connection_string)
         input_media_uri: str = "https://aka.ms/acsicon1"
         image_message_options = ImageNotificationContent(
             channel_registration_id=self.channelRegistrationId,
@@ -98,7 +156,7 @@ class MessagesQuickstart(object):
         )
 
         # calling send() with whatsapp image message
-        message_responses = messaging_client.send(image_message_options)
+        message_responses = self._send(image_message_options)
         response = message_responses.receipts[0]
         
         if (response is not None):
@@ -108,8 +166,6 @@ class MessagesQuickstart(object):
             print("Message failed to send")
     
     def send_document_message(self):
-        # Create NotificationMessagesClient Client
-        messaging_client = NotificationMessagesClient.from_connection_string(self.connection_string)
         input_media_uri: str = "##DocumentLinkPlaceholder##"
         documents_options = DocumentNotificationContent(
             channel_registration_id=self.channelRegistrationId,
@@ -120,7 +176,7 @@ class MessagesQuickstart(object):
         )
 
         # calling send() with whatsapp document message
-        message_responses = messaging_client.send(documents_options)
+        message_responses = self._send(documents_options)
         response = message_responses.receipts[0]
         
         if (response is not None):
@@ -130,8 +186,6 @@ class MessagesQuickstart(object):
             print("Message failed to send")
 
     def send_audio_message(self):
-        # Create NotificationMessagesClient Client
-        messaging_client = NotificationMessagesClient.from_connection_string(self.connection_string)
         input_media_uri: str = "##AudioLinkPlaceholder##"
         audio_options = AudioNotificationContent(
             channel_registration_id=self.channelRegistrationId,
@@ -140,7 +194,7 @@ class MessagesQuickstart(object):
         )
 
         # calling send() with whatsapp audio message
-        message_responses = messaging_client.send(audio_options)
+        message_responses = self._send(audio_options)
         response = message_responses.receipts[0]
         
         if (response is not None):
@@ -150,8 +204,6 @@ class MessagesQuickstart(object):
             print("Message failed to send")
 
     def send_video_message(self):
-        # Create NotificationMessagesClient Client
-        messaging_client = NotificationMessagesClient.from_connection_string(self.connection_string)
         input_media_uri: str = "##VideoLinkPlaceholder##"
         video_options = VideoNotificationContent(
             channel_registration_id=self.channelRegistrationId,
@@ -161,7 +213,7 @@ class MessagesQuickstart(object):
         )
 
         # calling send() with whatsapp video message
-        message_responses = messaging_client.send(video_options)
+        message_responses = self._send(video_options)
         response = message_responses.receipts[0]
         
         if (response is not None):
@@ -170,49 +222,102 @@ class MessagesQuickstart(object):
         else:
             print("Message failed to send")
 
-    async def download_media(self, media_id: str, mime_type: str):
-        # Create media directory if it doesn't exist
-        media_dir = os.path.join(os.path.dirname(__file__), 'media')
-        if not os.path.exists(media_dir):
-            os.makedirs(media_dir)
+    def media_stats(self) -> Dict[str, Any]:
+        """Snapshot of media download metrics"""
+        return {
+            "downloads": self.media_downloads,
+            "failures": self.media_failures,
+            "bytes": self.media_bytes,
+            "avg_bytes_per_sec": round(self.media_bytes / self.media_seconds) if self.media_seconds else 0
+        }
+
+    async def _stream_media(self, media_id: str):
+        """Yield media chunks downloaded on a worker thread, through a bounded buffer
+
+        The SDK iterator blocks on the network, so it is consumed off the event loop. The
+        worker thread waits whenever media_buffer_chunks chunks are waiting to be written,
+        and stops (closing the iterator and its pooled connection) once the consumer is gone.
+        """
+        loop = asyncio.get_running_loop()
+        buffer: asyncio.Queue = asyncio.Queue(maxsize=self.media_buffer_chunks)
+        stop = threading.Event()
+        end = object()
+
+        def put(item) -> bool:
+            # Checked before every put, so at most one put is in flight once stop is set
+            if stop.is_set():
+                return False
+            asyncio.run_coroutine_threadsafe(buffer.put(item), loop).result()
+            return True
 
-        # Create NotificationMessagesClient Client
-        messaging_client = NotificationMessagesClient.from_connection_string(self.connection_string)
+        def pump():
+            chunks = None
+            try:
+                chunks = self.messaging_client.download_media(media_id)
+                for chunk in chunks:
+                    if not put(chunk):
+                        return
+                put(end)
+            except Exception as e:
+                put(e)
+            finally:
+                close = getattr(chunks, "close", None)
+                if close is not None:
+                    close()
+
+        pump_task = asyncio.ensure_future(asyncio.to_thread(pump))
         try:
-            # Get media content as bytes iterator
-            media_iterator = messaging_client.download_media(media_id)
-            
-            # Get MIME type from response
-            print(mime_type)
-            # Determine file extension from MIME type
-            extension = mimetypes.guess_extension(mime_type) or ''
-            if not extension and '/' in mime_type:
-                # Fallback: use the second part of mime type
-                extension = '.' + mime_type.split('/')[-1]
-            
-            # Create filename with proper extension
-            filename = f"{media_id}{extension}"
-            filepath = os.path.join(media_dir, filename)
-            
-            # Save the media content to file by consuming the iterator
-            async with aiofiles.open(filepath, 'wb') as f:
-                for chunk in media_iterator:
-                    await f.write(chunk)
-            
-            print(f"Media saved successfully to: {filepath}")
+            while True:
+                item = await buffer.get()
+                if item is end:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Free a slot for a put that is already waiting, then let the worker thread finish
+            stop.set()
+            while not buffer.empty():
+                buffer.get_nowait()
+            await pump_task
+
+    async def download_media(self, media_id: str, mime_type: str, conversation_id: Optional[str] = None):
+        """Download media into the content-addressed media store and return its path"""
+        # Get MIME type from response
+        print(mime_type)
+        # Determine file extension from MIME type
+        extension = mimetypes.guess_extension(mime_type) or ''
+        if not extension and '/' in mime_type:
+            # Fallback: use the second part of mime type
+            extension = '.' + mime_type.split('/')[-1]
+
+        start = time.monotonic()
+        try:
+            chunks = self._stream_media(media_id)
+            try:
+                filepath = await self.media_store.save(chunks, extension, conversation_id, self.media_max_bytes)
+            finally:
+                await chunks.aclose()
+
+            size = os.path.getsize(filepath)
+            elapsed = time.monotonic() - start
+            self.media_downloads += 1
+            self.media_bytes += size
+            self.media_seconds += elapsed
+            print(f"Media saved successfully to: {filepath} "
+                  f"({size} bytes in {elapsed:.2f}s, {size / max(elapsed, 1e-6) / 1024:.0f} KiB/s)")
             return filepath
 
         except Exception as e:
+            self.media_failures += 1
             print(f"Media download failed: {str(e)}")
             return None
-        finally:
-            # Clean up the client
-            messaging_client.close()
 
 if __name__ == '__main__':
     messages = MessagesQuickstart()
     # messages.send_template_message()
     asyncio.run(messages.download_media("149e3aa1-38ff-49cb-bbca-b93641d14bcc", "image/jpeg"))
+    messages.close()
     # messages.send_text_message()
     # messages.send_image_message()
     # messages.send_document_message()
@@ -1,13 +1,12 @@
 import os
 from datetime import datetime, timedelta
-from azure.communication.identity import CommunicationIdentityClient
 from azure.communication.chat import (
     ChatClient,
-    CommunicationTokenCredential,
-    ChatMessageType,
-    CommunicationUserIdentifier
+    ChatMessageType
 )
 from typing import Dict, List, Tuple, Optional
+from managers.chat_token_cache import ChatTokenCache
+from utils.rate_limiter import ChatRateLimiter
 
 class ChatThreadManager:
     def __init__(self):
@@ -15,10 +14,10 @@ class ChatThreadManager:
         if not self.connection_string:
             raise ValueError("CHAT_COMMUNICATION_SERVICES_CONNECTION_STRING not found in environment variables")
             
-        self.endpoint = self.connection_string.split(';')[0].split('=')[1]
-        
-        # Initialize the identity client
-        self.identity_client = CommunicationIdentityClient.from_connection_string(self.connection_string)
+        # Tokens and chat clients are cached per identity and shared by every ACS caller
+        self.tokens = ChatTokenCache.shared(self.connection_string)
+        self.endpoint = self.tokens.endpoint
+        self.identity_client = self.tokens.identity_client
         
         # Use fixed ACS identity from environment variable
         self.fixed_identity = os.getenv("CHAT_COMMUNICATION_SERVICES_IDENTITY")
@@ -27,38 +26,36 @@ class ChatThreadManager:
             
         # Store active chat threads
         self.active_threads = {}  # Format: {phone_number: (thread_id, chat_client, expiry)}
+        
+        # Every ACS chat call waits for the process-wide rate limiter
+        self.rate_limiter = ChatRateLimiter.shared()
 
     def _get_chat_token(self):
-        """Get chat token for fixed identity"""
-        return self.identity_client.get_token(
-            CommunicationUserIdentifier(self.fixed_identity),
-            ["chat"]
-        )
+        """Get chat token for fixed identity, minted only when the cached one is about to expire"""
+        return self.tokens.token(self.fixed_identity)
+
+    def chat_client(self) -> ChatClient:
+        """Get the shared chat client for the fixed identity"""
+        return self.tokens.chat_client(self.fixed_identity)
 
     def get_or_create_thread(self, phone_number: str) -> tuple:
         """Get existing thread or create new one for the phone number
         Returns: (thread_id, chat_client, is_new_thread)"""
         current_time = datetime.now()
         
+        # The cached client is always current, even if the thread was created with an older one
+        chat_client = self.chat_client()
+        
         # Check if there's an active thread for this phone number
         if phone_number in self.active_threads:
-            thread_id, chat_client, expiry = self.active_threads[phone_number]
+            thread_id, _, expiry = self.active_threads[phone_number]
             if current_time < expiry:
                 return thread_id, chat_client, False
-                
-        # Get token for fixed identity
-        token_result = self._get_chat_token()
-        
-        # Create chat client
-        chat_client = ChatClient(
-            self.endpoint,
-            CommunicationTokenCredential(token_result.token)
-        )
         
         print("Creating chat thread for", phone_number, "...")
         # Create new thread
         topic = f"WhatsApp Chat with {phone_number} - {current_time.strftime('%Y-%m-%d')}"
-        create_thread_result = chat_client.create_chat_thread(topic)
+        create_thread_result = self.rate_limiter.call(None, chat_client.create_chat_thread, topic)
         thread_id = create_thread_result.chat_thread.id
         
         print("Chat thread created:", thread_id)
@@ -77,7 +74,9 @@ class ChatThreadManager:
         sender_name = f"WhatsApp User ({phone_number})" if is_from_whatsapp else "System"
         
         # Send message to thread
-        send_result = chat_thread_client.send_message(
+        send_result = self.rate_limiter.call(
+            thread_id,
+            chat_thread_client.send_message,
             content=content,
             sender_display_name=sender_name,
             chat_message_type=ChatMessageType.TEXT
@@ -100,7 +99,9 @@ class ChatThreadManager:
         }
         
         # Send message to thread
-        send_result = chat_thread_client.send_message(
+        send_result = self.rate_limiter.call(
+            thread_id,
+            chat_thread_client.send_message,
             content=content,
             sender_display_name=sender_name,
             chat_message_type=ChatMessageType.TEXT,
@@ -112,19 +113,12 @@ class ChatThreadManager:
         """Remove participant and delete chat thread on disconnect"""
         try:
             print(f"Cleaning up chat thread {thread_id}")
-            # Get token and create chat client
-            token_result = self._get_chat_token()
-            chat_client = ChatClient(
-                self.endpoint,
-                CommunicationTokenCredential(token_result.token)
-            )
-            
             # Get chat thread client
-            chat_thread_client = chat_client.get_chat_thread_client(thread_id)
+            chat_thread_client = self.chat_client().get_chat_thread_client(thread_id)
             
             try:
                 # Delete the chat thread
-                chat_thread_client.delete_chat_thread()
+                self.rate_limiter.call(thread_id, chat_thread_client.delete_chat_thread)
                 print(f"Chat thread {thread_id} deleted")
             except Exception as e:
                 print(f"Error deleting chat thread: {e}")
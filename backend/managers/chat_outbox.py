@@ -0,0 +1,248 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from utils.metrics import LatencyHistogram
+from utils.retry import backoff_delay, is_retryable, retry_after_seconds
+
+# send(thread_id, content, sender_display_name, metadata) delivers one message to ACS
+SendFn = Callable[[str, str, str, Optional[Dict[str, str]]], Any]
+
+
+class ChatOutbox:
+    """Durable queue of ACS chat messages, delivered by a background thread
+
+    enqueue() commits the message to a SQLite file (WAL mode) and returns, so callers
+    never wait on ACS. The flusher delivers the oldest pending message of each chat
+    thread, several threads in parallel, so messages reach a thread in the order they
+    were queued. A failed send is retried with backoff (honouring Retry-After) and
+    holds back the rest of its thread; after max_attempts, or on an error that cannot
+    succeed on retry, the message is dead-lettered and the thread moves on.
+
+    Several processes may share the file: a message is leased to one flusher while it
+    is being sent. Delivery is at least once; a crash between the send and its
+    bookkeeping sends the message again.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        send: SendFn,
+        max_attempts: int = 8,
+        max_parallel: int = 4,
+        poll_interval: float = 0.5,
+        lease_seconds: float = 60.0
+    ):
+        """
+        Args:
+            path: SQLite database file
+            send: Delivers one message to ACS; raises on failure
+            max_attempts: Sends of a message before it is dead-lettered
+            max_parallel: Chat threads delivered to at the same time
+            poll_interval: Seconds between checks for messages due for a retry
+            lease_seconds: How long a message being sent is hidden from other flushers
+        """
+        self.path = Path(path)
+        self.send = send
+        self.max_attempts = max(1, max_attempts)
+        self.max_parallel = max(1, max_parallel)
+        self.poll_interval = max(0.01, poll_interval)
+        self.lease_seconds = lease_seconds
+        self.delivery_latency = LatencyHistogram()
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix="chat-outbox")
+
+        # Metrics
+        self.enqueued = 0
+        self.delivered = 0
+        self.retries = 0
+        self.dead_lettered = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS chat_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                thread_id TEXT NOT NULL,
+                sender TEXT NOT NULL,
+                content TEXT NOT NULL,
+                metadata TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL DEFAULT 0,
+                lease_until REAL NOT NULL DEFAULT 0,
+                enqueued_at REAL NOT NULL,
+                last_error TEXT
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_outbox_thread ON chat_outbox (thread_id, status, id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_outbox_status ON chat_outbox (status, next_attempt)")
+
+        self._flusher = threading.Thread(target=self._run_flusher, name="chat-outbox-flusher", daemon=True)
+        self._flusher.start()
+
+    @classmethod
+    def from_env(cls, send: SendFn) -> "ChatOutbox":
+        """Create an outbox configured from CHAT_OUTBOX_* environment variables"""
+        default_path = Path(__file__).parent.parent / "data" / "chat_outbox.db"
+        return cls(
+            Path(os.getenv("CHAT_OUTBOX_PATH", str(default_path))),
+            send,
+            max_attempts=int(os.getenv("CHAT_OUTBOX_MAX_ATTEMPTS", "8")),
+            max_parallel=int(os.getenv("CHAT_OUTBOX_MAX_PARALLEL", "4")),
+            poll_interval=float(os.getenv("CHAT_OUTBOX_POLL_INTERVAL_SECONDS", "0.5"))
+        )
+
+    def enqueue(self, thread_id: str, content: str, sender: str, metadata: Optional[Dict[str, str]] = None) -> int:
+        """Queue a message for the chat thread; returns its outbox id once it is on disk"""
+        with self._lock:
+            message_id = self._conn.execute(
+                "INSERT INTO chat_outbox (thread_id, sender, content, metadata, enqueued_at) VALUES (?, ?, ?, ?, ?)",
+                (thread_id, sender, content, json.dumps(metadata) if metadata else None, time.time())
+            ).lastrowid
+        self.enqueued += 1
+        self._wake.set()
+        return message_id
+
+    def _run_flusher(self):
+        while not self._closed:
+            # Keep going while there is work; otherwise sleep until an enqueue or the next retry
+            if not self.deliver_due():
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def _claim(self) -> List[tuple]:
+        """Lease the oldest pending message of up to max_parallel chat threads that are due"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    """SELECT id, thread_id, sender, content, metadata, attempts, enqueued_at FROM chat_outbox AS o
+                    WHERE status = 'pending' AND next_attempt <= ? AND lease_until <= ?
+                        AND id = (SELECT MIN(id) FROM chat_outbox WHERE thread_id = o.thread_id AND status = 'pending')
+                    ORDER BY id LIMIT ?""",
+                    (now, now, self.max_parallel)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE chat_outbox SET lease_until = ? WHERE id = ?",
+                    [(now + self.lease_seconds, row[0]) for row in rows]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return rows
+
+    def deliver_due(self) -> int:
+        """Send the next due message of each chat thread; returns how many were attempted"""
+        try:
+            rows = self._claim()
+        except sqlite3.Error as e:
+            print(f"Error reading chat outbox: {e}")
+            return 0
+        if rows:
+            list(self._executor.map(self._deliver, rows))
+        return len(rows)
+
+    def _deliver(self, row: tuple):
+        message_id, thread_id, sender, content, metadata, attempts, enqueued_at = row
+        try:
+            self.send(thread_id, content, sender, json.loads(metadata) if metadata else None)
+        except Exception as e:
+            attempts += 1
+            if not is_retryable(e) or attempts >= self.max_attempts:
+                print(f"Dead-lettering chat message {message_id} for thread {thread_id} after {attempts} attempts: {e}")
+                self._update(
+                    "UPDATE chat_outbox SET status = 'dead', attempts = ?, lease_until = 0, last_error = ? WHERE id = ?",
+                    (attempts, str(e), message_id)
+                )
+                self.dead_lettered += 1
+                return
+            delay = max(backoff_delay(attempts - 1, base=1.0, cap=300.0), retry_after_seconds(e) or 0.0)
+            print(f"Send to chat thread {thread_id} failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+            self._update(
+                "UPDATE chat_outbox SET attempts = ?, next_attempt = ?, lease_until = 0, last_error = ? WHERE id = ?",
+                (attempts, time.time() + delay, str(e), message_id)
+            )
+            self.retries += 1
+            return
+
+        self._update("DELETE FROM chat_outbox WHERE id = ?", (message_id,))
+        self.delivered += 1
+        self.delivery_latency.observe(max(0.0, time.time() - enqueued_at))
+
+    def _update(self, sql: str, params: tuple):
+        try:
+            with self._lock:
+                self._conn.execute(sql, params)
+        except sqlite3.Error as e:
+            # The lease expires and the message is sent again
+            print(f"Error updating chat outbox: {e}")
+
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Oldest dead-lettered messages, for inspection"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, thread_id, sender, content, attempts, enqueued_at, last_error FROM chat_outbox WHERE status = 'dead' ORDER BY id LIMIT ?",
+                (limit,)
+            ).fetchall()
+        keys = ("id", "thread_id", "sender", "content", "attempts", "enqueued_at", "last_error")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def requeue_dead(self, thread_id: Optional[str] = None) -> int:
+        """Give dead-lettered messages (of one chat thread, or all) a fresh set of attempts"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE chat_outbox SET status = 'pending', attempts = 0, next_attempt = 0 WHERE status = 'dead' AND (? IS NULL OR thread_id = ?)",
+                (thread_id, thread_id)
+            )
+        self._wake.set()
+        return cursor.rowcount
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Deliver whatever is due now, for up to timeout seconds; returns True if nothing is left pending
+
+        Messages waiting for a retry are not waited for.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and self.deliver_due():
+            pass
+        return not self._pending()
+
+    def _pending(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chat_outbox WHERE status = 'pending'").fetchone()[0]
+
+    def close(self, timeout: float = 10.0):
+        """Stop the flusher after delivering what it can within timeout; undelivered messages stay on disk"""
+        self._closed = True
+        self._wake.set()
+        self._flusher.join(timeout)
+        self.flush(timeout)
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, retry, dead-letter and delivery latency metrics"""
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM chat_outbox GROUP BY status").fetchall())
+        return {
+            "pending": counts.get("pending", 0),
+            "dead": counts.get("dead", 0),
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "retries": self.retries,
+            "dead_lettered": self.dead_lettered,
+            "delivery_latency": self.delivery_latency.snapshot()
+        }
@@ -0,0 +1,205 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+from azure.communication.identity import CommunicationIdentityClient
+from azure.communication.chat import (
+    ChatClient,
+    CommunicationTokenCredential,
+    CommunicationUserIdentifier
+)
+from utils.metrics import LatencyHistogram
+
+
+def expires_at(token) -> float:
+    """Epoch seconds at which an ACS AccessToken expires; expires_on may be a datetime or epoch seconds"""
+    expires_on = token.expires_on
+    if isinstance(expires_on, datetime):
+        return expires_on.timestamp()
+    return float(expires_on)
+
+
+class ChatTokenCache:
+    """ACS chat tokens and ChatClients per identity, shared by every ACS caller in the process
+
+    A token is minted once per identity and reused until shortly before its real
+    expires_on. A background thread mints the replacement refresh_margin seconds
+    ahead of expiry and builds a new ChatClient with it, so callers normally never
+    wait for the identity service. Callers mint in the foreground only when a token
+    is missing or within min_validity seconds of expiring, e.g. because the
+    background refresh kept failing.
+
+    Identities nobody asked for in idle_timeout seconds are dropped instead of refreshed.
+    A replaced or dropped ChatClient is closed once its token expires, since callers may
+    still be using it until then.
+    """
+
+    _shared: Dict[str, "ChatTokenCache"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, connection_string: str, refresh_margin: float = 600.0, min_validity: float = 60.0, idle_timeout: float = 3600.0):
+        """
+        Args:
+            connection_string: ACS connection string, for the identity client and chat endpoint
+            refresh_margin: Seconds before expiry at which a token is refreshed in the background
+            min_validity: Tokens closer than this to expiry are replaced before they are handed out
+            idle_timeout: Identities unused for this many seconds are evicted when their refresh is due
+        """
+        self.endpoint = connection_string.split(';')[0].split('=')[1]
+        self.identity_client = CommunicationIdentityClient.from_connection_string(connection_string)
+        self.refresh_margin = refresh_margin
+        self.min_validity = min(min_validity, refresh_margin)
+        self.idle_timeout = idle_timeout
+        self.mint_latency = LatencyHistogram()
+
+        # identity -> (AccessToken, expires_at, ChatClient, refresh_at)
+        self._entries: Dict[str, Tuple[Any, float, ChatClient, float]] = {}
+        self._last_used: Dict[str, float] = {}
+        # (close_at, ChatClient) for clients that were replaced or evicted
+        self._retired: List[Tuple[float, ChatClient]] = []
+        self._lock = threading.Lock()
+        self._mint_lock = threading.Lock()
+        self._wake = threading.Event()
+
+        # Metrics
+        self.hits = 0
+        self.mints = 0
+        self.background_refreshes = 0
+        self.refresh_failures = 0
+        self.idle_evictions = 0
+
+        self._refresher = threading.Thread(target=self._run_refresher, name="chat-token-refresher", daemon=True)
+        self._refresher.start()
+
+    @classmethod
+    def from_env(cls, connection_string: str) -> "ChatTokenCache":
+        """Create a token cache configured from CHAT_TOKEN_* environment variables"""
+        return cls(
+            connection_string,
+            refresh_margin=float(os.getenv("CHAT_TOKEN_REFRESH_MARGIN_SECONDS", "600")),
+            idle_timeout=float(os.getenv("CHAT_TOKEN_IDLE_SECONDS", "3600"))
+        )
+
+    @classmethod
+    def shared(cls, connection_string: str) -> "ChatTokenCache":
+        """The process-wide cache for an ACS resource, created from the environment on first use"""
+        with cls._shared_lock:
+            cache = cls._shared.get(connection_string)
+            if cache is None:
+                cache = cls._shared[connection_string] = cls.from_env(connection_string)
+            return cache
+
+    def _entry(self, identity: str) -> Tuple[Any, float, ChatClient, float]:
+        self._last_used[identity] = time.time()
+        entry = self._entries.get(identity)
+        if entry is not None and entry[1] - time.time() > self.min_validity:
+            self.hits += 1
+            return entry
+        with self._mint_lock:
+            # Another caller may have minted while this one waited
+            entry = self._entries.get(identity)
+            if entry is not None and entry[1] - time.time() > self.min_validity:
+                self.hits += 1
+                return entry
+            return self._mint(identity)
+
+    def _mint(self, identity: str) -> Tuple[Any, float, ChatClient, float]:
+        """Get a new token for identity from the identity service and build its ChatClient"""
+        start = time.perf_counter()
+        token = self.identity_client.get_token(CommunicationUserIdentifier(identity), ["chat"])
+        self.mint_latency.observe(time.perf_counter() - start)
+        self.mints += 1
+        now = time.time()
+        expiry = expires_at(token)
+        # Refresh refresh_margin ahead of expiry, but never in the first half of a short-lived token
+        refresh_at = max(expiry - self.refresh_margin, now + (expiry - now) / 2)
+        entry = (token, expiry, ChatClient(self.endpoint, CommunicationTokenCredential(token.token)), refresh_at)
+        with self._lock:
+            previous = self._entries.get(identity)
+            self._entries[identity] = entry
+            if previous is not None:
+                self._retired.append((previous[1], previous[2]))
+        # The refresher may need to wake earlier for this token
+        self._wake.set()
+        return entry
+
+    def token(self, identity: str):
+        """A chat AccessToken for identity that is valid for at least min_validity seconds"""
+        return self._entry(identity)[0]
+
+    def chat_client(self, identity: str) -> ChatClient:
+        """A ChatClient authenticated as identity; fetch it per use rather than holding on to it"""
+        return self._entry(identity)[2]
+
+    def evict(self, identity: str):
+        """Forget identity's token; its ChatClient is closed once the token expires"""
+        with self._lock:
+            entry = self._entries.pop(identity, None)
+            self._last_used.pop(identity, None)
+            if entry is not None:
+                self._retired.append((entry[1], entry[2]))
+        self._wake.set()
+
+    def _close_retired(self):
+        """Close retired ChatClients whose tokens have expired"""
+        now = time.time()
+        with self._lock:
+            closing = [client for close_at, client in self._retired if close_at <= now]
+            self._retired = [(close_at, client) for close_at, client in self._retired if close_at > now]
+        for client in closing:
+            try:
+                client.close()
+            except Exception as e:
+                print(f"Error closing ACS chat client: {e}")
+
+    def _run_refresher(self):
+        while True:
+            self._wake.clear()
+            now = time.time()
+            with self._lock:
+                due = [identity for identity, entry in self._entries.items() if entry[3] <= now]
+                idle = {identity for identity in due if now - self._last_used.get(identity, 0.0) > self.idle_timeout}
+            for identity in due:
+                if identity in idle:
+                    self.evict(identity)
+                    self.idle_evictions += 1
+                    continue
+                try:
+                    with self._mint_lock:
+                        entry = self._entries.get(identity)
+                        if entry is None or entry[3] > time.time():
+                            # A caller replaced or evicted the token meanwhile
+                            continue
+                        self._mint(identity)
+                    self.background_refreshes += 1
+                except Exception as e:
+                    self.refresh_failures += 1
+                    print(f"Error refreshing ACS chat token: {e}")
+                    # Try again in a while; the current token stays in use until it nearly expires
+                    with self._lock:
+                        if identity in self._entries:
+                            token, expiry, client, _ = self._entries[identity]
+                            self._entries[identity] = (token, expiry, client, now + 30)
+            self._close_retired()
+            with self._lock:
+                wake_at = [entry[3] for entry in self._entries.values()] + [close_at for close_at, _ in self._retired]
+            next_refresh = min(wake_at, default=now + 3600)
+            self._wake.wait(max(1.0, min(next_refresh - time.time(), 3600)))
+
+    def stats(self) -> Dict[str, Any]:
+        """Token mints, cache hits and refresh latency"""
+        with self._lock:
+            expiries = [entry[1] for entry in self._entries.values()]
+            retired = len(self._retired)
+        return {
+            "identities": len(expiries),
+            "hits": self.hits,
+            "mints": self.mints,
+            "background_refreshes": self.background_refreshes,
+            "refresh_failures": self.refresh_failures,
+            "idle_evictions": self.idle_evictions,
+            "retired_clients": retired,
+            "next_expiry_seconds": round(min(expiries) - time.time(), 1) if expiries else None,
+            "mint_latency": self.mint_latency.snapshot()
+        }
@@ -0,0 +1,171 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+from utils.ttl_cache import TTLCache
+
+
+class MemoryDedupBackend:
+    """In-process dedup index backed by an LRU/TTL cache"""
+
+    blocking = False
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.cache = TTLCache(max_entries=max_entries, ttl=ttl)
+
+    def add(self, key: str) -> bool:
+        """Record key; returns False if it was already recorded and has not expired"""
+        return self.cache.add(key)
+
+    def discard(self, key: str):
+        self.cache.pop(key)
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+
+class SqliteDedupBackend:
+    """On-disk dedup index shared by every worker process on the host"""
+
+    # Every call is a SQLite statement, so async callers run it on a worker thread
+    blocking = True
+
+    def __init__(self, path: Path, max_entries: int, ttl: float, prune_every: int = 1000):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.prune_every = prune_every
+        self._adds = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen_events (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_seen_events_expiry ON seen_events (expires_at)")
+
+    def add(self, key: str) -> bool:
+        """Record key; returns False if it was already recorded and has not expired"""
+        now = time.time()
+        with self._lock:
+            # Insert, or take over an expired row; an unexpired row leaves rowcount at 0
+            cursor = self._conn.execute(
+                """INSERT INTO seen_events (key, expires_at) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET expires_at = excluded.expires_at
+                WHERE seen_events.expires_at <= ?""",
+                (key, now + self.ttl, now)
+            )
+            added = cursor.rowcount == 1
+
+            self._adds += 1
+            if self._adds % self.prune_every == 0:
+                self._prune(now)
+            return added
+
+    def discard(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM seen_events WHERE key = ?", (key,))
+
+    def _prune(self, now: float):
+        """Drop expired keys and keep only the newest max_entries"""
+        self._conn.execute("DELETE FROM seen_events WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            """DELETE FROM seen_events WHERE key IN (
+                SELECT key FROM seen_events ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+            )""",
+            (self.max_entries,)
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen_events").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class DedupManager:
+    """Detects redelivered Event Grid events before any agent work is done"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "DedupManager":
+        """Create a dedup manager configured from WEBHOOK_DEDUP_* environment variables"""
+        ttl = float(os.getenv("WEBHOOK_DEDUP_TTL_SECONDS", "86400"))
+        max_entries = int(os.getenv("WEBHOOK_DEDUP_MAX_ENTRIES", "100000"))
+        backend_name = os.getenv("WEBHOOK_DEDUP_BACKEND", "memory").lower()
+
+        if backend_name == "sqlite":
+            default_path = Path(__file__).parent.parent / "data" / "webhook_dedup.db"
+            path = Path(os.getenv("WEBHOOK_DEDUP_PATH", str(default_path)))
+            return cls(SqliteDedupBackend(path, max_entries, ttl))
+        if backend_name != "memory":
+            raise ValueError(f"Unknown WEBHOOK_DEDUP_BACKEND: {backend_name}")
+        return cls(MemoryDedupBackend(max_entries, ttl))
+
+    @staticmethod
+    def event_key(event: Dict[str, Any]) -> Optional[str]:
+        """Build the dedup key for an Event Grid event (message id, falling back to event id)"""
+        message_id = (event.get('data') or {}).get('messageId')
+        if message_id:
+            return f"message:{message_id}"
+        if event.get('id'):
+            return f"event:{event['id']}"
+        return None
+
+    def check_and_mark(self, key: str) -> bool:
+        """Return True if key was already seen, otherwise record it and return False"""
+        if self.backend.add(key):
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def forget(self, key: str):
+        """Forget key so a redelivery is processed again (e.g. when it could not be queued)"""
+        self.backend.discard(key)
+
+    async def acheck_and_mark(self, key: str) -> bool:
+        """Async variant of check_and_mark; a blocking backend runs on a worker thread"""
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.check_and_mark, key)
+        return self.check_and_mark(key)
+
+    async def aforget(self, key: str):
+        """Async variant of forget; a blocking backend runs on a worker thread"""
+        if self.backend.blocking:
+            await asyncio.to_thread(self.forget, key)
+        else:
+            self.forget(key)
+
+    async def astats(self) -> Dict[str, Any]:
+        """Async variant of stats; a blocking backend runs on a worker thread"""
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.stats)
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of dedup metrics"""
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "size": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def close(self):
+        if hasattr(self.backend, "close"):
+            self.backend.close()
@@ -1,15 +1,23 @@
 import os
-from datetime import datetime, timedelta
+import threading
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Dict, List, Set, Tuple, Optional
 from dataclasses import dataclass, asdict
 from azure.communication.chat import (
     ChatClient,
-    CommunicationTokenCredential,
     ChatMessageType
 )
-from azure.core.exceptions import HttpResponseError
 import json
+from managers.chat_outbox import ChatOutbox
+from managers.transcript_transfer import TranscriptTransfer
+from utils.rate_limiter import ChatRateLimiter
+
+try:
+    import fcntl
+except ImportError:  # Windows: the journal is then only locked within this process
+    fcntl = None
 
 @dataclass
 class ChatEscalation:
@@ -25,63 +33,394 @@ class ChatEscalation:
     def dict(self):
         return asdict(self)
 
+def apply_escalation_event(escalations: Dict[str, ChatEscalation], event: Dict[str, Any]):
+    """Apply one journal event to an escalations dict; events for unknown threads are ignored"""
+    op = event["op"]
+    if op == "create":
+        escalation = ChatEscalation(**event["escalation"])
+        escalations[escalation.chat_thread_id] = escalation
+        return
+    escalation = escalations.get(event["thread_id"])
+    if escalation is None:
+        return
+    if op == "message":
+        escalation.messages.append(event["message"])
+    elif op == "status":
+        escalation.status = event["status"]
+
+def _atomic_write(path: Path, data: bytes, fsync: bool = True):
+    """Replace path with data so a crash leaves either the old or the new file, never a partial one"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class EscalationJournal:
+    """Escalations persisted as a JSON snapshot plus an append-only JSON lines journal of events
+
+    Every change is one appended line, so a write costs O(1) instead of rewriting every
+    escalation. Once the journal outgrows the snapshot (and compact_bytes), the current
+    state is written to a new snapshot and the journal starts over.
+
+    Snapshot and journal both carry a generation number. A compaction writes snapshot
+    generation n + 1 before replacing the journal, so if it crashes in between, the
+    stale journal is recognized by its older generation and not replayed twice. A file
+    lock serializes writers across the worker processes on the host.
+
+    The journal also holds the current escalations in memory. refresh() keeps them
+    coherent with writes by other instances and processes by comparing the files'
+    inode, size and mtime with what was last read: nothing is read when they are
+    unchanged, only the new journal lines when the journal has grown, and everything
+    only after another process compacted.
+
+    Secondary indexes (status -> threads, customer -> active threads) are updated with
+    every applied event and rebuilt whenever the snapshot is re-read.
+    """
+
+    def __init__(self, snapshot_path: Path, compact_bytes: int = 1024 * 1024, fsync: bool = True):
+        """
+        Args:
+            snapshot_path: Snapshot file; the journal and lock file live next to it
+            compact_bytes: Journal size below which it is never compacted
+            fsync: Flush each event to disk before returning, so no acknowledged update is lost
+        """
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = self.snapshot_path.with_suffix(".jsonl")
+        self.lock_path = self.snapshot_path.with_suffix(".lock")
+        self.compact_bytes = compact_bytes
+        self.fsync = fsync
+        self.escalations: Dict[str, ChatEscalation] = {}
+        self._by_status: Dict[str, Set[str]] = {}
+        # customer_id -> active thread ids in creation order (a dict used as an ordered set)
+        self._active_by_customer: Dict[str, Dict[str, None]] = {}
+        self._lock = threading.RLock()
+        self._generation = 0
+        self._snapshot_size = 0
+
+        # What was last read: snapshot (inode, size, mtime), journal inode and bytes consumed
+        self._snapshot_key: Optional[Tuple[int, int, int]] = None
+        self._journal_inode: Optional[int] = None
+        self._journal_offset = 0
+        self._journal_stale = False
+
+        # Metrics
+        self.events = 0
+        self.compactions = 0
+        self.full_loads = 0
+        self.tail_reads = 0
+
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, snapshot_path: Path) -> "EscalationJournal":
+        """Create a journal configured from ESCALATION_JOURNAL_* environment variables"""
+        return cls(
+            snapshot_path,
+            compact_bytes=int(os.getenv("ESCALATION_JOURNAL_COMPACT_BYTES", str(1024 * 1024))),
+            fsync=os.getenv("ESCALATION_JOURNAL_FSYNC", "true").lower() == "true"
+        )
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        """Hold the thread lock and the cross-process file lock; not reentrant across processes"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _stat(path: Path) -> Optional[os.stat_result]:
+        try:
+            return os.stat(path)
+        except FileNotFoundError:
+            return None
+
+    def _snapshot_changed(self, snapshot: Optional[os.stat_result]) -> bool:
+        key = (snapshot.st_ino, snapshot.st_size, snapshot.st_mtime_ns) if snapshot else None
+        return key != self._snapshot_key
+
+    def _journal_changed(self, journal: Optional[os.stat_result]) -> bool:
+        if journal is None:
+            return self._journal_inode is not None
+        return journal.st_ino != self._journal_inode or journal.st_size != self._journal_offset
+
+    def _read_snapshot(self):
+        """Replace the in-memory escalations with the snapshot's"""
+        escalations: Dict[str, ChatEscalation] = {}
+        self._generation = 0
+        self._snapshot_size = 0
+        self._snapshot_key = None
+        try:
+            f = open(self.snapshot_path, "rb")
+        except FileNotFoundError:
+            self.escalations = escalations
+            self._rebuild_indexes()
+            return
+        with f:
+            snapshot = os.fstat(f.fileno())
+            raw = f.read()
+        self._snapshot_key = (snapshot.st_ino, snapshot.st_size, snapshot.st_mtime_ns)
+        self._snapshot_size = len(raw)
+        data = json.loads(raw) if raw.strip() else {}
+        self._generation = data.get("generation", 0)
+        self.escalations = {
+            thread_id: ChatEscalation(**escalation)
+            for thread_id, escalation in data.get("escalations", {}).items()
+        }
+        self._rebuild_indexes()
+
+    def _rebuild_indexes(self):
+        self._by_status = {}
+        self._active_by_customer = {}
+        for escalation in self.escalations.values():
+            self._index(escalation)
+
+    def _index(self, escalation: ChatEscalation):
+        self._by_status.setdefault(escalation.status, set()).add(escalation.chat_thread_id)
+        if escalation.status == "active":
+            self._active_by_customer.setdefault(escalation.customer_id, {})[escalation.chat_thread_id] = None
+
+    def _unindex(self, escalation: ChatEscalation, status: str):
+        """Remove escalation from the indexes, as it was filed under status"""
+        threads = self._by_status.get(status)
+        if threads is not None:
+            threads.discard(escalation.chat_thread_id)
+            if not threads:
+                del self._by_status[status]
+        if status == "active":
+            active = self._active_by_customer.get(escalation.customer_id)
+            if active is not None:
+                active.pop(escalation.chat_thread_id, None)
+                if not active:
+                    del self._active_by_customer[escalation.customer_id]
+
+    def _apply(self, event: Dict[str, Any]):
+        """Apply an event to the escalations and keep the indexes in step"""
+        thread_id = event["escalation"]["chat_thread_id"] if event["op"] == "create" else event["thread_id"]
+        before = self.escalations.get(thread_id)
+        status = before.status if before else None
+        apply_escalation_event(self.escalations, event)
+        after = self.escalations.get(thread_id)
+        if after is before and (after is None or after.status == status):
+            return
+        if before is not None:
+            self._unindex(before, status)
+        self._index(after)
+
+    def _read_journal(self) -> bool:
+        """Apply journal lines past the last consumed offset; returns False if a full reload is needed"""
+        try:
+            f = open(self.journal_path, "rb")
+        except FileNotFoundError:
+            # Only a compaction by an older version or a manual cleanup removes it
+            return self._journal_inode is None
+        with f:
+            inode = os.fstat(f.fileno()).st_ino
+            if self._journal_inode is not None and inode != self._journal_inode:
+                # Replaced by a compaction in another process
+                return False
+            offset = self._journal_offset if self._journal_inode is not None else 0
+            f.seek(offset)
+            if offset == 0:
+                header = f.readline()
+                if not header.endswith(b"\n"):
+                    # Empty, or a header still being written
+                    self._journal_inode = None
+                    return True
+                try:
+                    journal_generation = json.loads(header)["generation"]
+                except (ValueError, KeyError):
+                    journal_generation = None
+                if journal_generation != self._generation:
+                    # Left behind by a compaction that crashed after writing the snapshot;
+                    # its events are in the snapshot, and the next append replaces it
+                    self._journal_inode = inode
+                    self._journal_offset = os.fstat(f.fileno()).st_size
+                    self._journal_stale = True
+                    return True
+                self._journal_stale = False
+                offset += len(header)
+
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete line")
+                    event = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash mid-append; the next append trims it
+                    print(f"Skipping unreadable escalation journal line in {self.journal_path}")
+                    break
+                self._apply(event)
+                offset += len(line)
+        self._journal_inode = inode
+        self._journal_offset = offset
+        return True
+
+    def _refresh(self):
+        """Bring the in-memory escalations up to date with disk; caller holds the lock"""
+        snapshot, journal = self._stat(self.snapshot_path), self._stat(self.journal_path)
+        if not self._snapshot_changed(snapshot):
+            if not self._journal_changed(journal):
+                return
+            if self._read_journal():
+                self.tail_reads += 1
+                return
+        self._read_snapshot()
+        self._journal_inode = None
+        self._journal_offset = 0
+        self._read_journal()
+        self.full_loads += 1
+
+    def load(self) -> Dict[str, ChatEscalation]:
+        """Current escalations: the snapshot with every journaled event applied"""
+        with self._locked(exclusive=False):
+            self._refresh()
+            return self.escalations
+
+    def refresh(self) -> Dict[str, ChatEscalation]:
+        """Pick up changes made by other instances; two stat calls when there are none"""
+        snapshot, journal = self._stat(self.snapshot_path), self._stat(self.journal_path)
+        if self._snapshot_changed(snapshot) or self._journal_changed(journal):
+            with self._locked(exclusive=False):
+                self._refresh()
+        return self.escalations
+
+    def append(self, event: Dict[str, Any]):
+        """Apply and durably record one event, compacting the journal if it has outgrown the snapshot"""
+        line = (json.dumps(event) + "\n").encode("utf-8")
+        with self._locked(exclusive=True):
+            # Apply other writers' events first, so this one lands on current state
+            self._refresh()
+            if self._journal_stale:
+                _atomic_write(self.journal_path, (json.dumps({"generation": self._generation}) + "\n").encode("utf-8"), self.fsync)
+                self._journal_stale = False
+            # Opened per event, so a compaction by another process is picked up
+            with open(self.journal_path, "a+b") as f:
+                end = f.seek(0, os.SEEK_END)
+                if end:
+                    end = self._drop_torn_tail(f, end)
+                if not end:
+                    f.write((json.dumps({"generation": self._generation}) + "\n").encode("utf-8"))
+                f.write(line)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+                self._journal_inode = os.fstat(f.fileno()).st_ino
+                self._journal_offset = f.tell()
+            self._apply(event)
+            self.events += 1
+            if self._journal_offset > max(self.compact_bytes, self._snapshot_size):
+                self._compact()
+
+    @staticmethod
+    def _drop_torn_tail(f, end: int) -> int:
+        """Truncate a partial last line left by a crash, so the next event starts on its own line
+
+        Returns the new end of the file.
+        """
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return end
+        position = end
+        while position > 0:
+            start = max(0, position - 65536)
+            f.seek(start)
+            newline = f.read(position - start).rfind(b"\n")
+            if newline >= 0:
+                f.truncate(start + newline + 1)
+                return start + newline + 1
+            position = start
+        f.truncate(0)
+        return 0
+
+    def compact(self):
+        """Fold the journal into a new snapshot"""
+        with self._locked(exclusive=True):
+            self._refresh()
+            self._compact()
+
+    def _compact(self):
+        """Write the in-memory escalations, which the caller has refreshed, as the next generation"""
+        generation = self._generation + 1
+        snapshot = json.dumps({
+            "generation": generation,
+            "escalations": {thread_id: escalation.dict() for thread_id, escalation in self.escalations.items()}
+        }).encode("utf-8")
+        header = (json.dumps({"generation": generation}) + "\n").encode("utf-8")
+        _atomic_write(self.snapshot_path, snapshot, self.fsync)
+        _atomic_write(self.journal_path, header, self.fsync)
+
+        snapshot_stat, journal_stat = os.stat(self.snapshot_path), os.stat(self.journal_path)
+        self._generation = generation
+        self._snapshot_size = len(snapshot)
+        self._snapshot_key = (snapshot_stat.st_ino, snapshot_stat.st_size, snapshot_stat.st_mtime_ns)
+        self._journal_inode = journal_stat.st_ino
+        self._journal_offset = len(header)
+        self._journal_stale = False
+        self.compactions += 1
+
+    def active_thread(self, customer_id: str) -> Optional[str]:
+        """Earliest created active thread of the customer"""
+        return next(iter(self._active_by_customer.get(customer_id, ())), None)
+
+    def threads_with_status(self, status: str) -> Set[str]:
+        return set(self._by_status.get(status, ()))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "escalations": len(self.escalations),
+            "active": len(self._by_status.get("active", ())),
+            "generation": self._generation,
+            "events": self.events,
+            "compactions": self.compactions,
+            "full_loads": self.full_loads,
+            "tail_reads": self.tail_reads
+        }
+
 class EscalationManager:
-    def __init__(self, chat_manager):
+    def __init__(self, chat_manager, escalations_file: Optional[Path] = None):
         self.chat_manager = chat_manager
         
         # Initialize escalations storage
-        self.escalations_file = Path(__file__).parent.parent / "data" / "escalations.json"
-        self.escalations: Dict[str, ChatEscalation] = {}
+        self.escalations_file = Path(escalations_file or Path(__file__).parent.parent / "data" / "escalations.json")
+        self.journal = EscalationJournal.from_env(self.escalations_file)
         self._load_escalations()
         
-        self._chat_client = None
-        self._token_expiry = None
+        # Every ACS chat call waits for the process-wide rate limiter
+        self.rate_limiter = ChatRateLimiter.shared()
+        
+        # Replays conversation history into new escalation threads
+        self.transcripts = TranscriptTransfer.from_env(self.rate_limiter)
+        
+        # Messages for existing threads are queued on disk and sent in the background
+        self.outbox = ChatOutbox.from_env(self._send)
         
     @property
     def chat_client(self) -> ChatClient:
-        """Get a cached chat client, refreshing token if expired"""
-        current_time = datetime.now()
-        
-        # Check if token is expired or about to expire in next 5 minutes
-        if not self._chat_client or not self._token_expiry or current_time + timedelta(minutes=5) >= self._token_expiry:
-            # Get new token
-            token_result = self.chat_manager._get_chat_token()
-            
-            # Create new chat client
-            self._chat_client = ChatClient(
-                self.chat_manager.endpoint,
-                CommunicationTokenCredential(token_result.token)
-            )
-            
-            # Set token expiry (tokens typically valid for 24 hours)
-            self._token_expiry = current_time + timedelta(hours=23)
-            
-        return self._chat_client
+        """Get the chat client shared through the chat manager's token cache"""
+        return self.chat_manager.chat_client()
+
+    @property
+    def escalations(self) -> Dict[str, ChatEscalation]:
+        """In-memory escalation index, kept by the journal"""
+        return self.journal.escalations
 
     def _load_escalations(self):
-        """Load escalations from JSON file"""
-        if self.escalations_file.exists():
-            with open(self.escalations_file, "r") as f:
-                data = json.load(f)
-                self.escalations = {
-                    thread_id: ChatEscalation(**escalation)
-                    for thread_id, escalation in data.get("escalations", {}).items()
-                }
-
-    def _save_escalations(self):
-        """Save escalations to JSON file"""
-        # Convert escalations to dict format
-        escalations_dict = {
-            thread_id: escalation.dict()
-            for thread_id, escalation in self.escalations.items()
-        }
-        
-        # Create data directory if it doesn't exist
-        self.escalations_file.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Save to file
-        with open(self.escalations_file, "w") as f:
-            json.dump({"escalations": escalations_dict}, f, indent=4)
+        """Load escalations from the snapshot and journal"""
+        self.journal.load()
+
+    def _record(self, event: Dict[str, Any]):
+        """Apply an escalation event in memory and append it to the journal"""
+        self.journal.append(event)
 
     def create_escalation(
         self,
@@ -89,7 +428,7 @@ class EscalationManager:
         recent_messages: List[Dict[str, str]]
     ) -> Tuple[str, ChatEscalation]:
         """Create a new chat thread for escalation"""
-        # Get ACS token for chat thread
+        # Cached ACS token, recorded with the escalation
         token_result = self.chat_manager._get_chat_token()
         chat_client = self.chat_client
         
@@ -98,29 +437,26 @@ class EscalationManager:
 
         # Create new thread
         topic = f"Escalated Chat - Customer {customer.name} - {masked_phone}"
-        create_thread_result = chat_client.create_chat_thread(topic)
+        create_thread_result = self.rate_limiter.call(None, chat_client.create_chat_thread, topic)
         thread_id = create_thread_result.chat_thread.id
         
-        # Add initial messages to thread using same client
-        chat_thread_client = chat_client.get_chat_thread_client(thread_id)
-        for msg in recent_messages:
+        def sender_name(msg: Dict[str, str]) -> str:
             # Set display name based on role
             if msg["role"] == "user":
-                sender_name = customer.name
-            else:
-                agent_type = msg.get("agent_type", "Customer Agent")
-                if agent_type == "CUSTOMER_AGENT":
-                    agent_type = "Customer Agent"
-                elif agent_type == "CONTACT_CENTER":
-                    agent_type = "Contact Center Agent"
-                elif agent_type == "RELATIONSHIP_MANAGER":
-                    agent_type = "Relationship Manager"
-                sender_name = f"[{agent_type}]"
-            
-            chat_thread_client.send_message(
-                content=msg["content"],
-                sender_display_name=sender_name,
-            )
+                return customer.name
+            agent_type = msg.get("agent_type", "Customer Agent")
+            if agent_type == "CUSTOMER_AGENT":
+                agent_type = "Customer Agent"
+            elif agent_type == "CONTACT_CENTER":
+                agent_type = "Contact Center Agent"
+            elif agent_type == "RELATIONSHIP_MANAGER":
+                agent_type = "Relationship Manager"
+            return f"[{agent_type}]"
+        
+        # Add initial messages to thread using same client; each is sent exactly once,
+        # consolidated into a few transcript messages when there are many
+        chat_thread_client = chat_client.get_chat_thread_client(thread_id)
+        self.transcripts.send(chat_thread_client, recent_messages, sender_name)
             
         # Create escalation record
         escalation = ChatEscalation(
@@ -134,102 +470,72 @@ class EscalationManager:
         )
         
         # Save escalation
-        self.escalations[thread_id] = escalation
-        self._save_escalations()
+        self._record({"op": "create", "escalation": escalation.dict()})
+        escalation = self.escalations[thread_id]
         
         return thread_id, escalation
 
     def update_escalation(self, thread_id: str, message: str, role: str):
         """Update an escalation with a new message"""
-        if thread_id not in self.escalations:
+        if thread_id not in self.journal.refresh():
             raise ValueError(f"No escalation found for thread {thread_id}")
             
         escalation = self.escalations[thread_id]
         if escalation.status != "active":
             raise ValueError(f"Escalation {thread_id} is not active")
             
-        try:
-            # Add message to thread
-            chat_thread_client = self.chat_client.get_chat_thread_client(thread_id)
-            sender = "Customer" if role == "user" else "Assistant"
-            chat_thread_client.send_message(
-                content=message,
-                sender_display_name=sender
-            )
-            
-            # Update messages in escalation data
-            escalation.messages.append({
-                "role": role,
-                "content": message
-            })
-        except HttpResponseError as e:
-            if "TooManyRequests" in str(e):
-                print(f"TooManyRequests error in update_escalation: {e}")
-                raise ValueError("We are experiencing high traffic. Please try again in a few moments.")
-            raise
-
-    def update_escalation_messages(self, thread_id: str, messages: List[Dict]):
-        """Update messages for an escalation"""
-        if thread_id not in self.escalations:
-            raise ValueError(f"No escalation found for thread {thread_id}")
-            
-        try:
-            # Get chat thread client
-            chat_thread_client = self.chat_client.get_chat_thread_client(thread_id)
-            
-            # Add each message to thread
-            for msg in messages:
-                sender = "Customer" if msg["role"] == "user" else "Assistant"
-                chat_thread_client.send_message(
-                    content=msg["content"],
-                    sender_display_name=sender
-                )
-                
-            # Update messages in escalation data
-            self.escalations[thread_id].messages = messages
-        except HttpResponseError as e:
-            if "TooManyRequests" in str(e):
-                print(f"TooManyRequests error in update_escalation_messages: {e}")
-                raise ValueError("We are experiencing high traffic. Please try again in a few moments.")
-            raise
+        # Record the message first; the outbox delivers it to ACS in the background
+        self._record({
+            "op": "message",
+            "thread_id": thread_id,
+            "message": {"role": role, "content": message}
+        })
+        sender = "Customer" if role == "user" else "Assistant"
+        self.outbox.enqueue(thread_id, message, sender)
 
     def disconnect_thread(self, thread_id: str):
         """Mark a chat thread as disconnected"""
-        if thread_id not in self.escalations:
+        if thread_id not in self.journal.refresh():
             raise ValueError(f"No escalation found for thread {thread_id}")
             
-        try:
-            # Add disconnect message to thread
-            chat_thread_client = self.chat_client.get_chat_thread_client(thread_id)
-            chat_thread_client.send_message(
-                content="Customer has disconnected from the chat.",
-                sender_display_name="System"
-            )
-            
-            # Mark escalation as disconnected
-            self.escalations[thread_id].status = "disconnected"
-        except HttpResponseError as e:
-            if "TooManyRequests" in str(e):
-                print(f"TooManyRequests error in disconnect_thread: {e}")
-                raise ValueError("We are experiencing high traffic. Please try again in a few moments.")
-            raise
+        # Queue the disconnect message behind anything still pending for the thread
+        self.outbox.enqueue(thread_id, "Customer has disconnected from the chat.", "System")
+        
+        # Mark escalation as disconnected
+        self._record({"op": "status", "thread_id": thread_id, "status": "disconnected"})
+
+    def _send(self, thread_id: str, content: str, sender: str, metadata: Optional[Dict[str, str]] = None):
+        """Deliver one outbox message to its chat thread"""
+        chat_thread_client = self.chat_client.get_chat_thread_client(thread_id)
+        self.rate_limiter.call(
+            thread_id,
+            chat_thread_client.send_message,
+            content=content,
+            sender_display_name=sender,
+            metadata=metadata
+        )
+
+    def close(self, timeout: float = 10.0):
+        """Deliver queued chat messages for up to timeout seconds and stop the outbox"""
+        self.outbox.close(timeout)
 
     def close_escalation(self, thread_id: str):
         """Mark an escalation as closed"""
-        if thread_id in self.escalations:
-            self.escalations[thread_id].status = "closed"
-            self._save_escalations()
+        if thread_id in self.journal.refresh():
+            self._record({"op": "status", "thread_id": thread_id, "status": "closed"})
             print(f"Marked escalation {thread_id} as closed")
 
     def get_escalation(self, thread_id: str) -> Optional[ChatEscalation]:
         """Get escalation record by thread ID"""
-        # Reload escalations to ensure we have latest data
-        self._load_escalations()
-        return self.escalations.get(thread_id)
+        # Pick up changes from other instances; reads nothing if the files are unchanged
+        return self.journal.refresh().get(thread_id)
 
     def get_active_escalation(self, customer_id: str) -> Optional[str]:
         """Get active escalation thread ID for a customer"""
-        for thread_id, escalation in self.escalations.items():
-            if escalation.customer_id == customer_id and escalation.status == "active":
-                return thread_id
-        return None
+        self.journal.refresh()
+        return self.journal.active_thread(customer_id)
+
+    def get_escalations_by_status(self, status: str) -> List[ChatEscalation]:
+        """Get every escalation with the given status ('active', 'disconnected' or 'closed')"""
+        escalations = self.journal.refresh()
+        return [escalations[thread_id] for thread_id in self.journal.threads_with_status(status) if thread_id in escalations]
@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional
+import aiofiles
+
+
+class MediaManager:
+    """Content-addressed store for downloaded WhatsApp media
+
+    Files are stored once per SHA-256 digest under objects/<xx>/<digest><ext>, so the
+    same forwarded image is kept only once. The index records which conversations
+    reference each object; AgentManager releases a conversation's references when it
+    expires. Objects are evicted lazily after each save, once they exceed the age limit
+    or the store exceeds its size budget (least recently used first, unreferenced
+    objects before referenced ones).
+    """
+
+    def __init__(self, media_dir: Path, max_bytes: int, max_age_seconds: float):
+        self.media_dir = Path(media_dir)
+        self.objects_dir = self.media_dir / "objects"
+        self.tmp_dir = self.media_dir / "tmp"
+        self.index_file = self.media_dir / "index.json"
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.objects: Dict[str, Dict[str, Any]] = {}
+        # Commits and releases run on worker threads
+        self._lock = threading.Lock()
+        self._load_index()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls, media_dir: Path) -> "MediaManager":
+        """Create a media store configured from MEDIA_STORE_* environment variables"""
+        return cls(
+            media_dir,
+            max_bytes=int(os.getenv("MEDIA_STORE_MAX_BYTES", str(1024 ** 3))),
+            max_age_seconds=float(os.getenv("MEDIA_STORE_MAX_AGE_DAYS", "30")) * 86400
+        )
+
+    def _load_index(self):
+        """Load the object index, dropping entries whose files are gone"""
+        if not self.index_file.exists():
+            return
+        try:
+            with open(self.index_file, "r") as f:
+                objects = json.load(f).get("objects", {})
+        except Exception as e:
+            print(f"Error loading media index: {e}")
+            return
+        self.objects = {
+            digest: entry for digest, entry in objects.items()
+            if (self.media_dir / entry["path"]).exists()
+        }
+
+    def _save_index(self):
+        """Atomically rewrite the object index"""
+        tmp_file = self.index_file.with_suffix(".json.tmp")
+        with open(tmp_file, "w") as f:
+            json.dump({"objects": self.objects}, f)
+        os.replace(tmp_file, self.index_file)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(entry["size"] for entry in self.objects.values())
+
+    async def save(
+        self,
+        chunks: AsyncIterator[bytes],
+        extension: str = "",
+        conversation_id: Optional[str] = None,
+        max_bytes: Optional[int] = None
+    ) -> str:
+        """Stream chunks into the store, hashing as they are written, and return the stored path
+
+        Raises ValueError if the content is larger than max_bytes.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        tmp_path = self.tmp_dir / f"{uuid.uuid4().hex}.part"
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise ValueError(f"media exceeds the {max_bytes} byte limit")
+                    digest.update(chunk)
+                    await f.write(chunk)
+            return await asyncio.to_thread(self._commit, digest.hexdigest(), tmp_path, extension, size, conversation_id)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def _commit(self, digest: str, tmp_path: Path, extension: str, size: int, conversation_id: Optional[str]) -> str:
+        """Move a fully written temp file into the store, or drop it if the digest is already stored"""
+        with self._lock:
+            now = time.time()
+            entry = self.objects.get(digest)
+            if entry:
+                self.hits += 1
+            else:
+                self.misses += 1
+                relative_path = Path("objects") / digest[:2] / f"{digest}{extension}"
+                (self.media_dir / relative_path).parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, self.media_dir / relative_path)
+                entry = {"path": str(relative_path), "size": size, "created": now, "refs": []}
+                self.objects[digest] = entry
+
+            entry["last_access"] = now
+            if conversation_id and conversation_id not in entry["refs"]:
+                entry["refs"].append(conversation_id)
+
+            self._evict(now, keep=digest)
+            self._save_index()
+            return str(self.media_dir / entry["path"])
+
+    def release(self, conversation_id: str):
+        """Drop a conversation's references so its media is evicted before referenced media"""
+        with self._lock:
+            changed = False
+            for entry in self.objects.values():
+                if conversation_id in entry["refs"]:
+                    entry["refs"].remove(conversation_id)
+                    changed = True
+            if changed:
+                self._save_index()
+
+    def _evict(self, now: float, keep: Optional[str] = None):
+        """Remove expired objects, then least recently used ones until under the size budget"""
+        expired = [
+            digest for digest, entry in self.objects.items()
+            if digest != keep and now - entry["last_access"] > self.max_age_seconds
+        ]
+        for digest in expired:
+            self._remove(digest)
+
+        total = self.total_bytes
+        if total <= self.max_bytes:
+            return
+        candidates = sorted(
+            (digest for digest in self.objects if digest != keep),
+            key=lambda d: (bool(self.objects[d]["refs"]), self.objects[d]["last_access"])
+        )
+        for digest in candidates:
+            if total <= self.max_bytes:
+                break
+            total -= self.objects[digest]["size"]
+            self._remove(digest)
+
+    def _remove(self, digest: str):
+        entry = self.objects.pop(digest)
+        try:
+            (self.media_dir / entry["path"]).unlink()
+        except FileNotFoundError:
+            pass
+        self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of store size and dedup metrics"""
+        with self._lock:
+            return self._stats()
+
+    def _stats(self) -> Dict[str, Any]:
+        saves = self.hits + self.misses
+        return {
+            "objects": len(self.objects),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / saves, 4) if saves else 0.0,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,139 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Tuple
+from utils.metrics import LatencyHistogram
+from utils.retry import backoff_delay, is_retryable, is_throttled, retry_after_seconds
+from utils.worker_pool import KeyedWorkerPool
+
+# WhatsApp rejects text messages longer than this
+MAX_TEXT_LENGTH = 4096
+
+
+class OutboundMessageManager:
+    """Asyncio send queue for outbound WhatsApp text messages
+
+    Messages for one recipient are delivered in order, different recipients in parallel.
+    Throttled (429) and transient failures are retried with jittered exponential backoff,
+    honoring Retry-After. Messages that queue up behind a send to the same recipient are
+    batched into one WhatsApp message, except streamed chunks, which StreamChunker has
+    already sized and paced.
+    """
+
+    def __init__(
+        self,
+        messages,
+        workers: int = 8,
+        max_queue_size: int = 1000,
+        max_retries: int = 5,
+        batch_chars: int = MAX_TEXT_LENGTH
+    ):
+        """
+        Args:
+            messages: MessagesQuickstart used to perform the sends
+            workers: Number of recipients sent to concurrently
+            max_queue_size: Maximum queued messages before send() rejects
+            max_retries: Retries per message before it is dropped
+            batch_chars: Maximum length of a batched message, or 0 to disable batching
+        """
+        self.messages = messages
+        self.max_retries = max_retries
+        self.batch_chars = min(batch_chars, MAX_TEXT_LENGTH)
+        self.pool = KeyedWorkerPool(self._deliver, workers=workers, max_queue_size=max_queue_size, name="outbound-pool")
+        self.delivery_latency = LatencyHistogram()
+
+        # Metrics
+        self.sent = 0
+        self.batched = 0
+        self.retries = 0
+        self.throttled = 0
+        self.dropped = 0
+
+    @classmethod
+    def from_env(cls, messages) -> "OutboundMessageManager":
+        """Create a send queue configured from WHATSAPP_SEND_* environment variables"""
+        return cls(
+            messages,
+            workers=int(os.getenv("WHATSAPP_SEND_WORKERS", "8")),
+            max_queue_size=int(os.getenv("WHATSAPP_SEND_MAX_QUEUE_SIZE", "1000")),
+            max_retries=int(os.getenv("WHATSAPP_SEND_MAX_RETRIES", "5")),
+            batch_chars=int(os.getenv("WHATSAPP_SEND_BATCH_CHARS", str(MAX_TEXT_LENGTH)))
+        )
+
+    async def start(self):
+        await self.pool.start()
+
+    async def stop(self, timeout: float = 30.0):
+        """Flush queued messages (up to timeout seconds) and stop the workers"""
+        await self.pool.stop(timeout)
+
+    def send(self, to_number: str, text: str, batch: bool = True) -> bool:
+        """Queue a text message without blocking; returns False if the queue is full
+
+        Messages sent with batch=False are always delivered on their own.
+        """
+        return self.pool.submit(to_number, (text, time.monotonic(), batch))
+
+    async def send_wait(self, to_number: str, text: str, timeout: float = 10.0, batch: bool = True) -> bool:
+        """Queue a text message, waiting up to timeout seconds for room in the queue"""
+        if await self.pool.submit_wait(to_number, (text, time.monotonic(), batch), timeout):
+            return True
+        print(f"Outbound queue full, dropping message to {to_number}")
+        self.dropped += 1
+        return False
+
+    def _batch(self, to_number: str, first: Tuple[str, float, bool]) -> Tuple[str, List[float]]:
+        """Join batchable messages queued for the same recipient into one, up to batch_chars"""
+        text, enqueued_at, batch = first
+        enqueued = [enqueued_at]
+        while self.batch_chars and batch:
+            following = self.pool.peek_pending(to_number)
+            if following is None or not following[2] or len(text) + 2 + len(following[0]) > self.batch_chars:
+                break
+            next_text, next_enqueued_at, _ = self.pool.take_pending(to_number, 1)[0]
+            text = f"{text}\n\n{next_text}"
+            enqueued.append(next_enqueued_at)
+        if len(enqueued) > 1:
+            self.batched += len(enqueued) - 1
+        return text, enqueued
+
+    async def _deliver(self, to_number: str, item: Tuple[str, float, bool]):
+        text, enqueued = self._batch(to_number, item)
+
+        attempt = 0
+        while True:
+            try:
+                # Retries are handled here with asyncio sleeps instead of inside the SDK
+                await asyncio.to_thread(self.messages.send_text_message_to, to_number, text, retry_total=0)
+                break
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    self.dropped += len(enqueued)
+                    print(f"Failed to send WhatsApp message to {to_number} after {attempt + 1} attempts: {e}")
+                    return
+
+                delay = backoff_delay(attempt)
+                if is_throttled(e):
+                    self.throttled += 1
+                    delay = max(delay, retry_after_seconds(e) or 0.0)
+                self.retries += 1
+                attempt += 1
+                print(f"Send to {to_number} failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+        now = time.monotonic()
+        for enqueued_at in enqueued:
+            self.delivery_latency.observe(now - enqueued_at)
+        self.sent += len(enqueued)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of queue, retry and delivery latency metrics"""
+        return {
+            "queue": self.pool.stats(),
+            "sent": self.sent,
+            "batched": self.batched,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "dropped": self.dropped,
+            "delivery_latency": self.delivery_latency.snapshot()
+        }
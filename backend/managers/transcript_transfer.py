@@ -0,0 +1,118 @@
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from azure.communication.chat import ChatMessageType
+from utils.metrics import LatencyHistogram
+from utils.rate_limiter import ChatRateLimiter
+
+# Sender display name for consolidated transcript messages
+TRANSCRIPT_SENDER = "Conversation Transcript"
+
+
+class TranscriptTransfer:
+    """Replays a conversation transcript into an ACS chat thread with as few sends as possible
+
+    Short transcripts (fewer than min_coalesce messages) are sent one message at a time,
+    in order. Longer ones are joined into parts of at most max_chars, each labelled
+    "(i/N)" and tagged with its position in the message metadata. ACS orders a thread
+    by arrival, so the sends for one thread are always made one after another;
+    transfers into different threads run on their callers' threads and overlap. Every
+    send goes through the shared ACS chat rate limiter.
+    """
+
+    def __init__(
+        self,
+        max_chars: int = 4000,
+        min_coalesce: int = 4,
+        limiter: Optional[ChatRateLimiter] = None
+    ):
+        """
+        Args:
+            max_chars: Longest consolidated transcript message
+            min_coalesce: Transcripts with at least this many messages are consolidated, or 0 to never consolidate
+            limiter: Rate limiter for the sends, by default the process-wide ACS chat limiter
+        """
+        self.max_chars = max(200, max_chars)
+        self.min_coalesce = min_coalesce
+        self.limiter = limiter or ChatRateLimiter.shared()
+        self.handoff_latency = LatencyHistogram()
+
+        # Metrics
+        self.transfers = 0
+        self.messages = 0
+        self.sends = 0
+
+    @classmethod
+    def from_env(cls, limiter: Optional[ChatRateLimiter] = None) -> "TranscriptTransfer":
+        """Create a transcript transfer configured from TRANSCRIPT_* environment variables"""
+        return cls(
+            max_chars=int(os.getenv("TRANSCRIPT_MAX_CHARS", "4000")),
+            min_coalesce=int(os.getenv("TRANSCRIPT_COALESCE_MIN_MESSAGES", "4")),
+            limiter=limiter
+        )
+
+    def plan(self, messages: List[Dict[str, str]], sender_name: Callable[[Dict[str, str]], str]) -> List[Tuple[str, str, Dict[str, str]]]:
+        """Return the (sender, content, metadata) sends that carry messages into a thread"""
+        if not self.min_coalesce or len(messages) < self.min_coalesce:
+            return [(sender_name(msg), msg["content"], {}) for msg in messages]
+
+        # Leave room for the "Conversation transcript (i/N)" label
+        limit = self.max_chars - 40
+        chunks: List[str] = []
+        current = ""
+        for msg in messages:
+            line = f"{sender_name(msg)}: {msg['content']}"
+            # Split a single message that is too long on its own
+            while len(line) > limit:
+                if current:
+                    chunks.append(current)
+                    current = ""
+                chunks.append(line[:limit])
+                line = line[limit:]
+            if current and len(current) + 2 + len(line) > limit:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n\n{line}" if current else line
+        if current:
+            chunks.append(current)
+
+        total = len(chunks)
+        return [
+            (
+                TRANSCRIPT_SENDER,
+                f"Conversation transcript ({index}/{total})\n\n{chunk}" if total > 1 else f"Conversation transcript\n\n{chunk}",
+                {"transcriptPart": str(index), "transcriptParts": str(total)}
+            )
+            for index, chunk in enumerate(chunks, 1)
+        ]
+
+    def _send(self, chat_thread_client, sender: str, content: str, metadata: Dict[str, str]):
+        self.limiter.call(
+            chat_thread_client.thread_id,
+            chat_thread_client.send_message,
+            content=content,
+            sender_display_name=sender,
+            chat_message_type=ChatMessageType.TEXT,
+            metadata=metadata or None
+        )
+
+    def send(self, chat_thread_client, messages: List[Dict[str, str]], sender_name: Callable[[Dict[str, str]], str]) -> int:
+        """Send each message into the thread exactly once, in order; returns the number of ACS sends"""
+        start = time.perf_counter()
+        sends = self.plan(messages, sender_name)
+        for send in sends:
+            self._send(chat_thread_client, *send)
+
+        self.transfers += 1
+        self.messages += len(messages)
+        self.sends += len(sends)
+        self.handoff_latency.observe(time.perf_counter() - start)
+        return len(sends)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "transfers": self.transfers,
+            "messages": self.messages,
+            "sends": self.sends,
+            "handoff_latency": self.handoff_latency.snapshot()
+        }
@@ -1,12 +1,5 @@
-from typing import List, Optional
-from dataclasses import dataclass
-from datetime import datetime
-
-@dataclass
-class Message:
-    role: str  # 'user' or 'assistant'
-    content: str
-    timestamp: datetime = datetime.now()
+# Message is defined once, in agents.core.agent_types; re-exported here for older imports
+from agents.core.agent_types import Message
 
 # This class is deprecated - use agents.agent_types.ConversationState instead
 # @dataclass
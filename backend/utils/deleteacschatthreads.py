@@ -1,13 +1,12 @@
 import os
-from azure.communication.identity import CommunicationIdentityClient
-from azure.communication.chat import (
-    ChatClient,
-    CommunicationTokenCredential,
-    ChatMessageType,
-    CommunicationUserIdentifier
-)
+import sys
 from dotenv import load_dotenv
-import time
+
+# Add backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from managers.chat_token_cache import ChatTokenCache
+from utils.rate_limiter import ChatRateLimiter
 
 def delete_all_chat_threads():
     # Load environment variables
@@ -23,26 +22,18 @@ def delete_all_chat_threads():
     
     print("\nIdentity ID:", fixed_identity)
     
-    # Initialize identity client
-    identity_client = CommunicationIdentityClient.from_connection_string(connection_string)
-    
-    # Get token for fixed identity
-    token_response = identity_client.get_token(
-        CommunicationUserIdentifier(fixed_identity),
-        ["chat"]
-    )
+    # Same token cache as the service: the token is refreshed if the run outlasts it
+    tokens = ChatTokenCache.from_env(connection_string)
+    token_response = tokens.token(fixed_identity)
     
     print("\nAccess Token:", token_response.token)
     print("\nExpires:", token_response.expires_on)
     
-    # Initialize chat client with token
-    chat_client = ChatClient(
-        endpoint=connection_string.split(';')[0].split('=')[1],
-        credential=CommunicationTokenCredential(token_response.token)
-    )
+    # Deletes are paced by the same ACS_CHAT_* limits as the service
+    rate_limiter = ChatRateLimiter.from_env()
     
     # Get all chat threads
-    threads = list(chat_client.list_chat_threads())
+    threads = list(tokens.chat_client(fixed_identity).list_chat_threads())
     total_threads = len(threads)
     deleted_count = 0
     failed_count = 0
@@ -52,23 +43,19 @@ def delete_all_chat_threads():
     # Delete each thread with rate limiting
     for i, thread in enumerate(threads, 1):
         try:
-            chat_client.delete_chat_thread(thread.id)
+            # Waits for the rate limiter, and retries after Retry-After if still throttled
+            rate_limiter.call(None, tokens.chat_client(fixed_identity).delete_chat_thread, thread.id)
             deleted_count += 1
             print(f"[{i}/{total_threads}] Deleted thread {thread.id}")
-            # Add delay between requests to avoid rate limiting
-            time.sleep(1)
         except Exception as e:
             failed_count += 1
             print(f"[{i}/{total_threads}] Failed to delete thread {thread.id}: {str(e)}")
-            # If we hit rate limit, wait longer
-            if "TooManyRequests" in str(e):
-                print("Rate limit hit, waiting 5 seconds...")
-                time.sleep(5)
     
     print(f"\nSummary:")
     print(f"Total threads: {total_threads}")
     print(f"Successfully deleted: {deleted_count}")
     print(f"Failed to delete: {failed_count}")
+    print(f"Rate limit waits: {rate_limiter.waits} ({rate_limiter.wait_seconds:.1f}s), throttled: {rate_limiter.throttled}")
 
 if __name__ == "__main__":
     delete_all_chat_threads()
\ No newline at end of file
@@ -0,0 +1,21 @@
+from typing import Any, Dict, List, Tuple
+
+SUBSCRIPTION_VALIDATION_EVENT = "Microsoft.EventGrid.SubscriptionValidationEvent"
+ADVANCED_MESSAGE_RECEIVED_EVENT = "Microsoft.Communication.AdvancedMessageReceived"
+
+
+def group_events_by_sender(events: List[Dict[str, Any]]) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    """Group a batch of Event Grid events by sender, ordered by received time within each sender
+
+    Senders keep the order in which they first appear in the batch. Events without a
+    sender are grouped under an empty string.
+    """
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for event in events:
+        data = event.get('data') or {}
+        groups.setdefault(data.get('from') or "", []).append(event)
+
+    # Event Grid does not guarantee order inside a batch; sort is stable for equal timestamps
+    for sender_events in groups.values():
+        sender_events.sort(key=lambda e: (e.get('data') or {}).get('receivedTimestamp') or "")
+    return list(groups.items())
@@ -0,0 +1,95 @@
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Tuple
+
+
+class KeyedMailbox:
+    """Per-key actor mailboxes backed by a shared thread pool
+
+    Calls submitted for the same key run one at a time in submission order, while
+    calls for different keys run in parallel on the pool threads.
+    """
+
+    def __init__(self, max_workers: int = 16, name: str = "mailbox"):
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._mailboxes: Dict[str, Deque[Tuple[Future, Callable, tuple, dict]]] = {}
+        self._local = threading.local()
+
+        # Metrics
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, key: str, fn: Callable, *args, **kwargs) -> Future:
+        """Queue fn(*args, **kwargs) in the mailbox for key and return its Future"""
+        future = Future()
+        with self._lock:
+            self.submitted += 1
+            mailbox = self._mailboxes.get(key)
+            if mailbox is None:
+                self._mailboxes[key] = deque([(future, fn, args, kwargs)])
+                schedule = True
+            else:
+                mailbox.append((future, fn, args, kwargs))
+                schedule = False
+
+        # Only the first message of an idle mailbox schedules work; the rest are chained
+        if schedule:
+            self._executor.submit(self._run_next, key)
+        return future
+
+    def run(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn in the mailbox for key and wait for its result"""
+        # Calls made from inside the mailbox for the same key run inline to avoid deadlock
+        if getattr(self._local, "key", None) == key:
+            return fn(*args, **kwargs)
+        return self.submit(key, fn, *args, **kwargs).result()
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of mailbox metrics"""
+        with self._lock:
+            queued = sum(len(mailbox) for mailbox in self._mailboxes.values())
+            active = len(self._mailboxes)
+        return {
+            "active_mailboxes": active,
+            "queued": queued,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and wait for running calls to finish"""
+        self._executor.shutdown(wait=wait)
+
+    def _run_next(self, key: str):
+        with self._lock:
+            future, fn, args, kwargs = self._mailboxes[key][0]
+
+        succeeded = False
+        if future.set_running_or_notify_cancel():
+            self._local.key = key
+            try:
+                future.set_result(fn(*args, **kwargs))
+                succeeded = True
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                self._local.key = None
+
+        with self._lock:
+            if succeeded:
+                self.completed += 1
+            else:
+                self.failed += 1
+            mailbox = self._mailboxes[key]
+            mailbox.popleft()
+            if not mailbox:
+                del self._mailboxes[key]
+                return
+
+        # Reschedule behind other keys so a long mailbox cannot monopolize a thread
+        self._executor.submit(self._run_next, key)
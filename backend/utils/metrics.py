@@ -0,0 +1,56 @@
+import bisect
+import threading
+from typing import Any, Dict, Sequence
+
+
+class LatencyHistogram:
+    """Thread-safe fixed-bucket histogram of latencies in seconds"""
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # One extra bucket counts observations above the largest bound
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        """Record one latency"""
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self._count += 1
+            self._sum += seconds
+            self._max = max(self._max, seconds)
+
+    def percentile(self, p: float) -> float:
+        """Approximate the p-th percentile (0-100) as the upper bound of its bucket"""
+        with self._lock:
+            return self._percentile(p)
+
+    def _percentile(self, p: float) -> float:
+        if not self._count:
+            return 0.0
+        rank = p / 100 * self._count
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank and count:
+                return self.buckets[index] if index < len(self.buckets) else self._max
+        return self._max
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Summary statistics in milliseconds plus raw bucket counts"""
+        with self._lock:
+            labels = [f"<={bound * 1000:g}ms" for bound in self.buckets] + [f">{self.buckets[-1] * 1000:g}ms"]
+            return {
+                "count": self._count,
+                "mean_ms": round(self._sum / self._count * 1000, 2) if self._count else 0.0,
+                "p50_ms": round(self._percentile(50) * 1000, 2),
+                "p95_ms": round(self._percentile(95) * 1000, 2),
+                "p99_ms": round(self._percentile(99) * 1000, 2),
+                "max_ms": round(self._max * 1000, 2),
+                "buckets": dict(zip(labels, self._counts))
+            }
@@ -0,0 +1,187 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, TypeVar
+from utils.metrics import LatencyHistogram
+from utils.retry import backoff_delay, is_throttled, retry_after_seconds
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """Thread-safe token bucket: up to burst calls at once, refilled at rate calls per second"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Args:
+            rate: Tokens added per second
+            burst: Maximum tokens held, i.e. calls allowed back to back after an idle period
+        """
+        self.rate = max(rate, 1e-6)
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.acquired = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def _reserve(self) -> float:
+        """Take a token, possibly going into debt; returns how long the caller must wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            self.acquired += 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            if wait:
+                self.waits += 1
+                self.wait_seconds += wait
+            return wait
+
+    def acquire(self) -> float:
+        """Block until a token is available; returns the seconds waited"""
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float):
+        """Hand out no tokens for the next seconds, e.g. after the service sent Retry-After"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # The next _reserve leaves the bucket seconds * rate tokens in debt
+            self._tokens = min(self._tokens, 1 - seconds * self.rate)
+
+
+class ChatRateLimiter:
+    """Client-side rate limit shared by every ACS chat call: a global bucket plus one per chat thread
+
+    Calls wait for a token instead of being rejected, so bursts are smoothed to the
+    configured rates. A throttled call pauses the bucket it was charged to for the
+    Retry-After the service sent (or an exponential backoff without one) and is retried
+    up to max_retries times before the error is raised.
+    """
+
+    _shared: Optional["ChatRateLimiter"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        rate: float = 20.0,
+        burst: int = 20,
+        thread_rate: float = 5.0,
+        thread_burst: int = 5,
+        max_retries: int = 3,
+        max_threads: int = 10000
+    ):
+        """
+        Args:
+            rate: ACS chat calls per second across all threads
+            burst: ACS chat calls allowed back to back across all threads
+            thread_rate: Calls per second into a single chat thread
+            thread_burst: Calls allowed back to back into a single chat thread
+            max_retries: Retries of a throttled call before its error is raised
+            max_threads: Per-thread buckets kept; the least recently used are dropped
+        """
+        self.bucket = TokenBucket(rate, burst)
+        self.thread_rate = thread_rate
+        self.thread_burst = thread_burst
+        self.max_retries = max_retries
+        self.max_threads = max(1, max_threads)
+        self._threads: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._threads_lock = threading.Lock()
+        self.wait_latency = LatencyHistogram()
+
+        # Metrics
+        self.calls = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.throttled = 0
+        self.retries = 0
+
+    @classmethod
+    def from_env(cls) -> "ChatRateLimiter":
+        """Create a limiter configured from ACS_CHAT_* environment variables"""
+        return cls(
+            rate=float(os.getenv("ACS_CHAT_REQUESTS_PER_SECOND", "20")),
+            burst=int(os.getenv("ACS_CHAT_BURST", "20")),
+            thread_rate=float(os.getenv("ACS_CHAT_THREAD_REQUESTS_PER_SECOND", "5")),
+            thread_burst=int(os.getenv("ACS_CHAT_THREAD_BURST", "5")),
+            max_retries=int(os.getenv("ACS_CHAT_MAX_RETRIES", "3"))
+        )
+
+    @classmethod
+    def shared(cls) -> "ChatRateLimiter":
+        """The process-wide limiter, created from the environment on first use"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls.from_env()
+            return cls._shared
+
+    def _thread_bucket(self, thread_id: str) -> TokenBucket:
+        with self._threads_lock:
+            bucket = self._threads.get(thread_id)
+            if bucket is None:
+                bucket = self._threads[thread_id] = TokenBucket(self.thread_rate, self.thread_burst)
+                if len(self._threads) > self.max_threads:
+                    self._threads.popitem(last=False)
+            else:
+                self._threads.move_to_end(thread_id)
+            return bucket
+
+    def acquire(self, thread_id: Optional[str] = None) -> float:
+        """Block until the thread's bucket (if any) and the global bucket allow a call; returns the seconds waited"""
+        wait = self._thread_bucket(thread_id).acquire() if thread_id else 0.0
+        wait += self.bucket.acquire()
+        self.calls += 1
+        if wait:
+            self.waits += 1
+            self.wait_seconds += wait
+        self.wait_latency.observe(wait)
+        return wait
+
+    def call(self, thread_id: Optional[str], fn: Callable[..., T], *args, **kwargs) -> T:
+        """Call fn(*args, **kwargs) within the rate limits, retrying when ACS throttles it
+
+        Args:
+            thread_id: Chat thread the call targets, or None for calls not tied to a thread
+            fn: ACS chat client method to call
+        """
+        attempt = 0
+        while True:
+            self.acquire(thread_id)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if not is_throttled(e):
+                    raise
+                self.throttled += 1
+                if attempt >= self.max_retries:
+                    raise
+                delay = retry_after_seconds(e)
+                if delay is None:
+                    delay = backoff_delay(attempt, base=1.0)
+                # Later calls charged to the same bucket wait out the Retry-After as well
+                (self._thread_bucket(thread_id) if thread_id else self.bucket).pause(delay)
+                self.retries += 1
+                attempt += 1
+                print(f"ACS chat call {getattr(fn, '__name__', fn)} throttled, retrying in {delay:.1f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        """Call, throttling and wait-time metrics"""
+        return {
+            "calls": self.calls,
+            "waits": self.waits,
+            "wait_seconds": round(self.wait_seconds, 3),
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "threads": len(self._threads),
+            "wait_latency": self.wait_latency.snapshot()
+        }
@@ -0,0 +1,65 @@
+import random
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Optional
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def status_code_of(error: Exception) -> Optional[int]:
+    """HTTP status code carried by an Azure SDK error, if any"""
+    status = getattr(error, "status_code", None)
+    if status is None and getattr(error, "response", None) is not None:
+        status = getattr(error.response, "status_code", None)
+    return status
+
+
+def is_throttled(error: Exception) -> bool:
+    """True if the error is a 429 / TooManyRequests response"""
+    return status_code_of(error) == 429 or "TooManyRequests" in str(error)
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for throttling, transient server errors and connection failures"""
+    if is_throttled(error):
+        return True
+    status = status_code_of(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    # Azure SDK connection and timeout errors carry no status code
+    return type(error).__name__ in ("ServiceRequestError", "ServiceResponseError", "ServiceRequestTimeoutError",
+                                    "ServiceResponseTimeoutError", "ConnectionError", "TimeoutError")
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Parse the Retry-After hint (retry-after-ms, x-ms-retry-after-ms or Retry-After) from an error response"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    for name in ("retry-after-ms", "x-ms-retry-after-ms"):
+        value = headers.get(name)
+        if value:
+            try:
+                return max(0.0, float(value) / 1000)
+            except ValueError:
+                pass
+
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (starting at 0)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import re
+import time
+from typing import Awaitable, Callable, Optional
+
+# Paragraph breaks are preferred over sentence ends as chunk boundaries
+_PARAGRAPH_END = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"[.!?:;](?:[\"')\]]*)(?=\s)|\n")
+
+
+class StreamChunker:
+    """Buffers streamed completion text and flushes it as sentence or paragraph sized messages
+
+    A chunk is flushed once it holds at least min_chars and ends on a boundary, and at
+    most one chunk is sent per min_interval seconds. Text keeps buffering while the
+    interval runs, so a fast stream yields fewer, larger messages instead of a flood.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str], Awaitable[None]],
+        min_chars: int = 160,
+        min_interval: float = 1.0,
+        max_chars: int = 4096
+    ):
+        """
+        Args:
+            send: Coroutine function called with each chunk
+            min_chars: Smallest chunk sent before the stream ends
+            min_interval: Minimum seconds between two sends
+            max_chars: Chunks are split at whitespace if they would exceed this length
+        """
+        self.send = send
+        self.min_chars = max(1, min_chars)
+        self.min_interval = max(0.0, min_interval)
+        self.max_chars = max(self.min_chars, max_chars)
+        self._buffer = ""
+        self._last_sent: Optional[float] = None
+        self.chunks_sent = 0
+
+    @classmethod
+    def from_env(cls, send: Callable[[str], Awaitable[None]]) -> "StreamChunker":
+        """Create a chunker configured from WHATSAPP_STREAM_* environment variables"""
+        return cls(
+            send,
+            min_chars=int(os.getenv("WHATSAPP_STREAM_MIN_CHUNK_CHARS", "160")),
+            min_interval=float(os.getenv("WHATSAPP_STREAM_MIN_INTERVAL_SECONDS", "1.0"))
+        )
+
+    def _boundary(self) -> int:
+        """End index of the last paragraph (or else sentence) boundary at or after min_chars, or 0"""
+        for pattern in (_PARAGRAPH_END, _SENTENCE_END):
+            end = 0
+            for match in pattern.finditer(self._buffer, 0, self.max_chars):
+                if match.end() >= self.min_chars:
+                    end = match.end()
+            if end:
+                return end
+        if len(self._buffer) >= self.max_chars:
+            # No boundary within the limit; split at the last space, or hard split
+            space = self._buffer.rfind(" ", self.min_chars, self.max_chars)
+            return space if space > 0 else self.max_chars
+        return 0
+
+    def _interval_passed(self) -> bool:
+        return self._last_sent is None or time.monotonic() - self._last_sent >= self.min_interval
+
+    async def _flush(self, end: int):
+        chunk, self._buffer = self._buffer[:end].strip(), self._buffer[end:].lstrip()
+        if chunk:
+            self._last_sent = time.monotonic()
+            self.chunks_sent += 1
+            await self.send(chunk)
+
+    async def feed(self, text: str):
+        """Add streamed text, sending a chunk if one is ready and the send interval has passed"""
+        self._buffer += text
+        if len(self._buffer) < self.min_chars or not self._interval_passed():
+            return
+        end = self._boundary()
+        if end:
+            await self._flush(end)
+
+    async def close(self):
+        """Send the remaining text once the send interval allows it"""
+        while self._buffer.strip():
+            if self._last_sent is not None:
+                wait = self.min_interval - (time.monotonic() - self._last_sent)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            await self._flush(self._boundary() if len(self._buffer) > self.max_chars else len(self._buffer))
@@ -0,0 +1,161 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries optionally expire after ttl seconds"""
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        """
+        Args:
+            max_entries: Maximum number of entries before the least recently used one is evicted
+            ttl: Seconds an entry stays valid after it is set, or None to never expire
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _lookup(self, key: Hashable, now: float) -> Any:
+        """Return the live value for key (refreshing its LRU position) or _MISSING"""
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            del self._data[key]
+            self.expirations += 1
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def _store(self, key: Hashable, value: Any, now: float, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        self._data[key] = (value, now + ttl if ttl is not None else None)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a value, counting the lookup as a hit or miss"""
+        with self._lock:
+            value = self._lookup(key, time.time())
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Set a value, evicting the least recently used entry if the cache is full"""
+        with self._lock:
+            self._store(key, value, time.time(), ttl)
+
+    def add(self, key: Hashable, value: Any = True, ttl: Optional[float] = None) -> bool:
+        """Set key only if it is not already cached; returns True if it was added"""
+        with self._lock:
+            now = time.time()
+            if self._lookup(key, now) is not _MISSING:
+                self.hits += 1
+                return False
+            self.misses += 1
+            self._store(key, value, now, ttl)
+            return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove key and return its value"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[0]
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._lookup(key, time.time()) is not _MISSING
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def purge_expired(self) -> int:
+        """Drop every expired entry now instead of on its next lookup; returns the number dropped"""
+        return len(self.pop_expired())
+
+    def pop_expired(self) -> List[Hashable]:
+        """Drop every expired entry now and return their keys"""
+        with self._lock:
+            now = time.time()
+            expired = [
+                key for key, (_, expires_at) in self._data.items()
+                if expires_at is not None and expires_at <= now
+            ]
+            for key in expired:
+                del self._data[key]
+            self.expirations += len(expired)
+            return expired
+
+    def items(self) -> List[Tuple[Hashable, Any, Optional[float]]]:
+        """Return (key, value, expires_at) for every live entry, least recently used first"""
+        with self._lock:
+            now = time.time()
+            return [
+                (key, value, expires_at)
+                for key, (value, expires_at) in self._data.items()
+                if expires_at is None or expires_at > now
+            ]
+
+    def save(self, path: str):
+        """Atomically write live entries to a JSON file (keys and values must be JSON serializable)"""
+        entries = [[key, value, expires_at] for key, value, expires_at in self.items()]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> int:
+        """Load unexpired entries written by save(); returns the number loaded"""
+        if not os.path.exists(path):
+            return 0
+        with open(path, "r") as f:
+            entries = json.load(f)
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            for key, value, expires_at in entries:
+                if expires_at is None or expires_at > now:
+                    self._data[key] = (value, expires_at)
+                    self._data.move_to_end(key)
+                    loaded += 1
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return loaded
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of cache metrics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
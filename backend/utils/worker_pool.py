@@ -0,0 +1,196 @@
+import asyncio
+import time
+import traceback
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+
+class KeyedWorkerPool:
+    """Bounded asyncio worker pool that runs jobs with the same key strictly in order
+
+    Jobs for different keys run concurrently on up to `workers` tasks. Each key is
+    held by at most one worker at a time, so jobs submitted for one key (e.g. a
+    sender's phone number) are processed in submission order.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str, Any], Awaitable[None]],
+        workers: int = 8,
+        max_queue_size: int = 1000,
+        name: str = "worker-pool"
+    ):
+        """
+        Args:
+            handler: Coroutine function called as handler(key, item) for every job
+            workers: Number of concurrent worker tasks
+            max_queue_size: Maximum number of queued (not yet started) jobs before submit() rejects
+            name: Name used in log output
+        """
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_queue_size = max(1, max_queue_size)
+        self.name = name
+
+        # Per-key FIFO of (item, enqueued_at)
+        self._pending: Dict[str, Deque[Tuple[Any, float]]] = {}
+        # Keys currently waiting in the ready queue or held by a worker
+        self._scheduled: Set[str] = set()
+        self._ready: Optional[asyncio.Queue] = None
+        # Set whenever a queued job leaves the queue, to wake submit_wait callers
+        self._room: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+        # Metrics
+        self._size = 0
+        self._in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        """Start the worker tasks on the running event loop"""
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        self._room = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"{self.name}-{i}")
+            for i in range(self.workers)
+        ]
+        print(f"Started {self.name} with {self.workers} workers (max queue size {self.max_queue_size})")
+
+    async def stop(self, timeout: float = 30.0):
+        """Drain queued jobs (up to timeout seconds) and stop the workers"""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._ready.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"{self.name}: stopping with {self._size} jobs still queued")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, key: str, item: Any) -> bool:
+        """Queue a job for key without blocking
+
+        Returns False when the pool is at capacity so callers can apply backpressure.
+        """
+        if self._ready is None:
+            raise RuntimeError(f"{self.name} has not been started")
+        if self._size >= self.max_queue_size:
+            self.rejected += 1
+            return False
+
+        self._pending.setdefault(key, deque()).append((item, time.monotonic()))
+        self._size += 1
+        self.submitted += 1
+        self.max_depth = max(self.max_depth, self._size)
+
+        if key not in self._scheduled:
+            self._scheduled.add(key)
+            self._ready.put_nowait(key)
+        return True
+
+    async def submit_wait(self, key: str, item: Any, timeout: float) -> bool:
+        """Queue a job for key, waiting up to timeout seconds for room in the queue
+
+        Returns False if the queue is still full when the timeout expires.
+        """
+        deadline = time.monotonic() + timeout
+        while not self.submit(key, item):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._room.clear()
+            try:
+                await asyncio.wait_for(self._room.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    def peek_pending(self, key: str) -> Optional[Any]:
+        """Return the next queued job for key without removing it"""
+        pending = self._pending.get(key)
+        return pending[0][0] if pending else None
+
+    def take_pending(self, key: str, limit: int) -> List[Any]:
+        """Remove and return up to limit queued jobs for key, oldest first
+
+        Handlers call this to batch jobs that queued up behind the one they are processing.
+        """
+        pending = self._pending.get(key)
+        taken = []
+        while pending and len(taken) < limit:
+            item, _ = pending.popleft()
+            taken.append(item)
+        self._size -= len(taken)
+        if taken:
+            self._room.set()
+        return taken
+
+    def depth(self) -> int:
+        """Number of jobs queued but not yet started"""
+        return self._size
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of queue and throughput metrics"""
+        started = self.completed + self.failed + self._in_flight
+        return {
+            "workers": self.workers,
+            "queue_depth": self._size,
+            "max_queue_depth": self.max_depth,
+            "max_queue_size": self.max_queue_size,
+            "in_flight": self._in_flight,
+            "active_keys": len(self._scheduled),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self._total_wait / started * 1000, 2) if started else 0.0,
+            "max_wait_ms": round(self._max_wait * 1000, 2)
+        }
+
+    async def _worker(self):
+        while True:
+            key = await self._ready.get()
+            try:
+                item, enqueued_at = self._pending[key].popleft()
+                self._size -= 1
+                self._room.set()
+                self._in_flight += 1
+
+                wait = time.monotonic() - enqueued_at
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+
+                try:
+                    await self.handler(key, item)
+                    self.completed += 1
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.failed += 1
+                    traceback.print_exc()
+                    print(f"{self.name}: error processing job for {key}: {e}")
+                finally:
+                    self._in_flight -= 1
+
+                # Requeue the key behind other senders so one busy key cannot starve the rest
+                if self._pending[key]:
+                    self._ready.put_nowait(key)
+                else:
+                    del self._pending[key]
+                    self._scheduled.discard(key)
+            finally:
+                self._ready.task_done()